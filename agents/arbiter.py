@@ -1,38 +1,46 @@
-from core.state import EngineState
+from typing import Sequence
+
+from core.state import EngineState, Status
 
 """Arbiter that produces the final build/kill decision.
 
-The arbiter expects three evaluator results to be present on state and
-applies a deterministic rule to set final_decision.
+The arbiter expects one result per registered evaluator (by default market,
+business and technical) to be present on state and applies a deterministic
+rule to set final_decision.
 """
 
-def final_arbiter(state: EngineState) -> EngineState:
+DEFAULT_KEYS = ("market_eval", "business_eval", "technical_eval")
+
+
+def final_arbiter(state: EngineState, keys: Sequence[str] = DEFAULT_KEYS) -> EngineState:
     """Apply the final decision rule.
 
     Inputs:
-    - state: EngineState containing market_eval, business_eval, technical_eval
+    - state: EngineState containing an eval result for each key
+    - keys: the evaluators' state keys (build_graph passes the registry's)
 
     Output:
     - same EngineState with 'final_decision' set to "BUILD" or "KILL"
 
     Assumptions:
-    - Each eval dict contains a 'status' key with values matching Status enum.
+    - Each eval result has a 'status' that is a Status (core/results.py
+      validates agent output; Status is a str Enum, so plain strings compare equal).
     - Caller ensures evaluators have run before invoking the arbiter.
     """
     # If all evals PASS set BUILD, otherwise set KILL.
     # Sort priorities: KILL > INSUFFICIENT_INFO > PASS
-    evals = [state.get("market_eval"), state.get("business_eval"), state.get("technical_eval")]
+    evals = [state.get(key) for key in keys]
     
     # Filter out Nones (in case some didn't run, though graph should ensure they do if we reach here)
     valid_evals = [e for e in evals if e is not None]
 
     statuses = [e["status"] for e in valid_evals]
     
-    if "KILL" in statuses:
+    if Status.KILL in statuses:
         state["final_decision"] = "KILL"
-    elif "INSUFFICIENT_INFO" in statuses:
+    elif Status.INSUFFICIENT_INFO in statuses:
         state["final_decision"] = "INSUFFICIENT_INFO"
-    elif all(s == "PASS" for s in statuses) and len(valid_evals) == 3:
+    elif all(s == Status.PASS for s in statuses) and len(valid_evals) == len(keys):
         state["final_decision"] = "BUILD"
     else:
         # Fallback if something is missing or weird
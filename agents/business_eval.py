@@ -1,14 +1,17 @@
-import json
 from core.state import EngineState
 from core.context import ExecutionContext
-from core.prompts import load_prompt
+from agents.evaluator import evaluate, aevaluate
+from agents.registry import DEFAULT_EVALUATORS
 
 """Business evaluator agent.
 
 Evaluates business viability and returns a partial state patch with
-'business_eval'.
+'business_eval', via the generic evaluator (agents/evaluator.py).
 """
 
+SPEC = DEFAULT_EVALUATORS[1]
+
+
 def business_evaluator(state: EngineState, context: ExecutionContext) -> EngineState:
     """Evaluate business potential and return {'business_eval': eval_result}.
 
@@ -18,33 +21,10 @@ def business_evaluator(state: EngineState, context: ExecutionContext) -> EngineS
 
     Output:
     - dict with 'business_eval' key mapping to parsed EvalResult
-
-    Assumptions:
-    - The LLM returns well-formed JSON that matches the expected schema.
     """
-    # Call the business prompt and return {'business_eval': ...}.
-    system_prompt = load_prompt("business_eval.txt")
-
-    user_prompt = f"""
-    Evaluate the following B2B startup idea for its business potential:
-    {json.dumps(state['brief'], indent=2)}
-    
-    Provide your evaluation in the following JSON format:
-    {{
-        "component": "business",
-        "status": "PASS" or "KILL",
-        "confidence": float between 0 and 1,
-        "reason": "detailed explanation"
-    }}
-    """
-
-    raw_output = context.llm.generate(
-        system=system_prompt,
-        user=user_prompt
-    )
+    return evaluate(SPEC, state, context)
 
-    eval_result = json.loads(raw_output)
 
-    return {
-        "business_eval": eval_result
-    }
\ No newline at end of file
+async def abusiness_evaluator(state: EngineState, context: ExecutionContext) -> EngineState:
+    """Async variant of business_evaluator; awaits context.llm.agenerate instead of blocking."""
+    return await aevaluate(SPEC, state, context)
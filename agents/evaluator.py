@@ -0,0 +1,100 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+from typing import Optional
+
+from agents.registry import EvaluatorSpec
+from core.brief import prepared
+from core.context import ExecutionContext
+from core.json_stream import complete_json, acomplete_json
+from core.prompts import load_prompt
+from core.state import EngineState, EvalResult, Status
+
+"""Generic evaluator agent.
+
+Every dimension in the registry (agents/registry.py) runs through evaluate /
+aevaluate: the spec's system prompt, a user prompt built around the brief,
+and a partial state patch {spec.key: EvalResult}. The market, business and
+technical modules are thin wrappers kept for their public names.
+
+The user prompt is the evaluator's fixed instructions (built once per
+name) followed by the run's prepared brief (core/brief.py), so a wider
+panel does not serialize the brief once per dimension and the prompt prefix
+before the brief is identical on every run.
+
+A spec's timeout bounds the call: on the async path the call is cancelled,
+on the sync path it runs on in a worker thread and its answer is dropped.
+Either way the dimension reports INSUFFICIENT_INFO.
+"""
+
+_timeout_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def instructions(name: str) -> str:
+    # Everything in the user prompt before the brief. The output format is
+    # the system prompt's (its OUTPUT FORMAT section), not repeated here.
+    return f"Evaluate the following B2B startup idea for its {name} potential:\n\n"
+
+
+def user_prompt(spec: EvaluatorSpec, state: EngineState) -> str:
+    return instructions(spec.name) + prepared(state).text
+
+
+def timed_out(spec: EvaluatorSpec) -> EvalResult:
+    # EvalResult for an evaluator that missed its timeout.
+    return EvalResult(
+        component=spec.name.upper(),
+        status=Status.INSUFFICIENT_INFO,
+        confidence=0.0,
+        reason=f"Evaluator timed out after {spec.timeout:g}s"
+    )
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _timeout_pool
+    with _pool_lock:
+        if _timeout_pool is None:
+            _timeout_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="evaluator")
+        return _timeout_pool
+
+
+def evaluate(spec: EvaluatorSpec, state: EngineState, context: ExecutionContext) -> EngineState:
+    """Run one evaluator and return {spec.key: eval_result}.
+
+    Inputs:
+    - spec: the evaluator's registry entry
+    - state: EngineState with 'brief' present
+    - context: ExecutionContext with the evaluator's llm
+
+    Assumptions:
+    - The LLM returns a JSON object with a valid status; it is validated into
+      an EvalResult (core/results.py) and ValueError raised otherwise.
+    """
+    system_prompt = load_prompt(spec.prompt)
+    prompt = user_prompt(spec, state)
+    if spec.timeout is None:
+        # Streams the answer when enabled (see core/json_stream.py).
+        return {spec.key: complete_json(context, system_prompt, prompt, "status", EvalResult)}
+
+    future = _pool().submit(contextvars.copy_context().run, complete_json, context, system_prompt, prompt, "status",
+                            EvalResult)
+    try:
+        return {spec.key: future.result(timeout=spec.timeout)}
+    except FutureTimeout:
+        return {spec.key: timed_out(spec)}
+
+
+async def aevaluate(spec: EvaluatorSpec, state: EngineState, context: ExecutionContext) -> EngineState:
+    """Async variant of evaluate; a timeout cancels the call."""
+    system_prompt = load_prompt(spec.prompt)
+    call = acomplete_json(context, system_prompt, user_prompt(spec, state), "status", EvalResult)
+    if spec.timeout is None:
+        return {spec.key: await call}
+    try:
+        return {spec.key: await asyncio.wait_for(call, timeout=spec.timeout)}
+    except asyncio.TimeoutError:
+        return {spec.key: timed_out(spec)}
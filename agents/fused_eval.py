@@ -0,0 +1,108 @@
+from typing import Sequence
+from core.state import EngineState, EvalResult, GateResult, Status
+from core.context import ExecutionContext
+from core.prompts import load_prompt
+from core.tracing import parse_json
+from core.results import result_from
+from core.brief import prepared
+from agents.registry import DEFAULT_EVALUATORS, EvaluatorSpec
+from agents.workflow_gate import gate_patch
+
+"""Fused evaluator agent.
+
+Runs the registered evaluators (and optionally the workflow gate) as one LLM
+call. The system prompt is assembled from the individual prompt files, so
+each persona keeps a single source of truth; the response is validated and
+split back into the usual workflow_gate_result / "<name>_eval" keys, so the
+arbiter and shadow logs work unchanged. Per-evaluator llm and timeout
+settings do not apply here: the whole panel is one call on the context's llm.
+"""
+
+GATE_SECTION = "workflow_gate"
+
+
+def _system_prompt(include_gate: bool, specs: Sequence[EvaluatorSpec]) -> str:
+    # Gate first so its verdict is emitted before the evaluators'.
+    parts, formats = [], []
+    if include_gate:
+        parts.append(f"# SECTION: {GATE_SECTION}\n\n{load_prompt('workflow_gate.txt')}")
+        formats.append(f'  "{GATE_SECTION}": {{"decision": "PASS" | "KILL", "confidence": float, "reason": "..."}}')
+    for spec in specs:
+        parts.append(f"# SECTION: {spec.name}\n\n{load_prompt(spec.prompt)}")
+        formats.append(
+            f'  "{spec.name}": {{"component": "{spec.name.upper()}", '
+            f'"status": "PASS" | "KILL", "confidence": float, "reason": "..."}}'
+        )
+    return (load_prompt("fused_eval.txt")
+            .replace("{format}", "{\n" + ",\n".join(formats) + "\n}")
+            .replace("{sections}", "\n\n".join(parts)))
+
+
+def _user_prompt(state: EngineState) -> str:
+    return "Evaluate the following B2B startup idea:\n\n" + prepared(state).text
+
+
+def _split(raw_output: str, include_gate: bool, specs: Sequence[EvaluatorSpec]) -> EngineState:
+    """Validate the fused response and map it onto state keys.
+
+    Raises ValueError when a section is missing or fails validation as a
+    GateResult / EvalResult (core/results.py), so a malformed response fails
+    the run (and is retried by ResilientLLM) rather than silently dropping a
+    dimension.
+    """
+    result = parse_json(raw_output)
+    if not isinstance(result, dict):
+        raise ValueError("Fused output must be a JSON object")
+
+    patch = {}
+    if include_gate:
+        gate = _section(result, GATE_SECTION, GateResult)
+        patch.update(gate_patch(gate))
+        if gate.decision == Status.KILL:
+            # Same outcome as the strict topology: evaluators never ran.
+            return patch
+
+    for spec in specs:
+        patch[spec.key] = _section(result, spec.name, EvalResult)
+    return patch
+
+
+def _section(result: dict, name: str, result_type: type):
+    section = result.get(name)
+    if not isinstance(section, dict):
+        raise ValueError(f"Fused output has no valid '{name}' section")
+    try:
+        return result_from(section, result_type)
+    except ValueError as exc:
+        raise ValueError(f"Fused output has no valid '{name}' section") from exc
+
+
+def fused_evaluator(state: EngineState, context: ExecutionContext, include_gate: bool = True,
+                    specs: Sequence[EvaluatorSpec] = DEFAULT_EVALUATORS) -> EngineState:
+    """Evaluate gate (optional) and every registered dimension in one LLM call.
+
+    Inputs:
+    - state: EngineState with 'brief' present
+    - context: ExecutionContext with llm
+    - include_gate: also produce workflow_gate_result from the same call
+    - specs: the evaluators to include, in section order
+
+    Output:
+    - partial state patch with the gate and/or evaluator keys; on a gate KILL
+      only the gate keys are returned
+    """
+    raw_output = context.llm.generate(
+        system=_system_prompt(include_gate, specs),
+        user=_user_prompt(state)
+    )
+    return _split(raw_output, include_gate, specs)
+
+
+async def afused_evaluator(state: EngineState, context: ExecutionContext, include_gate: bool = True,
+                    specs: Sequence[EvaluatorSpec] = DEFAULT_EVALUATORS) -> EngineState:
+    """Async variant of fused_evaluator; awaits context.llm.agenerate instead of blocking."""
+    raw_output = await context.llm.agenerate(
+        system=_system_prompt(include_gate, specs),
+        user=_user_prompt(state)
+    )
+    return _split(raw_output, include_gate, specs)
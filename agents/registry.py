@@ -0,0 +1,103 @@
+import json
+import os
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from core.prompts import load_prompt
+
+"""Declarative evaluator registry.
+
+An evaluator is a name plus a prompt file; build_graph turns the registry
+into one node (or panel job) per evaluator, a state key "<name>_eval", and
+the fan-out/fan-in edges around them, so adding a dimension widens the
+parallel step instead of lengthening the run. The prompt file carries the
+persona and its JSON OUTPUT FORMAT; the user prompt only adds the brief.
+Per evaluator:
+- llm: get_llm() config (provider, model, max_tokens, transport) for a
+  client of its own; omitted, it shares the context's client
+- timeout: seconds; an evaluator that has not answered by then reports
+  INSUFFICIENT_INFO instead of holding up the run
+
+Registry sources, first match wins:
+- ctx.config["evaluators"]: a list of EvaluatorSpec or dicts
+- EVALUATORS env var: a JSON file path or inline JSON list of objects, e.g.
+  [{"name": "security", "prompt": "security_eval.txt", "timeout": 20}]
+- DEFAULT_EVALUATORS (market, business, technical)
+"""
+
+
+class EvaluatorSpec(NamedTuple):
+    # One evaluation dimension.
+    name: str
+    prompt: str
+    llm: Optional[Dict[str, Any]] = None
+    timeout: Optional[float] = None
+
+    @property
+    def key(self) -> str:
+        """State key holding this evaluator's EvalResult."""
+        return f"{self.name}_eval"
+
+    @property
+    def role(self) -> str:
+        """current_role while it runs (node name, rate-limit queue, span name)."""
+        return self.key
+
+
+DEFAULT_EVALUATORS: Tuple[EvaluatorSpec, ...] = (
+    EvaluatorSpec("market", "market_eval.txt"),
+    EvaluatorSpec("business", "business_eval.txt"),
+    EvaluatorSpec("technical", "technical_eval.txt"),
+)
+
+
+def _spec(entry: Any) -> EvaluatorSpec:
+    if isinstance(entry, EvaluatorSpec):
+        return entry
+    if not isinstance(entry, dict) or "name" not in entry:
+        raise ValueError(f"Evaluator entry must be an object with a 'name', got {entry!r}")
+    fields = {"prompt": f"{entry['name']}_eval.txt", **entry}
+    unknown = set(fields) - set(EvaluatorSpec._fields)
+    if unknown:
+        raise ValueError(f"Unknown evaluator settings for {entry['name']}: {', '.join(sorted(unknown))}")
+    return EvaluatorSpec(**fields)
+
+
+def validate(specs: Iterable[Any]) -> Tuple[EvaluatorSpec, ...]:
+    """Normalize entries to EvaluatorSpecs and check names and prompts.
+
+    Raises ValueError on an empty registry, duplicate or unusable names and
+    FileNotFoundError on a missing prompt file, at build time rather than
+    on the first run.
+    """
+    specs = tuple(_spec(entry) for entry in specs)
+    if not specs:
+        raise ValueError("At least one evaluator is required")
+    names = [spec.name for spec in specs]
+    for name in names:
+        if not name.isidentifier() or name == "workflow_gate":
+            raise ValueError(f"Invalid evaluator name: {name!r}")
+        if names.count(name) > 1:
+            raise ValueError(f"Duplicate evaluator name: {name!r}")
+    for spec in specs:
+        load_prompt(spec.prompt)
+    return specs
+
+
+def load_evaluators(spec: str) -> Tuple[EvaluatorSpec, ...]:
+    """Parse a registry from a JSON file path or inline JSON list."""
+    if os.path.exists(spec):
+        with open(spec, "r") as f:
+            raw = json.load(f)
+    else:
+        raw = json.loads(spec)
+    return validate(raw)
+
+
+def resolve_evaluators(config: Dict[str, Any]) -> Tuple[EvaluatorSpec, ...]:
+    """The registry for a build: ctx.config["evaluators"], then EVALUATORS, then the defaults."""
+    if config.get("evaluators"):
+        return validate(config["evaluators"])
+    env = os.getenv("EVALUATORS")
+    if env:
+        return load_evaluators(env)
+    return DEFAULT_EVALUATORS
@@ -1,14 +1,17 @@
-import json
 from core.state import EngineState
 from core.context import ExecutionContext
-from core.prompts import load_prompt
+from agents.evaluator import evaluate, aevaluate
+from agents.registry import DEFAULT_EVALUATORS
 
 """Technical evaluator agent.
 
 Assesses technical feasibility and returns a partial state patch with
-'technical_eval'.
+'technical_eval', via the generic evaluator (agents/evaluator.py).
 """
 
+SPEC = DEFAULT_EVALUATORS[2]
+
+
 def technical_evaluator(state: EngineState, context: ExecutionContext) -> EngineState:
     """Evaluate technical feasibility and return {'technical_eval': eval_result}.
 
@@ -18,33 +21,10 @@ def technical_evaluator(state: EngineState, context: ExecutionContext) -> Engine
 
     Output:
     - dict with 'technical_eval' key mapping to parsed EvalResult
-
-    Assumptions:
-    - The LLM returns valid JSON using the expected keys and casing.
     """
-    # Call the technical prompt and return {'technical_eval': ...}.
-    system_prompt = load_prompt("technical_eval.txt")
-
-    user_prompt = f"""
-    Evaluate the following B2B startup idea for its technical potential:
-    {json.dumps(state['brief'], indent=2)}
-    
-    Provide your evaluation in the following JSON format:
-    {{
-        "component": "technical",
-        "status": "PASS" or "KILL",
-        "confidence": float between 0 and 1,
-        "reason": "detailed explanation"
-    }}
-    """
-
-    raw_output = context.llm.generate(
-        system=system_prompt,
-        user=user_prompt
-    )
+    return evaluate(SPEC, state, context)
 
-    eval_result = json.loads(raw_output)
 
-    return {
-        "technical_eval": eval_result
-    }
\ No newline at end of file
+async def atechnical_evaluator(state: EngineState, context: ExecutionContext) -> EngineState:
+    """Async variant of technical_evaluator; awaits context.llm.agenerate instead of blocking."""
+    return await aevaluate(SPEC, state, context)
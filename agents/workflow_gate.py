@@ -1,7 +1,9 @@
-import json
-from core.state import EngineState, Status
+from core.state import EngineState, GateResult, Status
 from core.context import ExecutionContext
 from core.prompts import load_prompt
+from core.json_stream import complete_json, acomplete_json
+from core.results import result_from
+from core.brief import prepared
 
 """Workflow Reality Gate Agent.
 
@@ -12,53 +14,72 @@ It does NOT assess market size or business viability. It only asks:
 "Is this a real problem that happens frequently?"
 """
 
+GATE_INSTRUCTIONS = "Analyze this startup brief for Workflow Reality:\n\n"
+
+
+def _user_prompt(state: EngineState) -> str:
+    # Fixed instructions first, then the run's prepared brief (core/brief.py).
+    return GATE_INSTRUCTIONS + prepared(state).text
+
+
+def gate_patch(result) -> EngineState:
+    """Turn a gate verdict into a partial state patch.
+
+    Shared with the fused evaluator, which receives the gate verdict as one
+    section of a larger response; a plain dict is validated into a GateResult
+    (ValueError when it has no valid decision).
+    """
+    result = result_from(result, GateResult)
+    patch = {"workflow_gate_result": result}
+
+    # If the gate kills it, we can set judgment_status immediately
+    if result.decision == Status.KILL:
+        patch["judgment_status"] = Status.KILL
+        patch["final_decision"] = "KILL" # Sync for now
+
+    return patch
+
+
+def _parse_failure_patch() -> EngineState:
+    # Fallback for parse error
+    return {
+        "workflow_gate_result": GateResult(decision=Status.KILL, confidence=0.0, reason="Agent output parsing failed"),
+        "judgment_status": Status.KILL
+    }
+
+
 def workflow_gate(state: EngineState, context: ExecutionContext) -> EngineState:
-    """Evaluate if the brief describes a valid workflow problem."""
-    
+    """Evaluate if the brief describes a valid workflow problem.
+
+    Returns a partial state patch (workflow_gate_result, plus judgment_status
+    and final_decision on KILL) so the gate can share a graph step with the
+    evaluators under the speculative execution policy.
+    """
+
     brief = state.get("brief")
     if not brief:
         # Should not happen if brief is provided manually, but handle safety.
-        return state
+        return {}
 
     # Load prompt
     system_prompt = load_prompt("workflow_gate.txt")
 
-    # Format brief for the LLM
-    brief_str = json.dumps(brief, indent=2)
-    user_prompt = f"Analyze this startup brief for Workflow Reality:\n\n{brief_str}"
+    # Call LLM (streamed when enabled, see core/json_stream.py); parse and validate the verdict
+    try:
+        return gate_patch(complete_json(context, system_prompt, _user_prompt(state), "decision", GateResult))
+    except ValueError:
+        return _parse_failure_patch()
+
 
-    # Call LLM
-    raw_output = context.llm.generate(
-        system=system_prompt,
-        user=user_prompt
-    )
+async def aworkflow_gate(state: EngineState, context: ExecutionContext) -> EngineState:
+    """Async variant of workflow_gate; awaits context.llm.agenerate instead of blocking."""
+    brief = state.get("brief")
+    if not brief:
+        return {}
+
+    system_prompt = load_prompt("workflow_gate.txt")
 
-    # Parse output
     try:
-        result = json.loads(raw_output)
-        decision = result.get("decision") # "PASS" or "KILL"
-        reason = result.get("reason")
-        confidence = result.get("confidence")
-        
-        # Store result in state
-        state["workflow_gate_result"] = {
-            "decision": decision,
-            "reason": reason,
-            "confidence": confidence
-        }
-        
-        # If the gate kills it, we can set judgment_status immediately
-        if decision == "KILL":
-            state["judgment_status"] = Status.KILL
-            state["final_decision"] = "KILL" # Sync for now
-            
-    except json.JSONDecodeError:
-        # Fallback for parse error
-        state["workflow_gate_result"] = {
-            "decision": "KILL",
-            "reason": "Agent output parsing failed",
-            "confidence": 0.0
-        }
-        state["judgment_status"] = Status.KILL
-
-    return state
+        return gate_patch(await acomplete_json(context, system_prompt, _user_prompt(state), "decision", GateResult))
+    except ValueError:
+        return _parse_failure_patch()
@@ -0,0 +1,549 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from core.brief import prepare_brief
+from core.state import initial_state, final_state_view, new_run_id, stable_run_id
+from core.results import json_default
+from core import tracing
+from core.logger import dropped_records, write_shadow_log
+
+"""Batch evaluation over a stream of briefs.
+
+The graph is compiled once by the caller and shared by every run; briefs are
+pulled lazily from the input so memory stays bounded by the number of runs in
+flight, not by the size of the input file. Results are emitted in completion
+order as soon as each run finishes.
+
+run_batch drives graph.invoke from a thread pool (one OS thread per run in
+flight, plus the graph's own fan-out threads); arun_batch drives
+graph.ainvoke from a single event loop, so concurrency is bounded only by the
+semaphore, not by thread count.
+
+run_sharded_batch spreads the per-run CPU work (JSON parsing and encoding,
+prompt building, graph state merging, log serialization) over worker
+processes, since one interpreter tops out at a few hundred runs/sec however
+many runs are in flight:
+- the parent only reads input lines and writes output lines; chunks of raw
+  lines go to whichever worker asks next, and each worker parses, evaluates
+  (its own compiled graph and LLM client, driven like arun_batch) and
+  encodes the result line itself;
+- results are written in input order, one line per non-blank input line
+  (unparseable lines become iter_briefs' error records), buffering at most
+  a window of runs that finished ahead of an earlier one;
+- briefs without a run_id get stable_run_id(position, brief digest), so
+  re-running an input gives the same ids and, with a deterministic LLM, the
+  same output bytes whatever the worker count;
+- LLM_RPM / LLM_TPM become one budget shared by all workers through shared
+  memory (llm.rate_limited_llm.SharedRateLimits); LLM_MAX_IN_FLIGHT is
+  split between them. Shadow logs and tracing run per worker (segment names
+  carry the pid) and each worker's LLM usage is added to the parent's
+  role_stats() at the end.
+
+Resumable batches: pass a BatchManifest (main.py batch --manifest) and every
+finished run is appended to it as {position, run_id, status, origin}. Re-running
+the same input with the same manifest skips the positions already recorded
+ok and evaluates the rest (failed runs included), appending their results;
+bare briefs get stable_run_id(position, brief digest) as with sharding. With
+a checkpointer on as well (CHECKPOINT_DB, see core/checkpoint.py) the runs
+that were in flight when the batch died resume at the node where they
+stopped instead of starting over.
+"""
+
+
+class BatchManifest:
+    # Append-only JSONL record of finished batch positions, for resuming a batch.
+    def __init__(self, path: str, input_name: Optional[str] = None):
+        self.path = path
+        self.done: Dict[int, str] = {}
+        header = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from a killed batch; that run is redone.
+                        continue
+                    if "manifest" in entry:
+                        header = entry
+                    elif entry.get("status") == "ok":
+                        self.done[entry["position"]] = entry["run_id"]
+        if header and input_name and header.get("input") not in (None, input_name):
+            raise ValueError(f"Manifest {path} was written for {header['input']!r}, not {input_name!r}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._out = open(path, "a", encoding="utf-8")
+        if header is None:
+            self._append({"manifest": 1, "input": input_name})
+
+    def record(self, position: int, run_id: Optional[str], ok: bool, origin: Optional[str]) -> None:
+        """Append one finished run; flushed at once so a crash loses at most this line."""
+        if ok:
+            self.done[position] = run_id
+        self._append({"position": position, "run_id": run_id, "status": "ok" if ok else "error", "origin": origin})
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        self._out.write(json.dumps(entry) + "\n")
+        self._out.flush()
+
+    def close(self) -> None:
+        self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_briefs(
+    lines: Iterable[str],
+    start: int = 1
+) -> Iterator[Union[Tuple[Optional[str], Dict[str, Any]], Dict[str, Any]]]:
+    """Parse a JSONL stream into (run_id, brief) pairs.
+
+    Each non-blank line is either a bare brief object or an envelope of the
+    form {"run_id": ..., "brief": {...}}. Bare briefs get run_id None so a
+    fresh id is generated at run time. A line that is not a JSON object
+    yields its error record {"line": n, "error": ...} (n counts from start)
+    instead of a pair, and parsing continues.
+    """
+    for number, line in enumerate(lines, start):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield {"line": number, "error": f"{type(exc).__name__}: {exc}"}
+            continue
+        if not isinstance(record, dict):
+            yield {"line": number, "error": f"expected a JSON object, got {type(record).__name__}"}
+        elif isinstance(record.get("brief"), dict):
+            yield record.get("run_id"), record["brief"]
+        else:
+            yield None, record
+
+
+def result_record(state: Dict[str, Any]) -> Dict[str, Any]:
+    # One output line per run: the display view plus the gate verdict.
+    record = final_state_view(state)
+    record["workflow_gate"] = state.get("workflow_gate_result")
+    return record
+
+
+def run_batch(
+    graph,
+    briefs: Iterable[Tuple[Optional[str], Dict[str, Any]]],
+    on_result: Callable[[Dict[str, Any]], None],
+    concurrency: int = 8,
+    shadow_log: bool = True,
+    manifest: Optional[BatchManifest] = None
+) -> Dict[str, Any]:
+    """Evaluate every brief with one compiled graph and bounded concurrency.
+
+    Inputs:
+    - graph: compiled graph from build_graph(ctx), shared across runs
+    - briefs: iterable of (run_id, brief) pairs, consumed lazily; error
+      records from iter_briefs pass through to on_result as failures
+    - on_result: called once per finished run with a JSON-serializable record
+    - concurrency: maximum number of runs in flight
+    - shadow_log: write a shadow log per finished run
+    - manifest: skip the positions it has recorded ok and record the rest
+
+    Output:
+    - summary dict: total, succeeded, failed, dropped (shadow-log records
+      the writer had to drop), elapsed_s, briefs_per_sec (plus skipped with
+      a manifest)
+
+    Assumptions:
+    - A failing run is recorded with an 'error' key and does not stop the batch.
+    - on_result is only called from the calling thread.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+    # Imported here: core.checkpoint loads langgraph, which main defers.
+    from core.checkpoint import invoke_run
+
+    def evaluate(run_id, brief):
+        with tracing.span("run", run_id=run_id):
+            final_state, origin = invoke_run(graph, initial_state(brief, run_id))
+        if shadow_log and origin != "stored":
+            write_shadow_log(final_state)
+        return final_state, origin
+
+    total = succeeded = failed = 0
+    started = time.perf_counter()
+    dropped = dropped_records()
+    pending: Dict[Any, Tuple[int, str, Dict[str, Any]]] = {}
+
+    def finish(position, run_id, record, origin):
+        nonlocal succeeded, failed
+        if "error" in record:
+            failed += 1
+        else:
+            succeeded += 1
+        if manifest is not None:
+            manifest.record(position, run_id, "error" not in record, origin)
+        on_result(record)
+
+    def drain(done):
+        for future in done:
+            position, run_id, brief = pending.pop(future)
+            finish(position, run_id, *_finished_record(future, run_id, brief))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for position, run_id, brief in _positions(briefs, manifest):
+            total += 1
+            if run_id is None:
+                finish(position, None, brief, None)
+                continue
+            # Keep at most `concurrency` runs in flight; never read ahead further.
+            if len(pending) >= concurrency:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                drain(done)
+            pending[pool.submit(evaluate, run_id, brief)] = (position, run_id, brief)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            drain(done)
+
+    return _summary(total, succeeded, failed, started, manifest, dropped_records() - dropped)
+
+
+async def arun_batch(
+    graph,
+    briefs: Iterable[Tuple[Optional[str], Dict[str, Any]]],
+    on_result: Callable[[Dict[str, Any]], None],
+    concurrency: int = 64,
+    shadow_log: bool = True,
+    manifest: Optional[BatchManifest] = None
+) -> Dict[str, Any]:
+    """Async variant of run_batch driven by graph.ainvoke on the running loop.
+
+    Same inputs, outputs and failure handling as run_batch. Runs in flight
+    are tasks, not threads, so concurrency can be in the hundreds; shadow
+    logs are queued to the background writer so disk I/O never stalls other runs.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+    from core.checkpoint import ainvoke_run
+
+    async def evaluate(run_id, brief):
+        with tracing.span("run", run_id=run_id):
+            final_state, origin = await ainvoke_run(graph, initial_state(brief, run_id))
+        if shadow_log and origin != "stored":
+            write_shadow_log(final_state)
+        return final_state, origin
+
+    total = succeeded = failed = 0
+    started = time.perf_counter()
+    dropped = dropped_records()
+    pending: Dict[Any, Tuple[int, str, Dict[str, Any]]] = {}
+
+    def finish(position, run_id, record, origin):
+        nonlocal succeeded, failed
+        if "error" in record:
+            failed += 1
+        else:
+            succeeded += 1
+        if manifest is not None:
+            manifest.record(position, run_id, "error" not in record, origin)
+        on_result(record)
+
+    def drain(done):
+        for task in done:
+            position, run_id, brief = pending.pop(task)
+            finish(position, run_id, *_finished_record(task, run_id, brief))
+
+    for position, run_id, brief in _positions(briefs, manifest):
+        total += 1
+        if run_id is None:
+            finish(position, None, brief, None)
+            continue
+        if len(pending) >= concurrency:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            drain(done)
+        pending[asyncio.ensure_future(evaluate(run_id, brief))] = (position, run_id, brief)
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        drain(done)
+
+    return _summary(total, succeeded, failed, started, manifest, dropped_records() - dropped)
+
+
+def _positions(
+    briefs: Iterable[Any],
+    manifest: Optional[BatchManifest]
+) -> Iterator[Tuple[int, Optional[str], Dict[str, Any]]]:
+    # (position, run_id, brief) for each brief to run. With a manifest, done
+    # positions are skipped and bare briefs get stable ids so a resumed run
+    # finds its checkpoints; without one, bare briefs get fresh ids. Error
+    # records from iter_briefs keep their position and come out as
+    # (position, None, record).
+    for position, item in enumerate(briefs):
+        if manifest is not None and position in manifest.done:
+            continue
+        if isinstance(item, dict):
+            yield position, None, item
+            continue
+        run_id, brief = item
+        if manifest is None:
+            yield position, run_id or new_run_id(), brief
+        else:
+            yield position, run_id or stable_run_id(position, prepare_brief(brief).sha256), brief
+
+
+def _finished_record(future, run_id: str, brief: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    # (output record, origin); works for both concurrent.futures.Future and asyncio.Task.
+    try:
+        final_state, origin = future.result()
+        return result_record(final_state), origin
+    except Exception as exc:
+        return {"run_id": run_id, "brief": brief, "error": f"{type(exc).__name__}: {exc}"}, None
+
+
+def _summary(total: int, succeeded: int, failed: int, started: float,
+             manifest: Optional[BatchManifest] = None, dropped: int = 0) -> Dict[str, Any]:
+    elapsed = time.perf_counter() - started
+    summary = {
+        "total": total,
+        "succeeded": succeeded,
+        "failed": failed,
+        # Shadow-log records lost to a full writer queue (core/logger.py).
+        "dropped": dropped,
+        "elapsed_s": round(elapsed, 3),
+        "briefs_per_sec": round(total / elapsed, 2) if elapsed > 0 else 0.0
+    }
+    if manifest is not None:
+        summary["skipped"] = len(manifest.done) - succeeded
+    return summary
+
+
+def encode_record(record: Dict[str, Any]) -> str:
+    # Compact JSONL line; results become plain objects, odd objects fall back to str.
+    return json.dumps(record, ensure_ascii=False, default=json_default)
+
+
+def jsonl_writer(out: TextIO) -> Callable[[Dict[str, Any]], None]:
+    # One-record-per-line writer.
+    def write(record: Dict[str, Any]) -> None:
+        out.write(encode_record(record))
+        out.write("\n")
+    return write
+
+
+def run_sharded_batch(
+    lines: Iterable[str],
+    on_line: Callable[[str], None],
+    workers: Optional[int] = None,
+    concurrency: int = 64,
+    policy: Optional[str] = None,
+    shadow_log: bool = True,
+    chunk_size: int = 16,
+    start_method: str = "spawn",
+    manifest: Optional[BatchManifest] = None
+) -> Dict[str, Any]:
+    """Evaluate a JSONL stream of briefs across worker processes, in input order.
+
+    Inputs:
+    - lines: JSONL input as for iter_briefs, consumed lazily
+    - on_line: called in input order with each result's encoded JSONL line
+      (no newline)
+    - workers: worker processes (default: CPU count)
+    - concurrency: runs in flight per worker
+    - policy: execution policy for each worker's graph
+    - shadow_log: write a shadow log per finished run (from the workers)
+    - chunk_size: input lines per message to a worker
+    - start_method: multiprocessing start method; spawn keeps workers free of
+      the parent's threads
+    - manifest: as for run_batch; skipped positions produce no output line
+
+    Output:
+    - summary dict as run_batch's, plus workers
+
+    Assumptions:
+    - Workers build their LLM with llm.factory.get_llm from the environment.
+    - A worker that dies stops the batch with RuntimeError.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 1 or concurrency < 1 or chunk_size < 1:
+        raise ValueError("workers, concurrency and chunk_size must be >= 1")
+    ctx = multiprocessing.get_context(start_method)
+    options = {
+        "concurrency": concurrency,
+        "policy": policy,
+        "shadow_log": shadow_log,
+        "llm": _worker_llm_config(workers, ctx),
+    }
+    tasks, results = ctx.Queue(), ctx.Queue()
+    procs = [ctx.Process(target=_shard_worker, args=(tasks, results, options), daemon=True)
+             for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+
+    from llm.usage import role_stats
+    window = workers * concurrency * 2
+    total = succeeded = failed = finished = position = dropped = 0
+    ready: Dict[int, Optional[str]] = {}
+    started = time.perf_counter()
+
+    def receive(block: bool) -> bool:
+        # Handle one worker message; False when none arrived.
+        nonlocal succeeded, failed, finished, dropped
+        try:
+            message = results.get(timeout=1.0) if block else results.get_nowait()
+        except queue.Empty:
+            dead = [proc.exitcode for proc in procs if proc.exitcode not in (None, 0)]
+            if dead:
+                raise RuntimeError(f"Batch worker exited with code {dead[0]}")
+            return False
+        if message[0] == "done":
+            role_stats().merge(message[1])
+            dropped += message[2]
+            finished += 1
+            return True
+        _, done_position, line, ok, run_id, origin = message
+        ready[done_position] = line
+        if ok:
+            succeeded += 1
+        else:
+            failed += 1
+        if manifest is not None:
+            manifest.record(done_position, run_id, ok, origin)
+        return True
+
+    def emit() -> None:
+        nonlocal emitted
+        while emitted in ready:
+            line = ready.pop(emitted)
+            if line is not None:
+                on_line(line)
+            emitted += 1
+
+    emitted = 0
+    chunk: List[Tuple[int, int, str]] = []
+    try:
+        for number, raw in enumerate(lines, 1):
+            raw = raw.strip()
+            if not raw:
+                continue
+            position += 1
+            if manifest is not None and position - 1 in manifest.done:
+                ready[position - 1] = None
+                continue
+            chunk.append((position - 1, number, raw))
+            total += 1
+            if len(chunk) >= chunk_size:
+                tasks.put(chunk)
+                chunk = []
+                while receive(block=False):
+                    pass
+                # Read ahead at most a window past the oldest unwritten run.
+                while position - emitted >= window:
+                    receive(block=True)
+                    emit()
+                emit()
+        if chunk:
+            tasks.put(chunk)
+        for _ in procs:
+            tasks.put(None)
+        while emitted < position or finished < len(procs):
+            receive(block=True)
+            emit()
+        for proc in procs:
+            proc.join()
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+
+    summary = _summary(total, succeeded, failed, started, manifest, dropped)
+    summary["workers"] = workers
+    return summary
+
+
+def _worker_llm_config(workers: int, ctx) -> Dict[str, Any]:
+    # get_llm settings for each worker: shared RPM/TPM buckets, a share of the in-flight cap.
+    config: Dict[str, Any] = {}
+    rpm, tpm = os.getenv("LLM_RPM"), os.getenv("LLM_TPM")
+    if rpm or tpm:
+        from llm.rate_limited_llm import SharedRateLimits
+        config["rate_limits"] = SharedRateLimits(
+            requests_per_minute=float(rpm) if rpm else None,
+            tokens_per_minute=float(tpm) if tpm else None,
+            ctx=ctx
+        )
+    in_flight = os.getenv("LLM_MAX_IN_FLIGHT")
+    if in_flight:
+        config["max_in_flight"] = max(1, -(-int(in_flight) // workers))
+    return config
+
+
+def _shard_worker(tasks, results, options: Dict[str, Any]) -> None:
+    # Worker process body: own LLM client and compiled graph, then serve chunks until None.
+    from core.context import ExecutionContext
+    from graph import build_graph
+    from llm.factory import get_llm
+    from llm.usage import role_stats
+
+    graph = build_graph(ExecutionContext(llm=get_llm(options["llm"])), policy=options["policy"])
+    asyncio.run(_serve_shard(graph, tasks, results, options["concurrency"], options["shadow_log"]))
+    # Shadow-log segments are finalized by the writer's exit hook.
+    results.put(("done", role_stats().totals(), dropped_records()))
+
+
+async def _serve_shard(graph, tasks, results, concurrency: int, shadow_log: bool) -> None:
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+
+    async def run(position: int, number: int, raw: str) -> None:
+        try:
+            line, ok, run_id, origin = await _evaluate_line(graph, position, number, raw, shadow_log)
+            results.put(("run", position, line, ok, run_id, origin))
+        finally:
+            slots.release()
+
+    while True:
+        # Blocking queue reads happen off the loop, so runs in flight keep going.
+        chunk = await loop.run_in_executor(None, tasks.get)
+        if chunk is None:
+            break
+        for position, number, raw in chunk:
+            await slots.acquire()
+            task = asyncio.ensure_future(run(position, number, raw))
+            running.add(task)
+            task.add_done_callback(running.discard)
+    if running:
+        await asyncio.gather(*running)
+
+
+async def _evaluate_line(graph, position: int, number: int, raw: str,
+                         shadow_log: bool) -> Tuple[str, bool, Optional[str], Optional[str]]:
+    # Input line `number` to (encoded result line, succeeded, run_id, origin).
+    from core.checkpoint import ainvoke_run
+    item = next(iter_briefs([raw], start=number))
+    if isinstance(item, dict):
+        return encode_record(item), False, None, None
+    run_id, brief = item
+    try:
+        prepared = prepare_brief(brief)
+        run_id = run_id or stable_run_id(position, prepared.sha256)
+        with tracing.span("run", run_id=run_id):
+            final_state, origin = await ainvoke_run(graph, initial_state(brief, run_id, prepared))
+        if shadow_log and origin != "stored":
+            write_shadow_log(final_state)
+        return encode_record(result_record(final_state)), True, run_id, origin
+    except Exception as exc:
+        record = {"run_id": run_id, "brief": brief, "error": f"{type(exc).__name__}: {exc}"}
+        return encode_record(record), False, run_id, None
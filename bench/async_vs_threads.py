@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import threading
+import time
+
+from batch import run_batch, arun_batch
+from core.context import ExecutionContext
+from graph import build_graph
+from llm.mock_llm import MockLLM
+
+"""In-flight evaluations versus OS threads: sync (thread pool) vs asyncio path.
+
+A MockLLM with a fixed network-like delay stands in for the provider so the
+comparison isolates orchestration cost. For each concurrency level the same
+batch runs through run_batch (graph.invoke) and arun_batch (graph.ainvoke);
+a sampler records the peak number of live threads during each run.
+
+Usage: python -m bench.async_vs_threads --latency 0.2 --levels 10 50 200
+"""
+
+class DelayedMockLLM(MockLLM):
+    # MockLLM that waits like a network call before answering.
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate(self, system: str, user: str) -> str:
+        time.sleep(self.latency)
+        return super().generate(system, user)
+
+    async def agenerate(self, system: str, user: str) -> str:
+        await asyncio.sleep(self.latency)
+        return super().generate(system, user)
+
+
+class ThreadSampler:
+    # Polls threading.active_count() in the background and keeps the peak.
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def briefs(n: int):
+    return [(None, {"concept_hook": f"Bench idea {i}"}) for i in range(n)]
+
+
+def measure(latency: float, level: int, runs_per_level: int):
+    graph = build_graph(ExecutionContext(llm=DelayedMockLLM(latency)))
+    n = max(level, runs_per_level)
+    rows = []
+
+    with ThreadSampler() as sampler:
+        summary = run_batch(graph, briefs(n), lambda r: None, concurrency=level, shadow_log=False)
+    rows.append(("threads", level, sampler.peak, summary["briefs_per_sec"]))
+
+    with ThreadSampler() as sampler:
+        summary = asyncio.run(arun_batch(graph, briefs(n), lambda r: None, concurrency=level, shadow_log=False))
+    rows.append(("asyncio", level, sampler.peak, summary["briefs_per_sec"]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-flight evaluations vs OS threads")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated seconds per LLM call")
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 50, 200], help="Runs in flight")
+    parser.add_argument("--runs", type=int, default=200, help="Minimum briefs per measurement")
+    args = parser.parse_args()
+
+    print(f"{'path':<8} {'in_flight':>9} {'peak_threads':>12} {'briefs/sec':>11}")
+    for level in args.levels:
+        for path, in_flight, peak, rate in measure(args.latency, level, args.runs):
+            print(f"{path:<8} {in_flight:>9} {peak:>12} {rate:>11}")
+
+
+if __name__ == "__main__":
+    main()
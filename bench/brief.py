@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from agents.evaluator import user_prompt
+from agents.registry import DEFAULT_EVALUATORS
+from agents.workflow_gate import _user_prompt as gate_user_prompt
+from core.prompts import load_prompt
+from core.state import initial_state
+from llm.usage import estimate_tokens
+
+"""Prompt building with a prepared brief versus per-agent serialization.
+
+Before the prepared brief (core/brief.py) every agent called
+json.dumps(brief, indent=2) itself and wrapped it in its own f-string, with
+the evaluators' format instructions after the brief. Two measurements, for
+the gate plus the three evaluators on briefs carrying --notes research
+notes of --note-chars characters:
+
+- build: time and traced allocation (tracemalloc peak) to build one run's
+  four user prompts, and serializations per run
+- prompt cache: input tokens a provider prefix cache would serve. Each
+  brief is evaluated twice, the second time with its keys in another order
+  (the same brief re-submitted by a different client or reloaded from a
+  log). The cache model follows OpenAI's: an exact prefix match of at least
+  1024 tokens, counted in 128-token steps; 4 characters per token.
+
+Usage: python -m bench.brief --briefs 50 --notes 20 --note-chars 400
+"""
+
+AGENTS = ["workflow_gate"] + [spec.key for spec in DEFAULT_EVALUATORS]
+SYSTEM = {"workflow_gate": "workflow_gate.txt", **{spec.key: spec.prompt for spec in DEFAULT_EVALUATORS}}
+
+
+def legacy_prompts(brief) -> Dict[str, str]:
+    # The per-agent prompt construction the prepared brief replaced.
+    prompts = {"workflow_gate": f"Analyze this startup brief for Workflow Reality:\n\n{json.dumps(brief, indent=2)}"}
+    for spec in DEFAULT_EVALUATORS:
+        prompts[spec.key] = f"""
+    Evaluate the following B2B startup idea for its {spec.name} potential:
+    {json.dumps(brief, indent=2)}
+
+    Provide your evaluation in the following JSON format:
+    {{
+        "component": "{spec.name}",
+        "status": "PASS" or "KILL",
+        "confidence": float between 0 and 1,
+        "reason": "detailed explanation"
+    }}
+    """
+    return prompts
+
+
+def prepared_prompts(brief) -> Dict[str, str]:
+    state = initial_state(brief, "run_bench")
+    prompts = {"workflow_gate": gate_user_prompt(state)}
+    for spec in DEFAULT_EVALUATORS:
+        prompts[spec.key] = user_prompt(spec, state)
+    return prompts
+
+
+def make_briefs(count: int, notes: int, note_chars: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    words = ["ledger", "invoice", "approval", "vendor", "reconcile", "audit", "workflow", "spend", "close", "policy"]
+
+    def text(chars):
+        out = []
+        while sum(len(w) + 1 for w in out) < chars:
+            out.append(rng.choice(words))
+        return " ".join(out)
+
+    return [{
+        "concept_hook": f"Idea {i}: {text(40)}",
+        "target_customer": text(30),
+        "core_pain_point": text(120),
+        "mechanism": text(120),
+        "monetization": text(60),
+        "why_now": text(80),
+        "distribution_channel": text(40),
+        "research_notes": [text(note_chars) for _ in range(notes)],
+    } for i in range(count)]
+
+
+def reordered(brief: dict, seed: int) -> dict:
+    items = list(brief.items())
+    random.Random(seed).shuffle(items)
+    return dict(items)
+
+
+def measure_build(build: Callable, briefs: List[dict]) -> Dict[str, float]:
+    started = time.perf_counter()
+    for brief in briefs:
+        build(brief)
+    elapsed = time.perf_counter() - started
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for brief in briefs:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            prompts = build(brief)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            del prompts
+    finally:
+        tracemalloc.stop()
+    return {"us_per_run": elapsed / len(briefs) * 1e6, "peak_kib": sum(peaks) / len(peaks) / 1024}
+
+
+def cached_tokens(prefix_chars: int) -> int:
+    tokens = prefix_chars // 4
+    return 0 if tokens < 1024 else tokens // 128 * 128
+
+
+def measure_cache(build: Callable, briefs: List[dict]) -> Dict[str, float]:
+    seen: Dict[str, List[str]] = {agent: [] for agent in AGENTS}
+    total = cached = 0
+    for i, brief in enumerate([*briefs, *(reordered(b, i) for i, b in enumerate(briefs))]):
+        for agent, user in build(brief).items():
+            prompt = load_prompt(SYSTEM[agent]) + user
+            total += estimate_tokens(prompt)
+            match = max((len(os.path.commonprefix([prompt, earlier])) for earlier in seen[agent]), default=0)
+            cached += cached_tokens(match)
+            seen[agent].append(prompt)
+    return {"input_tokens": total, "cached_tokens": cached, "cached_pct": 100.0 * cached / total if total else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepared brief: prompt build cost and prefix-cache hits")
+    parser.add_argument("--briefs", type=int, default=50)
+    parser.add_argument("--notes", type=int, default=20, help="Research notes per brief")
+    parser.add_argument("--note-chars", type=int, default=400)
+    args = parser.parse_args()
+
+    briefs = make_briefs(args.briefs, args.notes, args.note_chars)
+    print(f"brief size: {len(json.dumps(briefs[0], indent=2))} chars")
+    print(f"\n{'layout':<10} {'dumps/run':>9} {'us/run':>8} {'peak KiB':>9} {'input tok':>10} {'cached tok':>10} {'cached':>7}")
+    for name, build, dumps in (("legacy", legacy_prompts, len(AGENTS)), ("prepared", prepared_prompts, 1)):
+        row = {**measure_build(build, briefs), **measure_cache(build, briefs)}
+        print(f"{name:<10} {dumps:>9} {row['us_per_run']:>8.0f} {row['peak_kib']:>9.1f} "
+              f"{row['input_tokens']:>10} {row['cached_tokens']:>10} {row['cached_pct']:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import os
+import tempfile
+import time
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from bench.brief import make_briefs
+from core.checkpoint import SqliteCheckpointSaver, invoke_run
+from core.context import ExecutionContext
+from core.state import initial_state
+from graph import build_graph
+from llm.mock_llm import MockLLM
+
+"""Per-run and per-write cost of checkpointing (core/checkpoint.py).
+
+Runs the same briefs through the graph with no checkpointer, with
+langgraph's InMemorySaver and with SqliteCheckpointSaver, one run at a time
+on the sync path with the mock LLM, so the difference is the checkpoint
+work itself: serializing the state, the per-node writes and (for sqlite)
+the commits. Each saver is wrapped to count put (one per superstep) and
+put_writes (one per finished node) calls; the table prints runs/sec, the
+added cost per run and per write, and the sqlite file size per run.
+
+Usage: python -m bench.checkpoint --briefs 500 --notes 5 --policy strict
+"""
+
+
+def counting(cls):
+    # Subclass of a saver that counts checkpoint and node-write calls.
+    class Counting(cls):
+        puts = writes = 0
+
+        def put(self, *args, **kwargs):
+            Counting.puts += 1
+            return super().put(*args, **kwargs)
+
+        def put_writes(self, *args, **kwargs):
+            Counting.writes += 1
+            return super().put_writes(*args, **kwargs)
+
+    return Counting
+
+
+def run(graph, briefs, prefix):
+    started = time.perf_counter()
+    for i, brief in enumerate(briefs):
+        invoke_run(graph, initial_state(brief, f"{prefix}_{i}"))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkpoint overhead per run and per node (mock LLM)")
+    parser.add_argument("--briefs", type=int, default=500)
+    parser.add_argument("--notes", type=int, default=5, help="Research notes per brief")
+    parser.add_argument("--note-chars", type=int, default=200)
+    parser.add_argument("--policy", default="strict")
+    args = parser.parse_args()
+
+    briefs = make_briefs(args.briefs, args.notes, args.note_chars)
+    path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    savers = {
+        "none": None,
+        "memory": counting(InMemorySaver)(),
+        "sqlite": counting(SqliteCheckpointSaver)(path),
+    }
+
+    # Warm-up: imports, prompt rendering caches, the serializer.
+    warm = build_graph(ExecutionContext(llm=MockLLM()), policy=args.policy)
+    run(warm, briefs[:20], "warm")
+
+    baseline = None
+    print(f"{args.briefs} briefs, policy {args.policy}")
+    print(f"{'saver':<8} {'runs/s':>9} {'+µs/run':>9} {'puts/run':>9} {'writes/run':>11} {'µs/call':>8} {'bytes/run':>10}")
+    for name, saver in savers.items():
+        config = {"checkpointer": saver} if saver is not None else {}
+        graph = build_graph(ExecutionContext(llm=MockLLM(), config=config), policy=args.policy)
+        elapsed = run(graph, briefs, name)
+        per_run = elapsed / args.briefs * 1e6
+        baseline = per_run if baseline is None else baseline
+        row = f"{name:<8} {args.briefs / elapsed:>9.1f} {per_run - baseline:>9.0f}"
+        if saver is not None:
+            calls = type(saver).puts + type(saver).writes
+            row += (f" {type(saver).puts / args.briefs:>9.1f} {type(saver).writes / args.briefs:>11.1f}"
+                    f" {(per_run - baseline) * args.briefs / calls:>8.0f}")
+        if name == "sqlite":
+            saver.close()
+            size = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+            row += f" {size / args.briefs:>10.0f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
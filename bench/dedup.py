@@ -0,0 +1,147 @@
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from array import array
+from typing import List, Tuple
+
+from core.dedup import DEFAULT_THRESHOLD, BriefIndex
+
+"""Near-duplicate lookup latency, memory and match quality (core/dedup.py).
+
+Builds a BriefIndex of --briefs generated briefs, padded with --filler
+random signatures to reach production index sizes without fingerprinting
+millions of briefs, then looks up three kinds of briefs:
+
+- reworded: an indexed brief with a new concept_hook and one word changed
+  in the pain point (should match)
+- related: same target customer, different pain point and mechanism
+  (should not match)
+- fresh: unrelated briefs (should not match)
+
+Reported: fingerprint and index lookup time separately (mean / p50 / p99),
+build time, traced memory per entry (measured on a separate index of
+--memory-sample entries, since tracing slows the build), and recall /
+false-positive rate and mean best similarity at --threshold.
+
+Usage: python -m bench.dedup --briefs 20000 --filler 1000000 --probes 2000
+"""
+
+
+def vocabulary(rng: random.Random, size: int = 4000) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+
+
+def make_brief(rng: random.Random, words: List[str], customer: str = None) -> dict:
+    def text(low, high):
+        return " ".join(rng.choice(words) for _ in range(rng.randint(low, high)))
+
+    return {
+        "concept_hook": text(5, 10),
+        "target_customer": customer or text(3, 6),
+        "core_pain_point": text(15, 30),
+        "mechanism": text(15, 30),
+        "monetization": text(6, 12),
+        "why_now": text(8, 16),
+        "distribution_channel": text(4, 8),
+    }
+
+
+def reworded(rng: random.Random, words: List[str], brief: dict) -> dict:
+    pain = brief["core_pain_point"].split()
+    pain[rng.randrange(len(pain))] = rng.choice(words)
+    hook = " ".join(rng.choice(words) for _ in range(rng.randint(5, 10)))
+    return {**brief, "concept_hook": hook, "core_pain_point": " ".join(pain)}
+
+
+def timings(values: List[float]) -> str:
+    values = sorted(values)
+    p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+    return (f"mean {statistics.mean(values) * 1e6:7.1f}us  p50 {values[len(values) // 2] * 1e6:7.1f}us  "
+            f"p99 {p99 * 1e6:7.1f}us")
+
+
+def probe(index: BriefIndex, briefs: List[dict], threshold: float) -> Tuple[List[float], List[float], List]:
+    fingerprint, lookup, matches = [], [], []
+    for brief in briefs:
+        started = time.perf_counter()
+        signature = index.hasher.signature(brief)
+        hashed = time.perf_counter()
+        with index._lock:
+            match = index._best(signature, threshold)
+        fingerprint.append(hashed - started)
+        lookup.append(time.perf_counter() - hashed)
+        matches.append(match)
+    return fingerprint, lookup, matches
+
+
+def random_signature(rng: random.Random, num_perm: int) -> array:
+    return array("H", rng.getrandbits(16 * num_perm).to_bytes(2 * num_perm, "little"))
+
+
+def memory_per_entry(rng: random.Random, count: int) -> float:
+    index = BriefIndex()
+    signatures = [random_signature(rng, index.hasher.num_perm) for _ in range(count)]
+    tracemalloc.start()
+    for i, signature in enumerate(signatures):
+        index.add(None, f"run_{i:012d}", "KILL", signature=signature)
+    index.compact()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate index: latency, memory, quality")
+    parser.add_argument("--briefs", type=int, default=20000, help="Generated briefs fingerprinted into the index")
+    parser.add_argument("--filler", type=int, default=200000, help="Extra random signatures (index size)")
+    parser.add_argument("--probes", type=int, default=1000, help="Lookups per probe kind")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--memory-sample", type=int, default=50000, help="Entries traced for memory per entry")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = vocabulary(rng)
+    briefs = [make_brief(rng, words) for _ in range(args.briefs)]
+
+    index = BriefIndex()
+    started = time.perf_counter()
+    for i, brief in enumerate(briefs):
+        index.add(brief, f"run_{i}", "PASS" if i % 3 == 0 else "KILL")
+    fingerprinted = time.perf_counter() - started
+    for i in range(args.filler):
+        index.add(None, f"filler_{i}", "KILL", signature=random_signature(rng, index.hasher.num_perm))
+    index.compact()
+    built = time.perf_counter() - started
+    per_entry = memory_per_entry(rng, args.memory_sample)
+
+    print(f"index: {len(index)} entries ({args.briefs} briefs + {args.filler} filler), built in {built:.1f}s "
+          f"({fingerprinted / max(args.briefs, 1) * 1e3:.2f} ms per brief fingerprinted)")
+    print(f"memory: {per_entry:.0f} bytes per entry (~{per_entry * len(index) / 2 ** 20:.0f} MiB at this size)")
+
+    targets = rng.sample(range(args.briefs), min(args.probes, args.briefs))
+    kinds = {
+        "reworded": [reworded(rng, words, briefs[i]) for i in targets],
+        "related": [make_brief(rng, words, customer=briefs[i]["target_customer"]) for i in targets],
+        "fresh": [make_brief(rng, words) for _ in targets],
+    }
+    print(f"\nthreshold {args.threshold}")
+    for kind, probes in kinds.items():
+        fingerprint, lookup, matches = probe(index, probes, args.threshold)
+        if kind == "reworded":
+            hits = sum(1 for i, match in zip(targets, matches) if match and match.run_id == f"run_{i}")
+            quality = f"recall {hits / len(probes):.3f}"
+        else:
+            quality = f"false positives {sum(1 for match in matches if match) / len(probes):.3f}"
+        best = [index._best(index.hasher.signature(brief), 0.0) for brief in probes[:200]]
+        mean = statistics.mean(match.similarity if match else 0.0 for match in best)
+        print(f"{kind:<9} {quality}  mean best similarity {mean:.2f}")
+        print(f"  fingerprint {timings(fingerprint)}")
+        print(f"  lookup      {timings(lookup)}")
+
+
+if __name__ == "__main__":
+    main()
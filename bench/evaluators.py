@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from agents.registry import DEFAULT_EVALUATORS, EvaluatorSpec
+from core.context import ExecutionContext
+from core.state import initial_state
+from graph import build_graph
+from llm.mock_llm import LatencyProfile, MockLLM
+from llm.usage import metered
+
+"""Wall-clock time per decision against the number of evaluators.
+
+The registry is widened from the default three with synthetic dimensions
+("extra_1", ...) that reuse the built-in prompt files, so the mock answers
+them like the originals (PASS on the benchmark brief). Every call costs a
+mock round-trip of --latency-ms (lognormal jitter, seeded), so the numbers
+show what the fan-out buys: with parallel evaluators a wider panel costs
+the slowest of N calls rather than N calls in a row.
+
+Usage: python -m bench.evaluators --counts 3 6 10 --latency-ms 200 --runs 10
+"""
+
+BRIEF = {"concept_hook": "Invoice matching for AP teams", "target_customer": "Finance ops"}
+
+
+def registry(count: int) -> List[EvaluatorSpec]:
+    specs = list(DEFAULT_EVALUATORS[:count])
+    for i in range(count - len(specs)):
+        base = DEFAULT_EVALUATORS[i % len(DEFAULT_EVALUATORS)]
+        specs.append(EvaluatorSpec(f"extra_{i + 1}", base.prompt))
+    return specs
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+async def measure(policy: str, count: int, profile: LatencyProfile, runs: int) -> Dict[str, float]:
+    llm = MockLLM({"default": profile}, seed=0)
+    graph = build_graph(ExecutionContext(llm=llm, config={"evaluators": registry(count)}), policy=policy)
+    latencies, calls = [], []
+    # One run at a time: the question is per-decision latency, not throughput.
+    for i in range(runs):
+        started = time.perf_counter()
+        with metered() as meter:
+            state = await graph.ainvoke(initial_state(BRIEF, f"run_{i}"))
+        assert state["final_decision"] == "BUILD"
+        latencies.append(time.perf_counter() - started)
+        calls.append(meter.snapshot()["calls"])
+    return {
+        "mean_ms": sum(latencies) / runs * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "calls": sum(calls) / runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decision latency against evaluator count")
+    parser.add_argument("--counts", nargs="*", type=int, default=[3, 6, 10])
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--spread", type=float, default=0.25, help="Lognormal sigma of the mock latency")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--policies", nargs="*", default=["strict", "short-circuit", "fused"])
+    args = parser.parse_args()
+
+    profile = LatencyProfile(p50_ms=args.latency_ms, spread=args.spread)
+    print(f"{'policy':<14} {'evaluators':>10} {'calls':>6} {'mean_ms':>8} {'p95_ms':>8} {'vs first':>9} {'sequential':>11}")
+    for policy in args.policies:
+        first = None
+        for count in args.counts:
+            row = asyncio.run(measure(policy, count, profile, args.runs))
+            first = first or row["mean_ms"]
+            # What the same calls would cost one after another.
+            sequential = row["calls"] * args.latency_ms
+            print(f"{policy:<14} {count:>10} {row['calls']:>6.0f} {row['mean_ms']:>8.0f} {row['p95_ms']:>8.0f} "
+                  f"{row['mean_ms'] / first:>8.2f}x {sequential:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.stub_server import StubServer
+from llm.openai_llm import OpenAILLM
+
+"""Requests/sec with the pooled OpenAI client versus a fresh client per run.
+
+"fresh" mirrors the old behaviour: every run constructs OpenAILLM with its
+own client (and connection pool), uses it for one evaluation's worth of
+calls, and throws it away. "pooled" reuses the process-wide client. Both hit
+a local stub server over plain HTTP, so TLS handshake savings against the
+real API come on top of what is measured here.
+
+Usage: python -m bench.http_pool --runs 200 --workers 8
+"""
+
+CALLS_PER_RUN = 4  # gate + three evaluators
+
+
+def one_run(shared: bool):
+    llm = OpenAILLM(shared=shared)
+    for _ in range(CALLS_PER_RUN):
+        llm.generate(system="MARKET", user="{}")
+    llm.close()
+
+
+def measure(shared: bool, runs: int, workers: int, server: StubServer):
+    before = server.connections
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda _: one_run(shared), range(runs)))
+    elapsed = time.perf_counter() - started
+    return runs * CALLS_PER_RUN / elapsed, server.connections - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pooled vs fresh OpenAI client throughput")
+    parser.add_argument("--runs", type=int, default=200, help="Evaluations per mode")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent evaluations")
+    parser.add_argument("--delay", type=float, default=0.0, help="Stub server delay per request (s)")
+    args = parser.parse_args()
+
+    with StubServer(delay=args.delay) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+        # Warm up imports and the shared pool so both modes start equal.
+        one_run(True)
+
+        print(f"{'client':<8} {'requests/sec':>12} {'tcp_connections':>15}")
+        for label, shared in (("fresh", False), ("pooled", True)):
+            rate, connections = measure(shared, args.runs, args.workers, server)
+            print(f"{label:<8} {rate:>12.1f} {connections:>15}")
+
+
+if __name__ == "__main__":
+    main()
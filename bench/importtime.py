@@ -0,0 +1,99 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+"""Import-time regression check (python -X importtime).
+
+Each scenario runs in a fresh interpreter with LLM_PROVIDER=mock; the
+importtime trace on stderr is parsed into total import time, the heaviest
+top-level packages (self time summed per package) and the modules that
+must stay unloaded on that path (the OpenAI SDK for mock runs). The best of
+--repeat runs is reported to keep filesystem-cache noise out.
+
+Scenarios:
+- cli:    import main (what index/query/--help pay)
+- mock:   import main and build the mock-provider graph (what a
+          `python main.py batch` run pays before its first brief)
+
+Exit status is 1 when a scenario exceeds its budget or loads a forbidden
+module, so the check can gate CI.
+
+Usage: python -m bench.importtime --budget-ms cli=300 mock=1500
+"""
+
+SCENARIOS = {
+    "cli": "import main",
+    "mock": "import main; main.build_engine()",
+}
+
+DEFAULT_BUDGET_MS = {"cli": 300.0, "mock": 1500.0}
+
+# Modules a scenario must not import.
+FORBIDDEN = {"cli": ("openai", "langgraph"), "mock": ("openai",)}
+
+
+def parse_importtime(trace: str) -> Tuple[float, Dict[str, float]]:
+    """(total ms, {module: self ms}) from a -X importtime trace."""
+    total_us, self_us = 0, {}
+    for line in trace.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        module = name.strip()
+        self_us[module] = int(own)
+        # Top-level entries (no indentation) sum to the whole import time.
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000, {module: us / 1000 for module, us in self_us.items()}
+
+
+def by_package(self_ms: Dict[str, float]) -> List[Tuple[str, float]]:
+    packages: Dict[str, float] = {}
+    for module, ms in self_ms.items():
+        package = module.split(".", 1)[0]
+        packages[package] = packages.get(package, 0.0) + ms
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def measure(code: str) -> Tuple[float, Dict[str, float]]:
+    env = {**os.environ, "LLM_PROVIDER": "mock", "TRACING": "0"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(proc.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument("--only", nargs="*", choices=SCENARIOS, help="Scenarios to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario; the fastest counts")
+    parser.add_argument("--budget-ms", nargs="*", default=[], metavar="SCENARIO=MS", help="Override budgets")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest packages to list")
+    args = parser.parse_args(argv)
+
+    budgets = dict(DEFAULT_BUDGET_MS)
+    for item in args.budget_ms:
+        name, _, ms = item.partition("=")
+        budgets[name] = float(ms)
+
+    failed = False
+    for name in args.only or SCENARIOS:
+        total, self_ms = min((measure(SCENARIOS[name]) for _ in range(args.repeat)), key=lambda run: run[0])
+        loaded = [module for module in FORBIDDEN.get(name, ()) if module in self_ms]
+        over = total > budgets[name]
+        failed |= over or bool(loaded)
+
+        status = "FAIL" if over or loaded else "ok"
+        print(f"[{status}] {name}: {total:.1f} ms (budget {budgets[name]:.0f} ms)")
+        if loaded:
+            print(f"  forbidden modules imported: {', '.join(loaded)}")
+        for package, ms in by_package(self_ms)[:args.top]:
+            print(f"  {package:<24} {ms:8.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from llm.mock_llm import MockLLM
+from core.context import ExecutionContext
+from core.state import initial_state
+from graph import build_graph, POLICIES
+
+"""Latency and token spend per execution policy, relative to strict.
+
+Each calibration brief runs through every policy via graph.ainvoke with a
+simulated provider latency: a round-trip cost drawn uniformly from
+[0.5, 1.5] x --latency (seeded, so every policy sees the same sequence) plus
+--per-token seconds per completion token, so the longer output of a fused
+call is not free. Token spend is estimated at 4 characters per token: input
+(prompt) tokens are charged when a call starts (a cancelled request has
+already been sent), output tokens only when it returns.
+
+Usage: python -m bench.policies --latency 0.1 --per-token 0.0025 --repeat 5
+"""
+
+class MeteredLLM(MockLLM):
+    # Jittered-latency mock that counts calls and estimated tokens,
+    # including calls that get cancelled.
+    def __init__(self, latency: float, per_token: float = 0.0, seed: int = 7):
+        self.latency = latency
+        self.per_token = per_token
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.cancelled = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    async def agenerate(self, system: str, user: str) -> str:
+        self.calls += 1
+        self.input_tokens += (len(system) + len(user)) // 4
+        output = self.generate(system, user)
+        try:
+            await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5) + self.per_token * (len(output) // 4))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        self.output_tokens += len(output) // 4
+        return output
+
+
+async def run_policy(policy: str, briefs, latency: float, per_token: float = 0.0):
+    llm = MeteredLLM(latency, per_token)
+    graph = build_graph(ExecutionContext(llm=llm), policy)
+    latencies, decisions = [], []
+    for brief in briefs:
+        started = time.perf_counter()
+        final_state = await graph.ainvoke(initial_state(brief))
+        latencies.append(time.perf_counter() - started)
+        decisions.append(final_state.get("final_decision"))
+    runs = len(briefs)
+    return {
+        "policy": policy,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": sorted(latencies)[int(0.95 * (runs - 1))] * 1000,
+        "calls_per_run": llm.calls / runs,
+        "cancelled_per_run": llm.cancelled / runs,
+        "input_tokens_per_run": llm.input_tokens / runs,
+        "tokens_per_run": (llm.input_tokens + llm.output_tokens) / runs,
+        "decisions": decisions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and token spend per execution policy")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated seconds per LLM call")
+    parser.add_argument("--per-token", type=float, default=0.0025, help="Simulated seconds per output token")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the calibration set")
+    args = parser.parse_args()
+
+    with open("tests/calibration_set.json", "r") as f:
+        briefs = [case["brief"] for case in json.load(f)] * args.repeat
+
+    results = [asyncio.run(run_policy(policy, briefs, args.latency, args.per_token)) for policy in POLICIES]
+    baseline = results[0]
+
+    print(f"{'policy':<14} {'mean_ms':>8} {'p95_ms':>8} {'calls':>6} {'cancel':>6} {'in_tok':>7} {'tokens':>7} {'latency_saved':>13} {'tokens_saved':>12} {'same':>5}")
+    for row in results:
+        latency_saved = 1 - row["mean_ms"] / baseline["mean_ms"]
+        tokens_saved = 1 - row["tokens_per_run"] / baseline["tokens_per_run"]
+        same = row["decisions"] == baseline["decisions"]
+        print(
+            f"{row['policy']:<14} {row['mean_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['calls_per_run']:>6.2f} {row['cancelled_per_run']:>6.2f} {row['input_tokens_per_run']:>7.0f} {row['tokens_per_run']:>7.0f} "
+            f"{latency_saved:>13.1%} {tokens_saved:>12.1%} {str(same):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
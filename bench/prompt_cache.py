@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import os
+
+from bench.brief import make_briefs, reordered
+from bench.stub_server import StubServer
+from core.context import ExecutionContext
+from core.state import initial_state
+from graph import build_graph
+from llm.openai_llm import OpenAILLM
+from llm.usage import format_role_stats, role_stats
+
+"""Per-role prompt-cache hits, cost and latency through the OpenAI client.
+
+Runs the strict graph with OpenAILLM against the local stub endpoint
+(bench/stub_server.py), which reports cached prompt tokens the way OpenAI
+does (an exact prefix of at least 1024 tokens, 128-token steps) and, with
+--cached-speedup, answers faster the more of the prompt was cached. Every
+brief is evaluated twice, the second time re-submitted with its keys in
+another order, so the table shows what the canonical brief and the stable
+prompt layout recover on re-runs. The role table is role_stats(), the same
+numbers the server's /usage and the batch summary report in production.
+
+Usage: python -m bench.prompt_cache --briefs 20 --notes 20 --delay 0.2 --cached-speedup 0.5
+"""
+
+
+async def run(graph, briefs) -> None:
+    for i, brief in enumerate(briefs):
+        await graph.ainvoke(initial_state(brief, f"run_{i}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provider prompt-cache savings per role (stub endpoint)")
+    parser.add_argument("--briefs", type=int, default=20)
+    parser.add_argument("--notes", type=int, default=20, help="Research notes per brief")
+    parser.add_argument("--note-chars", type=int, default=400)
+    parser.add_argument("--delay", type=float, default=0.05, help="Stub response time in seconds")
+    parser.add_argument("--cached-speedup", type=float, default=0.5, help="Share of the delay a fully cached prompt saves")
+    parser.add_argument("--model", default="gpt-4o-mini", help="Model name used for pricing")
+    args = parser.parse_args()
+
+    briefs = make_briefs(args.briefs, args.notes, args.note_chars)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+    with StubServer(delay=args.delay, cached_speedup=args.cached_speedup) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        graph = build_graph(ExecutionContext(llm=OpenAILLM(model=args.model)), policy="strict")
+        for label, batch in (("first pass", briefs), ("re-submitted", [reordered(b, i) for i, b in enumerate(briefs)])):
+            role_stats().reset()
+            asyncio.run(run(graph, batch))
+            print(f"\n{label} ({len(batch)} briefs)")
+            print(format_role_stats(role_stats().snapshot()))
+        print(f"\nprompt_cache_key values sent: {len(server.cache_keys)} (one per role and system prompt)")
+
+
+if __name__ == "__main__":
+    main()
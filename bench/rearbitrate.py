@@ -0,0 +1,82 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from agents.arbiter import final_arbiter
+from core import bulk_arbiter
+from core.log_index import COMPONENTS, LogIndex
+
+"""Bulk re-arbitration against final_arbiter one state at a time (core/bulk_arbiter.py).
+
+Fills a scratch shadow-log index with --runs synthetic runs (gate KILLs,
+evaluator KILLs and INSUFFICIENT_INFOs at --kill-rate / --insufficient-rate,
+random confidences), then times:
+- load: load_index, the SQL read and the conversion into NumPy columns;
+- each rule: one vectorized pass over every run, plus diff against the
+  logged decisions;
+- loop: final_arbiter on one state dict per run for a sample, extrapolated
+  to --runs (what re-arbitrating used to take, before any log parsing).
+
+Usage: python -m bench.rearbitrate --runs 1000000
+"""
+
+RULES = ("rejection_first", "min_kill_confidence:threshold=0.7", "insufficient_as:verdict=PASS",
+         "weighted:market=2,threshold=0.3")
+
+
+def synthetic_rows(count: int, kill_rate: float, insufficient_rate: float, seed: int = 7):
+    rng = random.Random(seed)
+    for i in range(count):
+        gate = "KILL" if rng.random() < kill_rate else "PASS"
+        statuses, row = [], []
+        for _ in COMPONENTS:
+            draw = rng.random()
+            status = "KILL" if draw < kill_rate else "INSUFFICIENT_INFO" if draw < kill_rate + insufficient_rate else "PASS"
+            statuses.append(status)
+            row += [status if gate == "PASS" else None, round(rng.random(), 3) if gate == "PASS" else None]
+        state = {f"{c}_eval": {"status": s} for c, s in zip(COMPONENTS, statuses)}
+        decision = "KILL" if gate == "KILL" else final_arbiter(state)["final_decision"]
+        yield (f"run_{i:08d}", "2026-10-01T00:00:00", decision, gate, *row, None, "synthetic.jsonl", i)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized vs per-state re-arbitration")
+    parser.add_argument("--runs", type=int, default=1000000)
+    parser.add_argument("--kill-rate", type=float, default=0.1)
+    parser.add_argument("--insufficient-rate", type=float, default=0.05)
+    parser.add_argument("--sample", type=int, default=100000, help="States timed through final_arbiter")
+    args = parser.parse_args()
+
+    index = LogIndex(os.path.join(tempfile.mkdtemp(), "index.sqlite3"))
+    started = time.perf_counter()
+    conn = index._connection()
+    with conn:
+        conn.executemany("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         synthetic_rows(args.runs, args.kill_rate, args.insufficient_rate))
+    print(f"{args.runs} runs indexed in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    columns = bulk_arbiter.load_index(index)
+    print(f"{'load_index':<36} {time.perf_counter() - started:>8.3f}s")
+
+    for spec in RULES:
+        started = time.perf_counter()
+        decisions = bulk_arbiter.rule_from_spec(spec)(columns)
+        decided = time.perf_counter() - started
+        report = bulk_arbiter.diff(columns, columns.recorded, decisions, examples=0)
+        print(f"{spec:<36} {decided:>8.3f}s  +diff {time.perf_counter() - started - decided:.3f}s  "
+              f"changed {report['changed']}")
+
+    states = [{f"{c}_eval": {"status": bulk_arbiter.VERDICTS[code]} if code else None
+               for c, code in zip(COMPONENTS, row)} for row in columns.status[:args.sample].tolist()]
+    started = time.perf_counter()
+    for state in states:
+        final_arbiter(state)
+    elapsed = (time.perf_counter() - started) * len(columns) / max(1, len(states))
+    print(f"{'final_arbiter loop (extrapolated)':<36} {elapsed:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
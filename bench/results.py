@@ -0,0 +1,91 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+from core.logger import encode_line
+from core.results import parse_result
+from core.state import GateResult
+
+"""Parse+validate cost and footprint of agent results (core/results.py).
+
+Per result, on a realistic LLM answer (a few hundred characters of reason):
+- eval: json.loads, today's path before this change (no validation), against
+  parse_result from the same text and from bytes;
+- gate: json.loads plus the copy into a fresh dict that gate_patch made,
+  against parse_result(..., GateResult);
+- memory: bytes retained per parsed result (tracemalloc over --count);
+- log: encoding one shadow-log line holding a gate and three evaluator
+  results, json.dumps over dicts as before against encode_line over the
+  dataclasses.
+
+Usage: python -m bench.results --count 100000 --reason-chars 300
+"""
+
+
+def per_call(func, arg, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        func(arg)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def retained(func, arg, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [func(arg) for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size / count
+
+
+def legacy_gate(raw: str) -> dict:
+    result = json.loads(raw)
+    return {"decision": result.get("decision"), "reason": result.get("reason"), "confidence": result.get("confidence")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Result parse+validate, memory and log encoding (no LLM)")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--reason-chars", type=int, default=300)
+    args = parser.parse_args()
+
+    reason = ("The workflow recurs weekly and is done by hand today. " * 20)[:args.reason_chars]
+    eval_raw = json.dumps({"component": "MARKET", "status": "PASS", "confidence": 0.82, "reason": reason})
+    gate_raw = json.dumps({"decision": "PASS", "confidence": 0.9, "reason": reason})
+    eval_bytes = eval_raw.encode("utf-8")
+    parse_result(eval_raw), parse_result(gate_raw, GateResult)  # build the validators
+
+    def parse_gate(raw):
+        return parse_result(raw, GateResult)
+
+    rows = [
+        ("eval  json.loads (before)", json.loads, eval_raw),
+        ("eval  parse_result(str)", parse_result, eval_raw),
+        ("eval  parse_result(bytes)", parse_result, eval_bytes),
+        ("gate  json.loads + copy (before)", legacy_gate, gate_raw),
+        ("gate  parse_result", parse_gate, gate_raw),
+    ]
+    print(f"{args.count} results, reason {len(reason)} chars")
+    print(f"{'path':<34} {'µs/result':>10} {'bytes kept':>11}")
+    for name, func, raw in rows:
+        # Footprint on a tenth of the count: tracemalloc slows allocation down.
+        print(f"{name:<34} {per_call(func, raw, args.count):>10.2f} {retained(func, raw, max(1, args.count // 10)):>11.0f}")
+
+    evals = {key: json.loads(eval_raw) for key in ("market_eval", "business_eval", "technical_eval")}
+    before = {"run_id": "run_1", "workflow_gate": legacy_gate(gate_raw), **evals, "final_decision": "BUILD"}
+    after = {"run_id": "run_1", "workflow_gate": parse_gate(gate_raw),
+             **{key: parse_result(eval_raw) for key in evals}, "final_decision": "BUILD"}
+    assert json.loads(encode_line(after)) == before
+
+    def dumps(record):
+        return json.dumps(record, separators=(",", ":"), default=str).encode("utf-8")
+
+    count = max(1, args.count // 10)
+    print(f"{'log line json.dumps (before)':<34} {per_call(dumps, before, count):>10.2f}")
+    print(f"{'log line encode_line':<34} {per_call(encode_line, after, count):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
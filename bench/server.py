@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+"""Requests/sec and p99: resident server versus a fresh CLI process per brief.
+
+Both sides use the mock provider with the same latency profile (MOCK_PROFILE)
+so the comparison shows what the server saves: interpreter start, imports,
+graph compilation and client construction per request, plus coalescing of
+duplicate briefs (--repeat is the share of requests that repeat an earlier
+brief).
+
+The server runs as a subprocess (python main.py serve) and is driven over
+keep-alive HTTP connections; the CLI baseline runs
+`python main.py batch <one brief>` per request.
+
+Usage: python -m bench.server --requests 500 --concurrency 64 --repeat 0.5 --cli-requests 8
+"""
+
+PROFILE = '{"default": {"p50_ms": 50, "spread": 0.4}, "workflow_gate": {"p50_ms": 30, "spread": 0.3}}'
+
+
+def briefs(n: int, repeat: float):
+    # Repeats sit next to their original so they arrive while it is in flight.
+    unique = max(1, int(n * (1 - repeat)))
+    return [{"concept_hook": f"Bench idea {i * unique // n}", "target_customer": "Ops teams"} for i in range(n)]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def summarize(label, latencies, elapsed, **extra):
+    return {
+        "mode": label,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        **extra,
+    }
+
+
+async def load_server(url: str, payloads, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, coalesced, rejected = [], 0, 0
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def one(brief):
+            nonlocal coalesced, rejected
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/evaluate", json=brief)
+                latencies.append(time.perf_counter() - started)
+                rejected += response.status_code == 503
+                coalesced += response.headers.get("x-coalesced") == "1"
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(brief) for brief in payloads))
+        elapsed = time.perf_counter() - started
+    return summarize("server", latencies, elapsed, coalesced=coalesced, rejected=rejected)
+
+
+def run_server_bench(args, env):
+    port = args.port
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "serve", "--port", str(port), "--no-shadow-log",
+         "--max-concurrency", str(args.max_concurrency), "--max-queue", str(args.max_queue)],
+        env=env, stderr=subprocess.DEVNULL
+    )
+    try:
+        url = f"http://127.0.0.1:{port}"
+        for _ in range(100):
+            try:
+                httpx.get(f"{url}/health", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        return asyncio.run(load_server(url, briefs(args.requests, args.repeat), args.concurrency))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_cli_bench(args, env):
+    def one(brief):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            f.write(json.dumps(brief) + "\n")
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "main.py", "batch", f.name, "--out", os.devnull, "--no-shadow-log"],
+            env=env, check=True, stderr=subprocess.DEVNULL
+        )
+        os.unlink(f.name)
+        return time.perf_counter() - started
+
+    workers = min(args.concurrency, os.cpu_count() or 1)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(one, briefs(args.cli_requests, 0.0)))
+    return summarize(f"cli x{workers}", latencies, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident server vs CLI process per brief")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--repeat", type=float, default=0.5, help="Share of requests repeating an earlier brief")
+    parser.add_argument("--cli-requests", type=int, default=8)
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--max-queue", type=int, default=1024)
+    parser.add_argument("--port", type=int, default=18765)
+    args = parser.parse_args()
+
+    env = {**os.environ, "LLM_PROVIDER": "mock", "MOCK_PROFILE": os.getenv("MOCK_PROFILE", PROFILE)}
+    rows = [run_server_bench(args, env), run_cli_bench(args, env)]
+
+    print(f"{'mode':<10} {'requests':>8} {'rps':>9} {'p50_ms':>9} {'p99_ms':>9} {'coalesced':>9} {'503s':>5}")
+    for row in rows:
+        print(
+            f"{row['mode']:<10} {row['requests']:>8} {row['rps']:>9.1f} {row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+            f"{row.get('coalesced', '-'):>9} {row.get('rejected', '-'):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+
+from batch import arun_batch, iter_briefs, jsonl_writer, run_sharded_batch
+from bench.brief import make_briefs
+from core.context import ExecutionContext
+from graph import build_graph
+from llm.mock_llm import MockLLM
+
+"""Runs/sec of one interpreter versus the sharded executor (batch.py).
+
+The mock LLM answers instantly, so throughput is bound by the per-run CPU
+work the request is about: brief parsing and serialization, prompts, graph
+state merging and result encoding. The same JSONL input (briefs with
+--notes research notes each) goes through arun_batch in this process and
+then through run_sharded_batch with each --workers count. The sharded
+outputs are hashed to show they are byte-identical across worker counts.
+Worker start-up (interpreter, langgraph import, graph compile) is included
+in the sharded timings, as it is in a real backfill; use enough --briefs
+to amortize it. Speed-up is bounded by the cores available (printed).
+
+Usage: python -m bench.sharded --briefs 2000 --notes 5 --workers 1 2 4
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process vs sharded batch throughput (mock LLM)")
+    parser.add_argument("--briefs", type=int, default=1000)
+    parser.add_argument("--notes", type=int, default=5, help="Research notes per brief")
+    parser.add_argument("--note-chars", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64, help="Runs in flight (per worker)")
+    args = parser.parse_args()
+
+    os.environ["LLM_PROVIDER"] = "mock"
+    lines = [json.dumps(brief) for brief in make_briefs(args.briefs, args.notes, args.note_chars)]
+    print(f"{args.briefs} briefs, {os.cpu_count()} CPUs")
+
+    graph = build_graph(ExecutionContext(llm=MockLLM()))
+    sink = io.StringIO()
+    summary = asyncio.run(arun_batch(graph, iter_briefs(lines), jsonl_writer(sink),
+                                     concurrency=args.concurrency, shadow_log=False))
+    print(f"{'in-process':<12} {summary['briefs_per_sec']:>9.1f} runs/s  {summary['elapsed_s']:>7.2f}s")
+
+    for workers in args.workers:
+        digest = hashlib.sha256()
+        summary = run_sharded_batch(lines, lambda line: digest.update(line.encode("utf-8") + b"\n"),
+                                    workers=workers, concurrency=args.concurrency, shadow_log=False)
+        print(f"{f'{workers} workers':<12} {summary['briefs_per_sec']:>9.1f} runs/s  {summary['elapsed_s']:>7.2f}s  "
+              f"output sha256 {digest.hexdigest()[:16]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from core.context import ExecutionContext
+from core.json_stream import acomplete_json, verdict_listener
+from core.prompts import load_prompt
+from core.state import initial_state
+from graph import build_graph
+from llm.base import current_role
+from llm.mock_llm import LatencyProfile, MockLLM
+from llm.usage import metered
+
+"""Time to verdict: whole completions versus streamed ones.
+
+The mock provider answers after a time-to-first-token (--ttft-ms) and then
+emits tokens at --ms-per-token, with reasons padded to --output-tokens, so
+the verdict arrives long before the answer ends, as with a real model.
+
+Two measurements:
+- call: one evaluator call; when the verdict is known (streamed) versus
+  when the whole answer is (what the agents waited for before)
+- run: KILL briefs (gate KILL and evaluator KILL) through each policy,
+  comparing time to the final decision and output tokens for
+  plain (no streaming), stream (verdict acted on by the panel) and
+  early-kill (KILLing agents also stop reading at the verdict)
+
+Usage: python -m bench.streaming --ttft-ms 300 --ms-per-token 15 --output-tokens 200
+"""
+
+MODES = {
+    "plain": {},
+    "stream": {"stream": True},
+    "early-kill": {"stream": True, "early_kill": True},
+}
+
+KILL_BRIEFS = [
+    {"concept_hook": "Tinder for Dogs", "target_customer": "Dog owners"},  # gate KILL
+    {"concept_hook": "Social Network for Ops", "target_customer": "Ops teams"},  # market KILL
+]
+
+
+def mean(values: List[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+async def call_latency(llm, calls: int) -> Dict[str, float]:
+    ctx = ExecutionContext(llm=llm, config={"stream": True})
+    system = load_prompt("market_eval.txt")
+    to_verdict, to_answer = [], []
+
+    async def one():
+        started = time.perf_counter()
+        heard = []
+        token = verdict_listener.set(lambda _: heard.append(time.perf_counter() - started))
+        role = current_role.set("market_eval")
+        try:
+            await acomplete_json(ctx, system, "Social Network for Ops", "status")
+        finally:
+            current_role.reset(role)
+            verdict_listener.reset(token)
+        to_verdict.append(heard[0])
+        to_answer.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return {"verdict_ms": mean(to_verdict) * 1000, "answer_ms": mean(to_answer) * 1000}
+
+
+async def run_latency(llm, policy: str, config: Dict, runs: int) -> Dict[str, float]:
+    graph = build_graph(ExecutionContext(llm=llm, config=config), policy=policy)
+    latencies, tokens = [], []
+
+    async def one(i):
+        brief = KILL_BRIEFS[i % len(KILL_BRIEFS)]
+        started = time.perf_counter()
+        with metered() as meter:
+            state = await graph.ainvoke(initial_state(brief, f"run_{i}"))
+        assert state["final_decision"] == "KILL"
+        latencies.append(time.perf_counter() - started)
+        tokens.append(meter.snapshot()["output_tokens"])
+
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    return {"decision_ms": mean(latencies) * 1000, "output_tokens": mean(tokens)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to verdict with streamed completions")
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--ms-per-token", type=float, default=15.0)
+    parser.add_argument("--output-tokens", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=20, help="Runs (and calls) per measurement, all in flight")
+    parser.add_argument("--policies", nargs="*", default=["strict", "speculative", "short-circuit"])
+    args = parser.parse_args()
+
+    profile = LatencyProfile(p50_ms=args.ttft_ms, output_tokens=args.output_tokens, ms_per_token=args.ms_per_token)
+    llm = MockLLM({"default": profile}, seed=0)
+
+    call = asyncio.run(call_latency(llm, args.runs))
+    print(f"call: verdict after {call['verdict_ms']:.0f} ms, full answer after {call['answer_ms']:.0f} ms "
+          f"({call['answer_ms'] / call['verdict_ms']:.1f}x)")
+
+    print(f"\n{'policy':<14} {'mode':<11} {'decision_ms':>11} {'vs plain':>9} {'out_tokens':>10}")
+    for policy in args.policies:
+        baseline = None
+        for mode, config in MODES.items():
+            row = asyncio.run(run_latency(llm, policy, config, args.runs))
+            baseline = baseline or row["decision_ms"]
+            print(f"{policy:<14} {mode:<11} {row['decision_ms']:>11.0f} {row['decision_ms'] / baseline:>8.2f}x "
+                  f"{row['output_tokens']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
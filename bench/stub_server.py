@@ -0,0 +1,133 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""Local stand-in for the OpenAI chat completions endpoint.
+
+Serves POST /v1/chat/completions over HTTP/1.1 with keep-alive and answers
+every request with a fixed completion after an optional delay (as
+server-sent events when the request sets "stream"), so transport
+behaviour (pooling, connection reuse) can be measured without the network.
+Counts accepted TCP connections so benchmarks can report reuse.
+
+Usage is computed per request (4 characters per prompt token) and the
+server keeps a prefix cache modelled on OpenAI's: a prompt's longest
+previously seen prefix of at least 1024 tokens, in 128-token steps, is
+reported as prompt_tokens_details.cached_tokens, and with cached_speedup
+the delay shrinks in proportion to the cached share. prompt_cache_key
+values received are counted in cache_keys.
+"""
+
+CHARS_PER_TOKEN = 4
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+COMPLETION = {
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": json.dumps({
+            "component": "MARKET", "status": "PASS", "confidence": 0.8, "reason": "stub"
+        })}
+    }],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}
+}
+
+
+def _event_stream(usage: dict, chunk_chars: int = 8) -> bytes:
+    # The completion as server-sent events: content deltas, then usage.
+    content = COMPLETION["choices"][0]["message"]["content"]
+    base = {key: COMPLETION[key] for key in ("id", "created", "model")}
+    events = [
+        {**base, "object": "chat.completion.chunk", "choices": [
+            {"index": 0, "delta": {"content": content[i:i + chunk_chars]}, "finish_reason": None}
+        ]}
+        for i in range(0, len(content), chunk_chars)
+    ]
+    events.append({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+    lines = [f"data: {json.dumps(event)}\n\n" for event in events] + ["data: [DONE]\n\n"]
+    return "".join(lines).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        usage = self.server.usage(request)
+        if self.server.delay:
+            cached_share = usage["prompt_tokens_details"]["cached_tokens"] / max(usage["prompt_tokens"], 1)
+            time.sleep(self.server.delay * (1 - self.server.cached_speedup * cached_share))
+        if request.get("stream"):
+            body, content_type = _event_stream(usage), "text/event-stream"
+        else:
+            body, content_type = json.dumps({**COMPLETION, "usage": usage}).encode("utf-8"), "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.0, cached_speedup: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.delay = delay
+        self.cached_speedup = cached_speedup
+        self.connections = 0
+        self.cache_keys: dict = {}
+        self._prefixes: set = set()
+        self._cache_lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+    def usage(self, request: dict) -> dict:
+        """Token usage for a request, cached prompt tokens included; caches its prefixes."""
+        prompt = "".join(message.get("content") or "" for message in request.get("messages", []))
+        prompt_tokens = len(prompt) // CHARS_PER_TOKEN
+        step = CACHE_STEP_TOKENS * CHARS_PER_TOKEN
+        boundaries = range(CACHE_MIN_TOKENS * CHARS_PER_TOKEN, len(prompt) + 1, step)
+        digests = [hashlib.sha256(prompt[:end].encode("utf-8")).digest() for end in boundaries]
+        cached = 0
+        with self._cache_lock:
+            key = request.get("prompt_cache_key")
+            if key:
+                self.cache_keys[key] = self.cache_keys.get(key, 0) + 1
+            for end, digest in zip(boundaries, digests):
+                if digest in self._prefixes:
+                    cached = end // CHARS_PER_TOKEN
+            self._prefixes.update(digests)
+        completion_tokens = COMPLETION["usage"]["completion_tokens"]
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
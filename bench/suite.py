@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from agents.market_eval import market_evaluator
+from core.context import ExecutionContext
+from core.logger import ShadowLogWriter, shadow_record
+from core.log_index import LogIndex
+from core.state import initial_state
+from graph import build_graph
+from llm.caching_llm import CachingLLM
+from llm.mock_llm import MockLLM, LatencyProfile, load_profiles
+from llm.resilient_llm import ResilientLLM
+from llm.usage import metered
+
+"""End-to-end benchmark suite.
+
+Scenarios run the real graph, agents and shadow-log writer against MockLLM
+with per-role latency profiles (llm/mock_llm.py), so orchestration cost,
+concurrency scaling and tail behaviour can be measured without API calls:
+- overhead: build_graph, one agent call and a full invoke/ainvoke with an
+  instant mock (pure orchestration cost),
+- single_run: sequential runs under the latency profile (p50/p95/p99),
+- throughput: briefs/sec versus concurrency,
+- gate_kill: latency and LLM calls per run as the gate-KILL share grows,
+- cache: briefs/sec and hit rate as the share of repeated briefs grows,
+- tail: p99 and failed runs with transient provider errors and retries,
+- shadow_log: write_shadow_log submit cost and writer throughput.
+
+Results are one flat {"scenario.metric": value} map plus metadata (commit,
+Python, profile), saved as JSON under bench/results/. --compare BASE.json
+prints the change per metric and flags regressions beyond --threshold; with
+--fail-on-regression the exit status is 1 so CI can gate on it.
+
+Usage:
+  python -m bench.suite --quick
+  python -m bench.suite --only throughput cache --compare bench/results/<base>.json
+"""
+
+# Roughly real proportions at 1/10 of real latency: the gate is the
+# shortest call, evaluators write a little more.
+DEFAULT_PROFILE = {
+    "default": LatencyProfile(p50_ms=50, spread=0.4, output_tokens=60, ms_per_token=0.2),
+    "workflow_gate": LatencyProfile(p50_ms=30, spread=0.3, output_tokens=40, ms_per_token=0.2),
+}
+
+PASS_BRIEF = {"concept_hook": "Invoice reconciliation for freight brokers", "target_customer": "Mid-size brokers"}
+GATE_KILL_BRIEF = {"concept_hook": "Tinder for Dogs", "target_customer": "Dog owners"}
+
+
+def pass_briefs(n: int, unique: int = None) -> List[dict]:
+    # Distinct briefs (or `unique` distinct ones repeated) that pass the gate.
+    unique = unique or n
+    return [{**PASS_BRIEF, "concept_hook": f"{PASS_BRIEF['concept_hook']} #{i % unique}"} for i in range(n)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def timed_runs(graph, briefs: List[dict], concurrency: int):
+    """ainvoke every brief with bounded concurrency; (latencies, failures, elapsed, usage)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one(brief):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await graph.ainvoke(initial_state(brief))
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with metered() as meter:
+        await asyncio.gather(*(one(brief) for brief in briefs))
+    return latencies, failures, time.perf_counter() - started, meter.snapshot()
+
+
+def graph_for(llm):
+    return build_graph(ExecutionContext(llm=llm), "strict")
+
+
+def scenario_overhead(opts) -> Dict[str, float]:
+    runs = opts.scale * 200
+    started = time.perf_counter()
+    for _ in range(20):
+        graph = graph_for(MockLLM())
+    build_ms = (time.perf_counter() - started) / 20 * 1000
+
+    ctx = ExecutionContext(llm=MockLLM())
+    state = initial_state(PASS_BRIEF)
+    started = time.perf_counter()
+    for _ in range(runs):
+        market_evaluator(state, ctx)
+    agent_us = (time.perf_counter() - started) / runs * 1e6
+
+    started = time.perf_counter()
+    for _ in range(runs):
+        graph.invoke(initial_state(PASS_BRIEF))
+    invoke_us = (time.perf_counter() - started) / runs * 1e6
+
+    async def ainvoke_all():
+        for _ in range(runs):
+            await graph.ainvoke(initial_state(PASS_BRIEF))
+
+    started = time.perf_counter()
+    asyncio.run(ainvoke_all())
+    ainvoke_us = (time.perf_counter() - started) / runs * 1e6
+    return {"build_graph_ms": build_ms, "agent_us": agent_us, "invoke_us": invoke_us, "ainvoke_us": ainvoke_us}
+
+
+def scenario_single_run(opts) -> Dict[str, float]:
+    graph = graph_for(MockLLM(opts.profile, seed=1))
+    latencies, _, _, _ = asyncio.run(timed_runs(graph, pass_briefs(opts.scale * 25), concurrency=1))
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def scenario_throughput(opts) -> Dict[str, float]:
+    graph = graph_for(MockLLM(opts.profile, seed=2))
+    metrics = {}
+    for level in (1, 8, 32, 128):
+        n = max(opts.scale * 20, level * 4)
+        _, _, elapsed, _ = asyncio.run(timed_runs(graph, pass_briefs(n), concurrency=level))
+        metrics[f"c{level}_briefs_per_sec"] = n / elapsed
+    return metrics
+
+
+def scenario_gate_kill(opts) -> Dict[str, float]:
+    graph = graph_for(MockLLM(opts.profile, seed=3))
+    n = opts.scale * 50
+    metrics = {}
+    for ratio in (0.0, 0.5, 0.9):
+        kills = int(n * ratio)
+        briefs = [GATE_KILL_BRIEF] * kills + pass_briefs(n - kills)
+        latencies, _, _, usage = asyncio.run(timed_runs(graph, briefs, concurrency=16))
+        label = f"kill{int(ratio * 100)}"
+        metrics[f"{label}_mean_ms"] = sum(latencies) / n * 1000
+        metrics[f"{label}_calls_per_run"] = usage["calls"] / n
+    return metrics
+
+
+def scenario_cache(opts) -> Dict[str, float]:
+    n = opts.scale * 50
+    metrics = {}
+    for repeat in (0.0, 0.5, 0.9):
+        llm = CachingLLM(MockLLM(opts.profile, seed=4))
+        unique = max(1, int(n * (1 - repeat)))
+        _, _, elapsed, _ = asyncio.run(timed_runs(graph_for(llm), pass_briefs(n, unique), concurrency=16))
+        stats = llm.stats()
+        label = f"repeat{int(repeat * 100)}"
+        metrics[f"{label}_briefs_per_sec"] = n / elapsed
+        metrics[f"{label}_hit_rate"] = stats["hits"] / max(1, stats["hits"] + stats["misses"])
+    return metrics
+
+
+def scenario_tail(opts) -> Dict[str, float]:
+    profile = {role: p._replace(error_rate=0.05) for role, p in opts.profile.items()}
+    llm = ResilientLLM(MockLLM(profile, seed=5), backoff_initial=0.01, backoff_max=0.05, jitter=0.01, deadline=5)
+    n = opts.scale * 50
+    latencies, failures, _, _ = asyncio.run(timed_runs(graph_for(llm), pass_briefs(n), concurrency=16))
+    stats = llm.stats()
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "failed_runs": failures,
+        "retries_per_run": stats["retries"] / n,
+    }
+
+
+def scenario_shadow_log(opts) -> Dict[str, float]:
+    records = opts.scale * 2000
+    state = graph_for(MockLLM()).invoke(initial_state(PASS_BRIEF))
+    metrics = {}
+    for label, with_index in (("plain", False), ("indexed", True)):
+        with tempfile.TemporaryDirectory() as directory:
+            index = LogIndex(os.path.join(directory, "index.sqlite3")) if with_index else None
+            writer = ShadowLogWriter(directory=directory, max_queue=records + 1, index=index)
+            started = time.perf_counter()
+            for _ in range(records):
+                writer.submit(shadow_record(state))
+            submitted = time.perf_counter() - started
+            writer.close()
+            drained = time.perf_counter() - started
+            metrics[f"{label}_submit_us"] = submitted / records * 1e6
+            metrics[f"{label}_records_per_sec"] = records / drained
+    return metrics
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "overhead": scenario_overhead,
+    "single_run": scenario_single_run,
+    "throughput": scenario_throughput,
+    "gate_kill": scenario_gate_kill,
+    "cache": scenario_cache,
+    "tail": scenario_tail,
+    "shadow_log": scenario_shadow_log,
+}
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith(("_per_sec", "_hit_rate"))
+
+
+def compare(base: Dict[str, float], current: Dict[str, float], threshold: float) -> List[str]:
+    """Print per-metric changes against base; return the regressed metric names."""
+    regressions = []
+    print(f"\n{'metric':<40} {'base':>12} {'current':>12} {'change':>8}")
+    for metric, value in current.items():
+        if metric not in base:
+            print(f"{metric:<40} {'-':>12} {value:>12.2f} {'new':>8}")
+            continue
+        before = base[metric]
+        change = (value - before) / before if before else 0.0
+        worse = -change if higher_is_better(metric) else change
+        flag = ""
+        if worse > threshold:
+            regressions.append(metric)
+            flag = "  REGRESSION"
+        print(f"{metric:<40} {before:>12.2f} {value:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def git_revision() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = "unknown", False
+    return {"commit": commit, "dirty": dirty}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end benchmark suite with a latency-injecting mock provider")
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), help="Scenarios to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help="Smaller samples, for a fast smoke run")
+    parser.add_argument("--profile", help="Latency profile JSON (file or inline); default: DEFAULT_PROFILE")
+    parser.add_argument("--out", help="Results file (default: bench/results/<time>-<commit>.json)")
+    parser.add_argument("--no-save", action="store_true", help="Do not write a results file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+    args.scale = 1 if args.quick else 4
+    args.profile = load_profiles(args.profile) if args.profile else DEFAULT_PROFILE
+
+    metrics = {}
+    for name in args.only or SCENARIOS:
+        started = time.perf_counter()
+        for metric, value in SCENARIOS[name](args).items():
+            metrics[f"{name}.{metric}"] = round(value, 4)
+        print(f"{name:<12} done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    revision = git_revision()
+    results = {
+        "meta": {
+            **revision,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "profile": {role: p._asdict() for role, p in args.profile.items()},
+        },
+        "metrics": metrics,
+    }
+
+    if not args.no_save:
+        out = args.out or os.path.join(
+            "bench", "results", f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{revision['commit']}.json"
+        )
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            base = json.load(f)["metrics"]
+        regressions = compare(base, metrics, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+    else:
+        for metric, value in metrics.items():
+            print(f"{metric:<40} {value:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
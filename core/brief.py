@@ -0,0 +1,51 @@
+import hashlib
+import json
+from typing import Any, NamedTuple
+
+"""Prepared brief: the brief serialized once per run.
+
+Every agent puts the brief into its prompt. Instead of each one calling
+json.dumps (and the byte layout depending on whichever dict order the
+brief arrived in), initial_state prepares it once: canonical JSON (sorted
+keys, indent=2, non-ASCII kept as is rather than \\u-escaped) plus its
+SHA-256. Agents read state["prepared_brief"] through prepared(), so the
+gate, every evaluator and the fused panel share one string.
+
+Canonical bytes also make prompts byte-stable: the same brief yields the
+same prompt whatever its key order, so provider-side prompt caching (which
+matches on exact prefixes) can hit on re-runs and retries. Agents put the
+brief last in their user prompt, after their fixed instructions, so the
+cacheable prefix (system prompt + instructions) is the same for every brief.
+"""
+
+
+class PreparedBrief(NamedTuple):
+    # A brief with its canonical JSON and digest; immutable so agents share it.
+    brief: Any
+    text: str
+    sha256: str
+
+
+def canonical_json(brief: Any) -> str:
+    """The brief's canonical JSON text (sorted keys, indent=2, UTF-8 as is)."""
+    return json.dumps(brief, indent=2, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def prepare_brief(brief: Any) -> PreparedBrief:
+    """Serialize and hash a brief once."""
+    text = canonical_json(brief)
+    return PreparedBrief(brief, text, hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+
+def prepared(state: dict) -> PreparedBrief:
+    """The run's PreparedBrief, or a fresh one if the state has none.
+
+    A prepared brief is only reused while it still describes state["brief"]
+    (same object, or equal after a checkpoint round-trip), so a node that
+    replaces the brief cannot leave agents reading a stale one.
+    """
+    brief = state.get("brief")
+    entry = state.get("prepared_brief")
+    if entry is not None and (entry.brief is brief or entry.brief == brief):
+        return entry
+    return prepare_brief(brief)
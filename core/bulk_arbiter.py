@@ -0,0 +1,273 @@
+import importlib
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from core.log_index import COMPONENTS, LogIndex, extra_component_sql
+
+"""Bulk (re-)arbitration of logged runs.
+
+Changing the decision rule used to mean replaying final_arbiter over stored
+runs one state dict at a time. Here the verdicts of every logged run are
+loaded once into NumPy columns and a rule decides all of them in one
+vectorized pass, so a candidate rule is scored against millions of
+historical runs in seconds and without an LLM:
+- load_index(index, components, **filters) reads the shadow-log index
+  (core/log_index.py; same filters as query) with the verdicts coded in
+  SQL, registry dimensions included (from the index's side table);
+  load_records(records, components) reads shadow-log records directly
+  (core.logger.iter_shadow_records). Both default to the three default
+  components; main.py rearbitrate passes the registry's.
+- Columns holds per-run uint8 codes (VERDICTS / DECISIONS) and float32
+  confidences (NaN when missing), one column per component.
+- A rule maps Columns to a decision code per run. RULES maps rule names to
+  "module:factory" strings imported on use (as llm/factory.py does for
+  providers); rule_from_spec("name:key=value,...") builds one and
+  register_rule adds a custom one. rejection_first is final_arbiter's rule
+  (a gate KILL first).
+- diff(columns, base, other) counts decision transitions between two rules
+  and lists changed runs.
+
+Runs with no verdict at all (dedup skips whose prior results could not be
+copied, which only carry the prior decision) keep their recorded decision
+under every rule.
+
+NumPy is an optional dependency imported on first use; the rest of the
+engine does not need it.
+"""
+
+# Codes for component statuses / gate decisions and for final decisions; index 0 is "missing".
+VERDICTS = (None, "PASS", "KILL", "INSUFFICIENT_INFO")
+DECISIONS = (None, "BUILD", "KILL", "INSUFFICIENT_INFO")
+MISSING, PASS, KILL, INSUFFICIENT = 0, 1, 2, 3
+BUILD = 1
+
+# Rule name -> "module:factory"; the factory takes the spec's keyword arguments.
+RULES: Dict[str, str] = {
+    "rejection_first": "core.bulk_arbiter:rejection_first",
+    "min_kill_confidence": "core.bulk_arbiter:min_kill_confidence",
+    "insufficient_as": "core.bulk_arbiter:insufficient_as",
+    "weighted": "core.bulk_arbiter:weighted",
+}
+
+
+def _np():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImportError("Bulk arbitration needs NumPy: pip install numpy") from exc
+    return numpy
+
+
+class Columns(NamedTuple):
+    # Verdict columns for n runs over k components.
+    run_ids: List[str]
+    components: Sequence[str]
+    status: Any          # (n, k) uint8 VERDICTS codes
+    confidence: Any      # (n, k) float32, NaN when missing
+    gate: Any            # (n,) uint8 VERDICTS code of the gate decision
+    recorded: Any        # (n,) uint8 DECISIONS code of the logged final decision
+
+    def __len__(self) -> int:
+        return len(self.run_ids)
+
+
+def load_index(index: LogIndex, components: Sequence[str] = COMPONENTS, **filters) -> Columns:
+    """Columns for the indexed runs matching filters (LogIndex.query's, limit excluded).
+
+    Components beyond the default three are read from the index's side
+    table; runs without a result for one get MISSING, as in load_records.
+    """
+    np = _np()
+    components = tuple(components)
+
+    def code(column: str, names: Sequence[Optional[str]]) -> str:
+        cases = " ".join(f"WHEN '{name}' THEN {i}" for i, name in enumerate(names) if name)
+        return f"CASE {column} {cases} ELSE 0 END"
+
+    expressions = ["run_id", code("final_decision", DECISIONS), code("gate_decision", VERDICTS)]
+    for component in components:
+        if component in COMPONENTS:
+            expressions += [code(f"{component}_status", VERDICTS), f"{component}_confidence"]
+        else:
+            expressions += [code(extra_component_sql(component, "status"), VERDICTS),
+                            extra_component_sql(component, "confidence")]
+    rows = index.scan(expressions, **filters).fetchall()
+    if not rows:
+        return _empty(np, components)
+    run_ids = [row[0] for row in rows]
+    # None confidences become NaN through the float conversion.
+    values = np.array([row[1:] for row in rows], dtype=np.float64)
+    return Columns(
+        run_ids=run_ids,
+        components=components,
+        status=values[:, 2::2].astype(np.uint8),
+        confidence=values[:, 3::2].astype(np.float32),
+        gate=values[:, 1].astype(np.uint8),
+        recorded=values[:, 0].astype(np.uint8),
+    )
+
+
+def load_records(records: Iterable[Dict[str, Any]], components: Sequence[str] = COMPONENTS) -> Columns:
+    """Columns from shadow-log records (e.g. iter_shadow_records()), any evaluator components."""
+    np = _np()
+    verdict = {name: i for i, name in enumerate(VERDICTS) if name}
+    decision = {name: i for i, name in enumerate(DECISIONS) if name}
+    run_ids, recorded, gate, status, confidence = [], [], [], [], []
+    for record in records:
+        run_ids.append(record.get("run_id"))
+        recorded.append(decision.get(record.get("final_decision"), MISSING))
+        gate.append(verdict.get((record.get("workflow_gate") or {}).get("decision"), MISSING))
+        for component in components:
+            result = record.get(f"{component}_eval") or {}
+            status.append(verdict.get(result.get("status"), MISSING))
+            value = result.get("confidence")
+            confidence.append(float(value) if isinstance(value, (int, float)) else np.nan)
+    if not run_ids:
+        return _empty(np, components)
+    n, k = len(run_ids), len(components)
+    return Columns(
+        run_ids=run_ids,
+        components=tuple(components),
+        status=np.array(status, dtype=np.uint8).reshape(n, k),
+        confidence=np.array(confidence, dtype=np.float32).reshape(n, k),
+        gate=np.array(gate, dtype=np.uint8),
+        recorded=np.array(recorded, dtype=np.uint8),
+    )
+
+
+def _empty(np, components: Sequence[str]) -> Columns:
+    k = len(components)
+    return Columns([], tuple(components), np.zeros((0, k), np.uint8), np.zeros((0, k), np.float32),
+                   np.zeros(0, np.uint8), np.zeros(0, np.uint8))
+
+
+def _decide(columns: Columns, status) -> Any:
+    # final_arbiter over (possibly remapped) statuses, behind the gate:
+    # gate KILL -> KILL; any KILL -> KILL; any INSUFFICIENT_INFO ->
+    # INSUFFICIENT_INFO; all present and PASS -> BUILD; anything else KILL.
+    np = _np()
+    decisions = np.full(len(columns), KILL, dtype=np.uint8)
+    insufficient = (status == INSUFFICIENT).any(axis=1) & ~(status == KILL).any(axis=1)
+    decisions[insufficient] = INSUFFICIENT
+    decisions[(status == PASS).all(axis=1)] = BUILD
+    return _finish(columns, decisions)
+
+
+def _finish(columns: Columns, decisions) -> Any:
+    # Gate KILLs stay KILL; runs with no verdicts at all keep their logged decision.
+    decisions[columns.gate == KILL] = KILL
+    unjudged = (columns.gate == MISSING) & (columns.status == MISSING).all(axis=1)
+    decisions[unjudged] = columns.recorded[unjudged]
+    return decisions
+
+
+def rejection_first() -> Callable[[Columns], Any]:
+    """final_arbiter's rule (agents/arbiter.py), vectorized."""
+    def rule(columns: Columns):
+        return _decide(columns, columns.status)
+    return rule
+
+
+def min_kill_confidence(threshold: float) -> Callable[[Columns], Any]:
+    """rejection_first, but an evaluator KILL below threshold confidence counts as PASS."""
+    def rule(columns: Columns):
+        status = columns.status.copy()
+        status[(status == KILL) & (columns.confidence < threshold)] = PASS
+        return _decide(columns, status)
+    return rule
+
+
+def insufficient_as(verdict: str) -> Callable[[Columns], Any]:
+    """rejection_first with INSUFFICIENT_INFO statuses read as verdict (PASS or KILL)."""
+    code = VERDICTS.index(verdict.upper())
+
+    def rule(columns: Columns):
+        status = columns.status.copy()
+        status[status == INSUFFICIENT] = code
+        return _decide(columns, status)
+    return rule
+
+
+def weighted(threshold: float = 0.0, **weights: float) -> Callable[[Columns], Any]:
+    """BUILD when the weighted mean of signed confidences (+ PASS, - KILL, 0 otherwise) reaches threshold.
+
+    weights are per component (market=2, ...), 1 for components not named;
+    the gate still KILLs first. ValueError for a negative weight, or when
+    the weights of the scored components sum to zero.
+    """
+    for name, value in weights.items():
+        if not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"weighted: weight {name}={value!r} must be a number >= 0")
+    if not sum(weights.get(c, 1.0) for c in set(COMPONENTS) | set(weights)) > 0:
+        raise ValueError("weighted: weights sum to zero")
+
+    def rule(columns: Columns):
+        np = _np()
+        w = np.array([float(weights.get(c, 1.0)) for c in columns.components], dtype=np.float32)
+        if not w.sum() > 0:
+            raise ValueError(f"weighted: weights of {', '.join(columns.components)} sum to zero")
+        confidence = np.nan_to_num(columns.confidence)
+        signed = np.where(columns.status == PASS, confidence, np.where(columns.status == KILL, -confidence, 0.0))
+        score = signed @ w / w.sum()
+        return _finish(columns, np.where(score >= threshold, BUILD, KILL).astype(np.uint8))
+    return rule
+
+
+def register_rule(name: str, spec: str) -> None:
+    """Make rule_from_spec(name...) build its rule with the factory at spec ("module:factory")."""
+    if ":" not in spec:
+        raise ValueError(f"Rule spec must look like 'module:factory', got {spec!r}")
+    RULES[name] = spec
+
+
+def rule_from_spec(spec: str) -> Callable[[Columns], Any]:
+    """Build a rule from "name" or "name:key=value,..." (values are read as floats where possible)."""
+    name, _, args = spec.partition(":")
+    if name not in RULES:
+        raise ValueError(f"Unknown rule {name!r}; known: {', '.join(sorted(RULES))}")
+    kwargs = {}
+    for item in filter(None, args.split(",")):
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Rule argument must look like key=value, got {item!r}")
+        try:
+            kwargs[key.strip()] = float(value)
+        except ValueError:
+            kwargs[key.strip()] = value.strip()
+    module, _, attr = RULES[name].partition(":")
+    return getattr(importlib.import_module(module), attr)(**kwargs)
+
+
+def decision_names(decisions) -> List[Optional[str]]:
+    """Decision codes back to "BUILD" / "KILL" / "INSUFFICIENT_INFO" (None when missing)."""
+    return [DECISIONS[code] for code in decisions.tolist()]
+
+
+def diff(columns: Columns, base, other, examples: int = 20) -> Dict[str, Any]:
+    """Compare two decision arrays over the same runs.
+
+    Output:
+    - runs, changed: run count and how many decisions differ
+    - transitions: {"BUILD->KILL": count, ...} for every changed pair
+    - decisions: per-decision totals under base and under other
+    - examples: up to `examples` changed runs as {run_id, base, other}
+    """
+    np = _np()
+    size = len(DECISIONS)
+    counts = np.bincount(base.astype(np.intp) * size + other, minlength=size * size).reshape(size, size)
+    changed = np.flatnonzero(base != other)
+    return {
+        "runs": len(columns),
+        "changed": int(changed.size),
+        "transitions": {
+            f"{DECISIONS[a]}->{DECISIONS[b]}": int(counts[a, b])
+            for a in range(size) for b in range(size) if a != b and counts[a, b]
+        },
+        "decisions": {
+            "base": {DECISIONS[i]: int(n) for i, n in enumerate(counts.sum(axis=1)) if n},
+            "other": {DECISIONS[i]: int(n) for i, n in enumerate(counts.sum(axis=0)) if n},
+        },
+        "examples": [
+            {"run_id": columns.run_ids[i], "base": DECISIONS[base[i]], "other": DECISIONS[other[i]]}
+            for i in changed[:examples].tolist()
+        ],
+    }
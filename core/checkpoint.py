@@ -0,0 +1,306 @@
+import os
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+"""Durable graph checkpoints in a local sqlite file, keyed by run_id.
+
+With a checkpointer, langgraph saves a checkpoint after every superstep and
+each finished node's writes as soon as the node returns, so a run that dies
+part-way resumes at the node where it stopped: under the strict policy a
+completed gate or evaluator is not called again, only the nodes still
+pending are. Panel and fused nodes are one node each and resume as a whole
+(LLM_CACHE=sqlite covers the calls inside them).
+
+SqliteCheckpointSaver is a BaseCheckpointSaver over three tables:
+checkpoints, channel values (stored once per channel version, so the brief
+is written once per run rather than once per step) and pending writes.
+Values go through langgraph's serializer, which round-trips EngineState
+including PreparedBrief. Connections run in WAL mode with
+synchronous=NORMAL: a commit survives a process crash; an OS crash can
+lose the last few commits, which only means re-running those nodes.
+
+Enable with CHECKPOINT_DB=<path> (default off) or ctx.config["checkpointer"]
+(a saver, or a path). invoke_run / ainvoke_run run one EngineState under its
+run_id as the thread id: a new run starts, an interrupted one resumes, a
+finished one returns its stored final state without running anything.
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[int]):
+    # BaseCheckpointSaver persisted to sqlite; one connection shared under a lock.
+    def __init__(self, path: str, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints (thread_id TEXT NOT NULL, ns TEXT NOT NULL, "
+                "checkpoint_id TEXT NOT NULL, parent_id TEXT, type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB, "
+                "PRIMARY KEY (thread_id, ns, checkpoint_id))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (thread_id TEXT NOT NULL, ns TEXT NOT NULL, channel TEXT NOT NULL, "
+                "version TEXT NOT NULL, type TEXT, value BLOB, PRIMARY KEY (thread_id, ns, channel, version))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS writes (thread_id TEXT NOT NULL, ns TEXT NOT NULL, "
+                "checkpoint_id TEXT NOT NULL, task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT, "
+                "type TEXT, value BLOB, task_path TEXT, PRIMARY KEY (thread_id, ns, checkpoint_id, task_id, idx))"
+            )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """The checkpoint named by config's checkpoint_id, or the thread's latest."""
+        configurable = config["configurable"]
+        thread_id, ns = configurable["thread_id"], configurable.get("checkpoint_ns", "")
+        query = ("SELECT checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata FROM checkpoints "
+                 "WHERE thread_id = ? AND ns = ?")
+        params: Tuple[Any, ...] = (thread_id, ns)
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._db.execute(query, params).fetchone()
+            if row is None:
+                return None
+            return self._tuple(thread_id, ns, *row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[CheckpointTuple]:
+        """Checkpoints newest first, optionally for one thread, before a checkpoint, or matching metadata."""
+        query = "SELECT thread_id, ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+        clauses, params = [], []
+        if config:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                clauses.append("ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                values = self.serde.loads_typed((row[6], row[7]))
+                if not all(values.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                item = self._tuple(*row)
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        """Save a checkpoint; channel values are stored only for the channels that changed."""
+        configurable = config["configurable"]
+        thread_id, ns = configurable["thread_id"], configurable["checkpoint_ns"]
+        saved = checkpoint.copy()
+        values = saved.pop("channel_values")
+        blobs = []
+        for channel, version in new_versions.items():
+            kind, value = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", b"")
+            blobs.append((thread_id, ns, channel, str(version), kind, value))
+        kind, payload = self.serde.dumps_typed(saved)
+        meta_kind, meta = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, ns, checkpoint["id"], configurable.get("checkpoint_id"), kind, payload, meta_kind, meta)
+            )
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        """Save a finished task's writes against the checkpoint it ran from."""
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            kind, payload = self.serde.dumps_typed(value)
+            rows.append(key + (task_id, WRITES_IDX_MAP.get(channel, idx), channel, kind, payload, task_path))
+        # As in InMemorySaver: a task's regular writes keep their first value,
+        # special ones (errors, interrupts; negative idx) the latest.
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [row for row in rows if row[4] >= 0])
+            self._db.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [row for row in rows if row[4] < 0])
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock, self._db:
+            for table in ("checkpoints", "blobs", "writes"):
+                self._db.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    # sqlite calls take microseconds, so the async variants run inline.
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _tuple(self, thread_id: str, ns: str, checkpoint_id: str, parent_id: Optional[str],
+               kind: str, payload: bytes, metadata_kind: str, metadata: bytes) -> CheckpointTuple:
+        # Caller holds the lock. Rebuild channel_values from the versions the checkpoint names.
+        checkpoint = self.serde.loads_typed((kind, payload))
+        values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            row = self._db.execute(
+                "SELECT type, value FROM blobs WHERE thread_id = ? AND ns = ? AND channel = ? AND version = ?",
+                (thread_id, ns, channel, str(version))
+            ).fetchone()
+            if row is not None and row[0] != "empty":
+                values[channel] = self.serde.loads_typed(row)
+        writes = self._db.execute(
+            "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? AND ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, ns, checkpoint_id)
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": values},
+            metadata=self.serde.loads_typed((metadata_kind, metadata)),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((kind, value))) for task_id, channel, kind, value in writes],
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            )
+        )
+
+
+_savers: Dict[str, SqliteCheckpointSaver] = {}
+_savers_lock = threading.Lock()
+
+
+def get_checkpointer(config: Dict[str, Any]) -> Optional[BaseCheckpointSaver]:
+    """The checkpointer for build_graph: ctx.config["checkpointer"] over CHECKPOINT_DB; None when off.
+
+    Savers are shared per path within the process.
+    """
+    setting = config.get("checkpointer") or os.getenv("CHECKPOINT_DB", "off")
+    if isinstance(setting, BaseCheckpointSaver):
+        return setting
+    if str(setting).lower() in ("off", "0", "none", "false", ""):
+        return None
+    path = os.path.abspath(setting)
+    with _savers_lock:
+        if path not in _savers:
+            _savers[path] = SqliteCheckpointSaver(path)
+        return _savers[path]
+
+
+def run_config(run_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": run_id}}
+
+
+def invoke_run(graph, state: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """graph.invoke(state), resuming from the run's checkpoints when the graph has a checkpointer.
+
+    Returns (final state, origin): origin is "new" for a run that started
+    here, "resumed" for one continued from its last checkpoint and "stored"
+    for one that had already finished (nothing ran).
+    """
+    if graph.checkpointer is None:
+        return graph.invoke(state), "new"
+    config = run_config(state["run_id"])
+    snapshot = graph.get_state(config)
+    if not snapshot.values:
+        return graph.invoke(state, config), "new"
+    if snapshot.next:
+        return graph.invoke(None, config), "resumed"
+    return snapshot.values, "stored"
+
+
+async def ainvoke_run(graph, state: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """Async variant of invoke_run."""
+    if graph.checkpointer is None:
+        return await graph.ainvoke(state), "new"
+    config = run_config(state["run_id"])
+    snapshot = await graph.aget_state(config)
+    if not snapshot.values:
+        return await graph.ainvoke(state, config), "new"
+    if snapshot.next:
+        return await graph.ainvoke(None, config), "resumed"
+    return snapshot.values, "stored"
@@ -6,8 +6,14 @@ from llm.base import LLMClient
 Contains runtime dependencies such as the LLM client and optional helper
 components (retriever, tools, config). Agents depend on this lightweight
 container to avoid global state.
+
+POLICIES lists the execution policies build_graph accepts
+(config["execution_policy"]); it lives here rather than in graph.py so
+argument parsers can offer the choices without importing langgraph.
 """
 
+POLICIES = ("strict", "speculative", "short-circuit", "fused", "gate-fused")
+
 class ExecutionContext:
     # Container for runtime dependencies used by agents.
     def __init__(
@@ -0,0 +1,492 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from operator import eq
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from core.log_index import LogIndex, default_index_path
+from core.logger import LOD_DIR, add_record_listener, read_source, recover_segments, shadow_sources
+from core.results import result_from
+from core.state import EvalResult, GateResult
+
+"""Near-duplicate brief detection (MinHash + LSH).
+
+Generators and scrapers emit briefs that differ only trivially (a reworded
+concept_hook over the same customer, pain point and mechanism). A brief is
+fingerprinted as a MinHash signature over normalized word shingles, each
+tagged with its field ("mechanism:ocr invoices"), so the signature
+estimates the Jaccard similarity of two briefs' shingle sets. The
+signature is a one-permutation MinHash (one hash per shingle rather than
+one per shingle and permutation), which keeps fingerprinting in pure
+Python to a fraction of a millisecond. Signatures are split into LSH
+bands; briefs sharing any band are candidates, and a candidate whose
+estimated similarity reaches the threshold is a match.
+
+BriefIndex holds previously evaluated briefs (run_id and final decision
+per signature) compactly enough for millions of entries: signatures are
+16-bit values in one array (128 bytes per brief at 64 values) and each
+band is a sorted array of 64-bit band values with their entry ids,
+searched by bisection, plus a small unsorted tail for recent additions.
+A lookup is one bisection per band once the brief is fingerprinted.
+
+The index is built from the shadow logs. build() fingerprints every
+finished segment not seen yet and caches the signatures in a sqlite file
+(DEDUP_INDEX, default <SHADOW_LOG_DIR>/dedup.sqlite3), so later processes
+load signatures instead of re-fingerprinting. Runs logged by this process
+are added as they are logged (observe(), a shadow-log record listener);
+build() does not index those run_ids a second time.
+
+Graph stage (see graph.py): DEDUP=attach|skip (or ctx.config["dedup"])
+adds a node before the gate. attach records the match on the state
+(duplicate_of) and evaluates as usual; skip returns the prior verdict
+and ends the run without LLM calls. A skipped run also gets the prior
+run's gate and evaluator results, loaded from its shadow-log record
+through the log index (core/log_index.py), so it is logged and indexed
+like the run it copies; when that record cannot be found, duplicate_of
+carries copied=False and only the verdict is set. DEDUP_THRESHOLD (default
+0.7) is the minimum estimated similarity.
+"""
+
+DEFAULT_THRESHOLD = 0.7
+NUM_PERM = 64
+# Signature values per LSH band: four 16-bit values make one 64-bit band key.
+ROWS = 4
+SHINGLE_WORDS = 2
+
+_EMPTY = 1 << 64
+_DENSIFY = 0x9E37
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class Match(NamedTuple):
+    # A previously evaluated near-duplicate.
+    run_id: str
+    final_decision: Optional[str]
+    similarity: float
+
+
+def _words(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return _WORD.findall(value.lower())
+    if isinstance(value, (list, tuple)):
+        return [word for item in value for word in _words(item)]
+    if isinstance(value, dict):
+        return [word for item in value.values() for word in _words(item)]
+    return _WORD.findall(str(value).lower()) if value is not None else []
+
+
+def shingles(brief: Any, size: int = SHINGLE_WORDS) -> set:
+    """Normalized word shingles of every field, tagged with the field name."""
+    if not isinstance(brief, dict):
+        brief = {"brief": brief}
+    out = set()
+    for field, value in brief.items():
+        words = _words(value)
+        if len(words) < size:
+            if words:
+                out.add(f"{field}:{' '.join(words)}")
+            continue
+        for i in range(len(words) - size + 1):
+            out.add(f"{field}:{' '.join(words[i:i + size])}")
+    return out
+
+
+class MinHasher:
+    # One-permutation MinHash: one 64-bit hash per shingle, split into num_perm bins.
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1, shingle_words: int = SHINGLE_WORDS):
+        self.num_perm = num_perm
+        self.seed = seed
+        self.shingle_words = shingle_words
+        self._key = seed.to_bytes(8, "little")
+
+    @property
+    def params(self) -> Dict[str, int]:
+        return {"num_perm": self.num_perm, "seed": self.seed, "shingle_words": self.shingle_words}
+
+    def signature(self, brief: Any) -> Optional[array]:
+        """The brief's signature: num_perm 16-bit values; None for a brief with no words.
+
+        Each shingle's hash picks a bin (hash mod num_perm) and competes for
+        that bin's minimum on its top 16 bits; empty bins borrow from the
+        next filled bin, offset by the distance (rotation densification), so
+        every position stays comparable across briefs. A wordless brief has
+        nothing to compare, so it neither matches nor is indexed.
+        """
+        n = self.num_perm
+        mins = [_EMPTY] * n
+        key = self._key
+        for shingle in shingles(brief, self.shingle_words):
+            h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8, key=key).digest(), "little")
+            i = h % n
+            if h < mins[i]:
+                mins[i] = h
+        if min(mins) == _EMPTY:
+            return None
+        out = array("H", bytes(2 * n))
+        for i in range(n):
+            distance = 0
+            while mins[(i + distance) % n] == _EMPTY:
+                distance += 1
+            out[i] = ((mins[(i + distance) % n] >> 48) + distance * _DENSIFY) & 0xFFFF
+        return out
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(map(eq, a, b)) / len(a)
+
+
+class _Band:
+    # One LSH band: band value -> entry ids, as sorted arrays plus an unsorted tail.
+    def __init__(self):
+        self.keys = array("q")
+        self.ids = array("i")
+        self.pending: Dict[int, List[int]] = {}
+        self.pending_count = 0
+
+    def add(self, key: int, entry: int) -> None:
+        entries = self.pending.get(key)
+        if entries is None:
+            self.pending[key] = [entry]
+        else:
+            entries.append(entry)
+        self.pending_count += 1
+
+    def get(self, key: int) -> List[int]:
+        found = list(self.pending.get(key, ()))
+        keys = self.keys
+        i = bisect_left(keys, key)
+        # Band values rarely repeat, so scan rather than bisect a second time.
+        while i < len(keys) and keys[i] == key:
+            found.append(self.ids[i])
+            i += 1
+        return found
+
+    def compact(self) -> None:
+        # Merge the tail into the sorted arrays.
+        if not self.pending:
+            return
+        pairs = list(zip(self.keys, self.ids))
+        pairs.extend((key, entry) for key, entries in self.pending.items() for entry in entries)
+        pairs.sort()
+        self.keys = array("q", [key for key, _ in pairs])
+        self.ids = array("i", [entry for _, entry in pairs])
+        self.pending = {}
+        self.pending_count = 0
+
+
+class BriefIndex:
+    # In-memory MinHash/LSH index of evaluated briefs; thread-safe.
+    def __init__(self, hasher: Optional[MinHasher] = None, path: Optional[str] = None):
+        """Create an index, loading cached signatures from path if given.
+
+        Inputs:
+        - hasher: MinHasher; its num_perm must be a multiple of ROWS and
+          sets the number of bands (num_perm / ROWS). More bands find lower
+          similarities at the cost of memory (2 + 12 bytes per brief per
+          signature value and band)
+        - path: sqlite signature cache written by build(); None keeps the
+          index in memory only
+        """
+        self.hasher = hasher or MinHasher()
+        if self.hasher.num_perm % ROWS:
+            raise ValueError(f"num_perm ({self.hasher.num_perm}) must be a multiple of {ROWS}")
+        bands = self.hasher.num_perm // ROWS
+        self.path = path
+        self._lock = threading.Lock()
+        self._signatures = array("H")
+        self._run_ids: List[str] = []
+        self._decisions: List[Optional[str]] = []
+        self._bands = [_Band() for _ in range(bands)]
+        # run_id -> signature computed by lookup(), reused when the run is logged.
+        self._recent: "OrderedDict[str, array]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._run_ids)
+
+    def add(self, brief: Any, run_id: str, final_decision: Optional[str], signature: Optional[array] = None) -> None:
+        """Index one evaluated brief (in memory only; build() persists logged runs)."""
+        signature = signature if signature is not None else self.hasher.signature(brief)
+        if signature is None:
+            return
+        with self._lock:
+            self._append(signature, run_id, final_decision)
+
+    def lookup(self, brief: Any, threshold: float = DEFAULT_THRESHOLD, run_id: Optional[str] = None) -> Optional[Match]:
+        """Best indexed match with estimated similarity >= threshold, or None.
+
+        With run_id, the brief's signature is kept briefly so observe() can
+        index the finished run without fingerprinting it again.
+        """
+        signature = self.hasher.signature(brief)
+        if signature is None:
+            return None
+        with self._lock:
+            if run_id is not None:
+                self._recent[run_id] = signature
+                if len(self._recent) > 10000:
+                    self._recent.popitem(last=False)
+            return self._best(signature, threshold)
+
+    def observe(self, record: Dict[str, Any]) -> None:
+        """Shadow-log record listener: index a finished run.
+
+        Runs that were answered from a duplicate without being evaluated
+        are not indexed again.
+        """
+        with self._lock:
+            signature = self._recent.pop(record.get("run_id"), None)
+        duplicate = record.get("duplicate_of")
+        if duplicate and duplicate.get("skipped"):
+            return
+        self.add(record.get("brief"), record.get("run_id"), record.get("final_decision"), signature)
+
+    def build(self, directory: Optional[str] = None) -> int:
+        """Fingerprint every finished shadow-log file not indexed yet; returns briefs added.
+
+        Runs already in the index (added by observe()) are stored in the
+        cache but not added to the bands again.
+
+        With a cache path the signatures are stored there, and files already
+        stored are skipped on later builds. Segments orphaned by a dead writer
+        are finalized first (recover_segments).
+        """
+        directory = directory or os.getenv("SHADOW_LOG_DIR", LOD_DIR)
+        recover_segments(directory)
+        db = self._connection()
+        done = {name for (name,) in db.execute("SELECT name FROM sources")} if db else set()
+        with self._lock:
+            # Runs observe() already indexed are cached below but not added twice.
+            indexed = set(self._run_ids)
+        added = 0
+        for path in shadow_sources(directory):
+            if path.name in done:
+                continue
+            rows = []
+            for line, record in enumerate(read_source(path)):
+                duplicate = record.get("duplicate_of")
+                if duplicate and duplicate.get("skipped"):
+                    continue
+                signature = self.hasher.signature(record.get("brief"))
+                if signature is None:
+                    continue
+                rows.append((record.get("run_id"), record.get("final_decision"), signature, path.name, line))
+            with self._lock:
+                for run_id, decision, signature, _, _ in rows:
+                    if run_id in indexed:
+                        continue
+                    indexed.add(run_id)
+                    self._append(signature, run_id, decision, bulk=True)
+                    added += 1
+            if db:
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO briefs (run_id, final_decision, signature, source, line) VALUES (?, ?, ?, ?, ?)",
+                        [(run_id, decision, signature.tobytes(), source, line) for run_id, decision, signature, source, line in rows]
+                    )
+                    db.execute("INSERT OR REPLACE INTO sources (name) VALUES (?)", (path.name,))
+        if added:
+            with self._lock:
+                self._rebuild()
+        return added
+
+    def compact(self) -> None:
+        """Merge recent additions into the sorted band arrays (done automatically as they grow)."""
+        with self._lock:
+            for band in self._bands:
+                band.compact()
+
+    def _append(self, signature: array, run_id: str, final_decision: Optional[str], bulk: bool = False) -> None:
+        # Caller holds the lock. Bulk loads skip the bands and _rebuild() them once.
+        entry = len(self._run_ids)
+        self._signatures.extend(signature)
+        self._run_ids.append(run_id)
+        self._decisions.append(final_decision)
+        if bulk:
+            return
+        for band, key in zip(self._bands, self._band_keys(signature)):
+            band.add(key, entry)
+        first = self._bands[0]
+        if first.pending_count > max(4096, len(first.keys) // 4):
+            for band in self._bands:
+                band.compact()
+
+    @staticmethod
+    def _band_keys(signature: array) -> array:
+        # ROWS 16-bit values per band reinterpreted as one 64-bit key (in-memory only).
+        return array("q", signature.tobytes())
+
+    def _rebuild(self) -> None:
+        # Caller holds the lock. Sort every band's keys from the signatures.
+        keys = self._band_keys(self._signatures)
+        count, bands = len(self._run_ids), len(self._bands)
+        for b, band in enumerate(self._bands):
+            column = keys[b::bands]
+            order = sorted(range(count), key=column.__getitem__)
+            band.keys = array("q", [column[i] for i in order])
+            band.ids = array("i", order)
+            band.pending = {}
+            band.pending_count = 0
+
+    def _best(self, signature: array, threshold: float) -> Optional[Match]:
+        # Caller holds the lock.
+        candidates = set()
+        for band, key in zip(self._bands, self._band_keys(signature)):
+            candidates.update(band.get(key))
+        best, best_score = None, threshold
+        n = self.hasher.num_perm
+        for entry in candidates:
+            score = similarity(signature, self._signatures[entry * n:(entry + 1) * n])
+            if score >= best_score:
+                best, best_score = entry, score
+        if best is None:
+            return None
+        return Match(self._run_ids[best], self._decisions[best], round(best_score, 3))
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Used from build() and _load() only, on the building thread.
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS briefs (run_id TEXT, final_decision TEXT, signature BLOB, "
+                       "source TEXT NOT NULL, line INTEGER NOT NULL, PRIMARY KEY (source, line))")
+            db.execute("CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY)")
+            params = json.dumps(self.hasher.params, sort_keys=True)
+            row = db.execute("SELECT value FROM meta WHERE key = 'hasher'").fetchone()
+            with db:
+                if row is not None and row[0] != params:
+                    # Signatures from different hasher settings are not comparable.
+                    db.execute("DELETE FROM briefs")
+                    db.execute("DELETE FROM sources")
+                db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('hasher', ?)", (params,))
+            self._db = db
+        return self._db
+
+    def _load(self) -> None:
+        db = self._connection()
+        with self._lock:
+            for run_id, decision, blob in db.execute("SELECT run_id, final_decision, signature FROM briefs ORDER BY rowid"):
+                signature = array("H")
+                signature.frombytes(blob)
+                self._append(signature, run_id, decision, bulk=True)
+            self._rebuild()
+
+
+def default_dedup_path() -> Optional[str]:
+    directory = os.getenv("SHADOW_LOG_DIR", LOD_DIR)
+    path = os.getenv("DEDUP_INDEX", os.path.join(directory, "dedup.sqlite3"))
+    return None if path.lower() in ("off", "0", "none") else path
+
+
+_index: Optional[BriefIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> BriefIndex:
+    """The process-wide index: cached signatures plus shadow logs not seen yet, kept
+    current with runs logged by this process."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = BriefIndex(path=default_dedup_path())
+                index.build()
+                add_record_listener(index.observe)
+                _index = index
+    return _index
+
+
+_log_index: Optional[LogIndex] = None
+_log_index_resolved = False
+
+
+def get_log_index() -> Optional[LogIndex]:
+    """The shadow-log index skipped runs read prior results from; None when SHADOW_LOG_INDEX is off."""
+    global _log_index, _log_index_resolved
+    if not _log_index_resolved:
+        with _index_lock:
+            if not _log_index_resolved:
+                path = default_index_path()
+                if path.lower() not in ("off", "0", "none"):
+                    _log_index = LogIndex(path, logs_dir=os.getenv("SHADOW_LOG_DIR", LOD_DIR))
+                _log_index_resolved = True
+    return _log_index
+
+
+def prior_results(runs: Optional[LogIndex], run_id: str, eval_keys: Sequence[str]) -> Optional[Dict[str, Any]]:
+    """State patch with the gate and evaluator results run_id logged; None when its record is not found."""
+    if runs is None:
+        return None
+    rows = runs.query(run_id=run_id, limit=1)
+    if not rows:
+        return None
+    try:
+        record = runs.record(rows[0])
+    except OSError:
+        # The segment was moved or deleted after it was indexed.
+        return None
+    if record is None:
+        return None
+    gate = record.get("workflow_gate")
+    patch = {"workflow_gate_result": result_from(gate, GateResult) if gate else None}
+    for key in eval_keys:
+        result = record.get(key)
+        patch[key] = result_from(result, EvalResult) if result else None
+    return patch
+
+
+def dedup_settings(config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """{"mode", "threshold"} from ctx.config over DEDUP / DEDUP_THRESHOLD; None when off."""
+    mode = (config.get("dedup") or os.getenv("DEDUP", "off")).lower()
+    if mode in ("off", "0", "none", "false"):
+        return None
+    if mode not in ("attach", "skip"):
+        raise ValueError(f"Unsupported dedup mode: {mode} (expected off, attach or skip)")
+    threshold = float(config.get("dedup_threshold") or os.getenv("DEDUP_THRESHOLD", DEFAULT_THRESHOLD))
+    return {"mode": mode, "threshold": threshold}
+
+
+def dedup_patch(
+    index: BriefIndex,
+    state: Dict[str, Any],
+    mode: str,
+    threshold: float,
+    runs: Optional[LogIndex] = None,
+    eval_keys: Sequence[str] = ("market_eval", "business_eval", "technical_eval")
+) -> Dict[str, Any]:
+    """Partial state patch for the dedup stage.
+
+    Inputs:
+    - runs: log index the prior run's results are copied from when skipping
+    - eval_keys: evaluator state keys to copy (the graph's registry keys)
+
+    Output:
+    - {} without a match; duplicate_of otherwise, plus, when skipping, the
+      prior verdict and (copied=True) the prior gate and evaluator results
+    """
+    match = index.lookup(state.get("brief"), threshold, run_id=state.get("run_id"))
+    if match is None:
+        return {}
+    if mode != "skip":
+        return {"duplicate_of": {**match._asdict(), "skipped": False}}
+    prior = prior_results(runs, match.run_id, eval_keys)
+    return {
+        **(prior or {}),
+        "duplicate_of": {**match._asdict(), "skipped": True, "copied": prior is not None},
+        "final_decision": match.final_decision,
+    }
@@ -0,0 +1,196 @@
+import json
+import os
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from core.tracing import parse_json
+from core.results import parse_result, result_from
+
+"""Streaming completions with an early verdict.
+
+Agents' answers put the verdict ("decision" / "status") before the long
+"reason", so with streaming on the verdict is known while the reason is
+still being generated. VerdictScanner reads the top-level scalar fields of
+a JSON object incrementally as chunks arrive; complete_json /
+acomplete_json drive an LLM stream through it and:
+- call the verdict_listener context variable with the verdict as soon as
+  it is scanned (the panel uses this to drop sibling evaluators the moment
+  a KILL is known instead of when its reason finishes),
+- with early_kill on, stop reading at a KILL verdict once the "reason"
+  field starts (the prompts put it last) and return the fields seen so
+  far; closing the stream ends generation, so the reason's tokens are
+  neither waited for nor (mostly) paid for.
+
+Settings (ExecutionContext.config, falling back to the environment):
+- "stream" / LLM_STREAM=1: agents use generate_stream instead of generate
+- "early_kill" / LLM_EARLY_KILL=1: stop at a KILL verdict; the stored
+  reason is then EARLY_KILL_REASON unless it had already been streamed
+
+Streaming is off by default; without it agents behave exactly as before.
+
+With result_type (EvalResult / GateResult) the answer is parsed and validated
+by core/results.py instead of json.loads, early-KILL fields included.
+"""
+
+EARLY_KILL_REASON = "(reason not read: stopped at the KILL verdict)"
+
+# Called with the verdict value ("PASS" / "KILL") once it is scanned.
+verdict_listener: ContextVar[Optional[Callable[[str], None]]] = ContextVar("verdict_listener", default=None)
+
+
+class VerdictScanner:
+    # Incremental reader for the top-level scalar fields of one JSON object.
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = True
+        self._key: Optional[str] = None
+        self._token: list = []
+
+    @property
+    def reading(self) -> Optional[str]:
+        """Key whose value is being read, once its ':' has been seen."""
+        return None if self._expect_key else self._key
+
+    def feed(self, chunk: str) -> None:
+        """Consume the next chunk; completed fields appear in self.fields."""
+        for char in chunk:
+            if self._in_string:
+                if self._depth == 1:
+                    self._token.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._complete()
+                continue
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._token = ['"']
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 1:
+                    self._complete()
+                self._depth -= 1
+                if self._depth == 1:
+                    # A nested value ended; it is not recorded.
+                    self._expect_key = True
+            elif self._depth != 1:
+                continue
+            elif char == ":":
+                self._expect_key = False
+            elif char == ",":
+                self._complete()
+                self._expect_key = True
+            elif not char.isspace():
+                self._token.append(char)
+
+    def _complete(self) -> None:
+        # A key or scalar value token at depth 1 ended.
+        if not self._token:
+            return
+        raw, self._token = "".join(self._token), []
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        if self._expect_key:
+            self._key = value
+        elif self._key is not None:
+            self.fields[self._key] = value
+            self._key = None
+
+
+def _enabled(context, key: str, env_var: str) -> bool:
+    value = context.config.get(key)
+    if value is None:
+        return os.getenv(env_var, "0").lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _early_result(fields: Dict[str, Any]) -> Dict[str, Any]:
+    return {**fields, "reason": fields.get("reason", EARLY_KILL_REASON)}
+
+
+class _Reader:
+    # Shared bookkeeping for complete_json / acomplete_json.
+    def __init__(self, verdict_field: str, early_kill: bool, result_type: Optional[type]):
+        self.verdict_field = verdict_field
+        self.early_kill = early_kill
+        self.result_type = result_type
+        self.scanner = VerdictScanner()
+        self.parts: list = []
+        self.verdict: Optional[str] = None
+
+    def feed(self, chunk: str) -> bool:
+        # Record a chunk; True when reading should stop.
+        self.parts.append(chunk)
+        stopping = self.early_kill and self.verdict == "KILL"
+        if self.verdict is not None and not stopping:
+            return False
+        self.scanner.feed(chunk)
+        if self.verdict is None:
+            verdict = self.scanner.fields.get(self.verdict_field)
+            if verdict is None:
+                return False
+            # Validation accepts " kill" too; compare and report the canonical form.
+            self.verdict = verdict.strip().upper() if isinstance(verdict, str) else verdict
+            listener = verdict_listener.get()
+            if listener is not None:
+                listener(self.verdict)
+            stopping = self.early_kill and self.verdict == "KILL"
+        return stopping and (self.scanner.reading == "reason" or "reason" in self.scanner.fields)
+
+    def result(self) -> Any:
+        return parse_json("".join(self.parts), _loads(self.result_type))
+
+    def early_result(self) -> Any:
+        fields = _early_result(self.scanner.fields)
+        return fields if self.result_type is None else result_from(fields, self.result_type)
+
+
+def _loads(result_type: Optional[type]) -> Callable[[str], Any]:
+    return json.loads if result_type is None else partial(parse_result, result_type=result_type)
+
+
+def complete_json(context, system: str, user: str, verdict_field: str, result_type: Optional[type] = None) -> Any:
+    """Return the LLM's parsed JSON answer, streaming it when enabled.
+
+    Raises ValueError on malformed output (json.JSONDecodeError, or a
+    validation error with result_type).
+    """
+    if not _enabled(context, "stream", "LLM_STREAM"):
+        return parse_json(context.llm.generate(system=system, user=user), _loads(result_type))
+    reader = _Reader(verdict_field, _enabled(context, "early_kill", "LLM_EARLY_KILL"), result_type)
+    stream = context.llm.generate_stream(system, user)
+    try:
+        for chunk in stream:
+            if reader.feed(chunk):
+                return reader.early_result()
+    finally:
+        stream.close()
+    return reader.result()
+
+
+async def acomplete_json(context, system: str, user: str, verdict_field: str,
+                         result_type: Optional[type] = None) -> Any:
+    """Async variant of complete_json over agenerate_stream."""
+    if not _enabled(context, "stream", "LLM_STREAM"):
+        return parse_json(await context.llm.agenerate(system=system, user=user), _loads(result_type))
+    reader = _Reader(verdict_field, _enabled(context, "early_kill", "LLM_EARLY_KILL"), result_type)
+    stream = context.llm.agenerate_stream(system, user)
+    try:
+        async for chunk in stream:
+            if reader.feed(chunk):
+                return reader.early_result()
+    finally:
+        await stream.aclose()
+    return reader.result()
@@ -0,0 +1,265 @@
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.logger import LOD_DIR, read_source, recover_segments, shadow_sources
+
+"""Queryable index over shadow logs.
+
+One sqlite row per logged run, keyed by run_id and timestamp and carrying
+the final decision, the gate decision and each component's status and
+confidence, plus where the full record lives (source file + record number).
+Runs the dedup stage skipped (core/dedup.py) carry the run_id they copied
+in duplicate_of, so they are not mistaken for evaluated runs; it is NULL
+for every other run.
+Every filter column is indexed together with the timestamp, so questions
+like "which briefs did TECHNICAL kill last week" are a single index range
+scan instead of a pass over every log file. Evaluators beyond the default
+three (registry dimensions, agents/registry.py) go to a side table, one
+row per run and component, keyed like runs by (source, record number);
+index files created before it existed are re-read by the next build().
+
+The index is kept current by the shadow-log writer (SHADOW_LOG_INDEX) and
+can be (re)built offline from existing segments and legacy per-run JSON
+files with build(); files already fully indexed are skipped, and rows are
+unique per (source, record number), so both paths can be mixed freely.
+"""
+
+COMPONENTS = ("market", "business", "technical")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS runs ("
+    "run_id TEXT NOT NULL, ts TEXT, final_decision TEXT, gate_decision TEXT, "
+    "market_status TEXT, market_confidence REAL, "
+    "business_status TEXT, business_confidence REAL, "
+    "technical_status TEXT, technical_confidence REAL, "
+    "duplicate_of TEXT, source TEXT NOT NULL, line INTEGER NOT NULL, "
+    "PRIMARY KEY (source, line))",
+    "CREATE TABLE IF NOT EXISTS components ("
+    "source TEXT NOT NULL, line INTEGER NOT NULL, component TEXT NOT NULL, "
+    "status TEXT, confidence REAL, PRIMARY KEY (source, line, component))",
+    "CREATE INDEX IF NOT EXISTS components_status ON components (component, status)",
+    "CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY, records INTEGER)",
+    "CREATE INDEX IF NOT EXISTS runs_run_id ON runs (run_id)",
+    "CREATE INDEX IF NOT EXISTS runs_ts ON runs (ts)",
+    "CREATE INDEX IF NOT EXISTS runs_decision ON runs (final_decision, ts)",
+    "CREATE INDEX IF NOT EXISTS runs_gate ON runs (gate_decision, ts)",
+    *(f"CREATE INDEX IF NOT EXISTS runs_{c} ON runs ({c}_status, ts)" for c in COMPONENTS),
+)
+
+_COLUMNS = (
+    "run_id", "ts", "final_decision", "gate_decision",
+    *(f"{c}_{field}" for c in COMPONENTS for field in ("status", "confidence")),
+    "duplicate_of", "source", "line",
+)
+
+
+def _iso(timestamp: Optional[str]) -> Optional[str]:
+    # Shadow logs stamp runs as %Y%m%d_%H%M%S; ISO text sorts and compares
+    # correctly as a string, which is what the range filters rely on.
+    if not timestamp:
+        return None
+    try:
+        return datetime.strptime(timestamp, "%Y%m%d_%H%M%S").isoformat()
+    except ValueError:
+        return timestamp
+
+
+def index_row(record: Dict[str, Any], source: str, line: int) -> Tuple:
+    """Flatten one shadow-log record into a runs row."""
+    gate = record.get("workflow_gate") or {}
+    row = [record.get("run_id", "unknown_run"), _iso(record.get("timestamp")),
+           record.get("final_decision"), gate.get("decision")]
+    for component in COMPONENTS:
+        result = record.get(f"{component}_eval") or {}
+        row += [result.get("status"), result.get("confidence")]
+    duplicate = record.get("duplicate_of") or {}
+    return (*row, duplicate.get("run_id") if duplicate.get("skipped") else None, source, line)
+
+
+def component_rows(record: Dict[str, Any], source: str, line: int) -> List[Tuple]:
+    """Side-table rows for the record's evaluators beyond COMPONENTS."""
+    rows = []
+    for key, result in record.items():
+        component = key[:-len("_eval")]
+        if key.endswith("_eval") and component not in COMPONENTS and isinstance(result, Mapping):
+            rows.append((source, line, component, result.get("status"), result.get("confidence")))
+    return rows
+
+
+def extra_component_sql(component: str, field: str) -> str:
+    """SQL expression for one side-table field of the current runs row (None when absent)."""
+    if not component.isidentifier():
+        raise ValueError(f"Invalid component name: {component!r}")
+    return (f"(SELECT {field} FROM components c WHERE c.source = runs.source "
+            f"AND c.line = runs.line AND c.component = '{component}')")
+
+
+class LogIndex:
+    # sqlite-backed index of shadow-log records; safe to share across threads.
+    def __init__(self, path: str, logs_dir: Optional[str] = None):
+        """Open (or create) the index.
+
+        Inputs:
+        - path: sqlite file
+        - logs_dir: where the indexed files live; defaults to the index's directory
+        """
+        self.path = path
+        self.logs_dir = Path(logs_dir) if logs_dir else Path(os.path.dirname(os.path.abspath(path)))
+        self._local = threading.local()
+        self._connection()  # Create the schema eagerly so bad paths fail fast.
+
+    def add(self, located: Iterable[Tuple[Dict[str, Any], str, int]]) -> None:
+        """Index (record, source file name, record number) triples."""
+        located = list(located)
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO runs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [index_row(record, source, line) for record, source, line in located]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO components (source, line, component, status, confidence) VALUES (?, ?, ?, ?, ?)",
+                [row for record, source, line in located for row in component_rows(record, source, line)]
+            )
+
+    def mark_complete(self, source: str) -> None:
+        """Record that source is final and fully indexed, so build() skips it."""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sources (name, records) "
+                "VALUES (?, (SELECT COUNT(*) FROM runs WHERE source = ?))",
+                (source, source)
+            )
+
+    def build(self, directory: Optional[str] = None) -> int:
+        """Index every finished shadow-log file not indexed yet; returns rows added.
+
+        Segments orphaned by a dead writer are finalized first (recover_segments).
+        """
+        directory = Path(directory) if directory else self.logs_dir
+        recover_segments(str(directory))
+        done = {name for (name,) in self._connection().execute("SELECT name FROM sources")}
+        added = 0
+        for path in shadow_sources(str(directory)):
+            if path.name in done:
+                continue
+            rows = [(record, path.name, line) for line, record in enumerate(read_source(path))]
+            self.add(rows)
+            self.mark_complete(path.name)
+            added += len(rows)
+        return added
+
+    def query(
+        self,
+        run_id: Optional[str] = None,
+        decision: Optional[str] = None,
+        gate: Optional[str] = None,
+        component: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: Optional[int] = 100
+    ) -> List[Dict[str, Any]]:
+        """Indexed rows matching every given filter, newest first.
+
+        Inputs:
+        - decision: final decision ('BUILD' / 'KILL' / 'INSUFFICIENT_INFO')
+        - gate: gate decision, a Status value ('PASS' / 'KILL' / 'INSUFFICIENT_INFO')
+        - component + status: e.g. component='technical', status='KILL'
+          (any indexed component, see components())
+        - since / until: ISO timestamps or dates, inclusive / exclusive
+        - limit: maximum rows (None for all)
+        """
+        where, params = self._where(run_id, decision, gate, component, status, since, until)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM runs{where} ORDER BY ts DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(zip(_COLUMNS, row)) for row in self._connection().execute(sql, params)]
+
+    def components(self) -> Tuple[str, ...]:
+        """Every indexed component: COMPONENTS, then the side table's in name order."""
+        extra = [name for (name,) in self._connection().execute(
+            "SELECT DISTINCT component FROM components ORDER BY component")]
+        return (*COMPONENTS, *extra)
+
+    def count(self, **filters) -> int:
+        """Number of indexed runs matching the same filters as query()."""
+        where, params = self._where(**filters)
+        return self._connection().execute(f"SELECT COUNT(*) FROM runs{where}", params).fetchone()[0]
+
+    def scan(self, expressions: Iterable[str], **filters) -> sqlite3.Cursor:
+        """Cursor over SQL expressions of every matching row, in index order, for bulk readers."""
+        where, params = self._where(**filters)
+        return self._connection().execute(f"SELECT {', '.join(expressions)} FROM runs{where} ORDER BY rowid", params)
+
+    def record(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Load the full shadow-log record for an indexed row."""
+        path = self.logs_dir / row["source"]
+        if not path.exists():
+            path = path.with_name(path.name + ".open")
+        for line, record in enumerate(read_source(path)):
+            if line == row["line"]:
+                return record
+        return None
+
+    def _where(self, run_id=None, decision=None, gate=None, component=None, status=None, since=None, until=None):
+        clauses, params = [], []
+        if component is not None or status is not None:
+            if component is None or status is None:
+                raise ValueError("component and status go together")
+            if component.lower() in COMPONENTS:
+                clauses.append(f"{component.lower()}_status = ?")
+            else:
+                clauses.append("(source, line) IN (SELECT source, line FROM components WHERE component = ? AND status = ?)")
+                params.append(component)
+            params.append(status)
+        for column, value in (("run_id", run_id), ("final_decision", decision), ("gate_decision", gate)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not cross threads; keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            if "runs" in tables and "components" not in tables:
+                # Rows indexed before the side table lack registry components;
+                # forget the indexed files so build() re-reads them.
+                with conn:
+                    conn.execute("DELETE FROM sources")
+            if "duplicate_of" not in {row[1] for row in conn.execute("PRAGMA table_info(runs)")}:
+                # Index files created before the column existed.
+                try:
+                    conn.execute("ALTER TABLE runs ADD COLUMN duplicate_of TEXT")
+                except sqlite3.OperationalError:
+                    pass  # Another connection added it first.
+            self._local.conn = conn
+        return conn
+
+
+def default_index_path() -> str:
+    directory = os.getenv("SHADOW_LOG_DIR", LOD_DIR)
+    return os.getenv("SHADOW_LOG_INDEX", os.path.join(directory, "index.sqlite3"))
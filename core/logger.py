@@ -1,35 +1,433 @@
+import atexit
+import io
 import json
 import os
+import queue
+import re
+import sys
+import tempfile
+import threading
 from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from core.prompts import prompt_versions
+from core.state import eval_results
+from core.results import json_default
 
 LOD_DIR = "logs"
 
-"""Simple file-based shadow logging.
+"""Shadow logging.
+
+Every finished run becomes one compact JSON line. write_shadow_log only
+builds the record and hands it to a background writer thread through a
+bounded queue, so the evaluation hot path never touches the disk. When the
+queue is full the caller waits up to block_timeout for room (backpressure
+on whatever produces runs faster than the disk takes them); only then is
+the record dropped and counted, with one warning on stderr when drops
+begin. Batch summaries report the drops (batch.py).
+
+The writer appends batches to size-capped JSONL segments in LOD_DIR. A
+segment is written under a '.open' suffix and renamed (os.replace, atomic)
+to its final name once it reaches max_bytes or the writer closes, so readers
+that skip '.open' files only ever see complete segments. Segments can be
+zstd-compressed. The process-wide writer is flushed and closed at exit.
+A process killed mid-segment leaves its '.open' file behind; the next
+writer to start, and index builds, finalize the ones whose writer pid is
+no longer running (recover_segments), keeping every complete line.
 
-This module writes a per-run JSON snapshot for auditing and debugging.
-It is intentionally lightweight; no concurrency guarantees are provided.
+Configuration (env): SHADOW_LOG_DIR, SHADOW_LOG_MAX_BYTES (default 64 MiB,
+measured before compression), SHADOW_LOG_QUEUE (default 10000),
+SHADOW_LOG_BLOCK_TIMEOUT (seconds, default 1; 0 drops at once), SHADOW_LOG_COMPRESS ('zstd' or 'none'), SHADOW_LOG_INDEX (sqlite index
+path, default <dir>/index.sqlite3; 'off' disables, see core/log_index.py).
 """
 
-def write_shadow_log(state:dict):
-    # Ensure logs directory exists.
-    os.makedirs(LOD_DIR, exist_ok=True)
+_STOP = object()
 
-    run_id = state.get("run_id", "unknown_run")
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+# shadow-<stamp>-<pid>-<sequence>.jsonl[.zst].open
+_OPEN_SEGMENT = re.compile(r"^shadow-[0-9T]+-(\d+)-\d+\.jsonl(?:\.zst)?\.open$")
 
+
+def shadow_record(state: dict) -> Dict[str, Any]:
     # Build snapshot payload.
-    log_data = {
-        "run_id": run_id,
-        "timestamp": timestamp,
+    return {
+        "run_id": state.get("run_id", "unknown_run"),
+        "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
         "brief": state.get("brief"),
-        "market_eval": state.get("market_eval"),
-        "business_eval": state.get("business_eval"),
-        "technical_eval": state.get("technical_eval"),
-        "final_decision": state.get("final_decision")
+        "workflow_gate": state.get("workflow_gate_result"),
+        **eval_results(state),
+        "final_decision": state.get("final_decision"),
+        **({"duplicate_of": state["duplicate_of"]} if state.get("duplicate_of") else {}),
+        # Content hashes of the prompts that produced this decision.
+        "prompt_versions": prompt_versions()
     }
 
-    file_path = os.path.join(LOD_DIR, f"{run_id}_{timestamp}.json")
 
-    # Write JSON file. If atomicity is needed, write to a temp file then os.replace.
-    with open(file_path, "w") as f:
-        json.dump(log_data, f, indent=2)
+class ShadowLogWriter:
+    # Background thread appending queued records to rotating JSONL segments.
+    def __init__(
+        self,
+        directory: str = LOD_DIR,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_queue: int = 10000,
+        compress: bool = False,
+        batch_size: int = 512,
+        flush_interval: float = 1.0,
+        index=None,
+        block_timeout: float = 1.0
+    ):
+        """Start the writer thread.
+
+        Inputs:
+        - block_timeout: seconds submit() waits for room in a full queue
+          before dropping the record; 0 never waits
+        - index: optional core.log_index.LogIndex kept up to date with every
+          written record (from the writer thread, so queries stay in sync
+          without a separate indexing pass)
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.index = index
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._counters = {"written": 0, "dropped": 0, "segments": 0, "recovered": 0, "errors": 0}
+        self._closed = False
+        self._warned = False
+
+        # Current segment: (raw file, writable stream, temp path, final path).
+        self._segment = None
+        self._segment_bytes = 0
+        self._segment_lines = 0
+        self._sequence = 0
+
+        self._thread = threading.Thread(target=self._run, name="shadow-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Queue a record, waiting at most block_timeout for room; False if it was dropped."""
+        if self._closed:
+            with self._lock:
+                self._counters["dropped"] += 1
+            return False
+        try:
+            if self.block_timeout > 0:
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            pass
+        with self._lock:
+            self._counters["dropped"] += 1
+            warn, self._warned = not self._warned, True
+        if warn:
+            print(f"shadow log: queue full ({self._queue.maxsize} records) for {self.block_timeout}s; "
+                  "dropping records (counted in stats()['dropped'])", file=sys.stderr)
+        return False
+
+    def flush(self) -> None:
+        """Block until every queued record has been written to its segment."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Drain the queue, finalize the open segment and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "queue_depth": self._queue.qsize()}
+
+    def _run(self) -> None:
+        try:
+            self._recover()
+        except Exception:
+            with self._lock:
+                self._counters["errors"] += 1
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [item]
+            # Take whatever else is already queued, up to batch_size.
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(entry is _STOP for entry in batch)
+            records = [entry for entry in batch if entry is not _STOP]
+            try:
+                if records:
+                    self._write(records)
+                if stop:
+                    self._finalize()
+            except Exception:
+                # Logging must never take the process down; count and move on.
+                with self._lock:
+                    self._counters["errors"] += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _recover(self) -> None:
+        # Finalize (and index) segments orphaned by writers that died.
+        for final in recover_segments(str(self.directory)):
+            if self.index is not None:
+                self.index.add((record, final.name, line) for line, record in enumerate(read_source(final)))
+                self.index.mark_complete(final.name)
+            with self._lock:
+                self._counters["recovered"] += 1
+
+    def _open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sequence += 1
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        suffix = ".jsonl.zst" if self.compress else ".jsonl"
+        final = self.directory / f"shadow-{stamp}-{os.getpid()}-{self._sequence:05d}{suffix}"
+        temp = final.with_name(final.name + ".open")
+        raw = open(temp, "wb")
+        stream = raw
+        if self.compress:
+            import zstandard
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+        self._segment = (raw, stream, temp, final)
+
+    def _write(self, records) -> None:
+        chunk, located = [], []
+        for record in records:
+            if self._segment is None:
+                self._open()
+            line = encode_line(record)
+            chunk.append(line)
+            located.append((record, self._segment[3].name, self._segment_lines))
+            self._segment_bytes += len(line)
+            self._segment_lines += 1
+            # Rotate mid-batch so no segment grows past max_bytes by more than a line.
+            if self._segment_bytes >= self.max_bytes:
+                self._append(chunk)
+                self._finalize()
+                chunk = []
+        if chunk:
+            self._append(chunk)
+        with self._lock:
+            self._counters["written"] += len(records)
+        if self.index is not None:
+            self.index.add(located)
+
+    def _append(self, lines) -> None:
+        raw, stream, _, _ = self._segment
+        stream.write(b"".join(lines))
+        if self.compress:
+            import zstandard
+            stream.flush(zstandard.FLUSH_BLOCK)
+        raw.flush()
+
+    def _finalize(self) -> None:
+        if self._segment is None:
+            return
+        raw, stream, temp, final = self._segment
+        self._segment = None
+        self._segment_bytes = 0
+        self._segment_lines = 0
+        if stream is not raw:
+            stream.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+        raw.close()
+        os.replace(temp, final)
+        with self._lock:
+            self._counters["segments"] += 1
+        if self.index is not None:
+            self.index.mark_complete(final.name)
+
+
+def encode_line(record: Dict[str, Any]) -> bytes:
+    """One compact JSONL line for a shadow record.
+
+    orjson encodes the result dataclasses natively, about 5x faster than
+    json.dumps with a default hook; json is the fallback for what orjson
+    refuses (e.g. integers past 64 bits).
+    """
+    try:
+        import orjson
+        return orjson.dumps(record, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    except (ImportError, TypeError):
+        return json.dumps(record, separators=(",", ":"), default=json_default).encode("utf-8") + b"\n"
+
+
+def shadow_sources(directory: str = LOD_DIR, include_open: bool = False) -> Iterator[Path]:
+    """Shadow-log files in directory, oldest first: segments and legacy '*.json' snapshots.
+
+    Segments still being written ('.open') are skipped unless include_open is set.
+    """
+    for path in sorted(Path(directory).glob("*")):
+        name = path.name
+        if name.endswith(".open"):
+            if not include_open:
+                continue
+            name = name[:-len(".open")]
+        if name.endswith((".json", ".jsonl", ".jsonl.zst")):
+            yield path
+
+
+def read_source(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the records of one shadow-log file in write order, one line at a time.
+
+    A last line still being written to a '.open' segment is skipped.
+    """
+    is_open = path.name.endswith(".open")
+    name = path.name[:-len(".open")] if is_open else path.name
+    if name.endswith(".json"):
+        with open(path, "r") as f:
+            yield json.load(f)
+        return
+    with open(path, "rb") as raw:
+        stream = raw
+        if name.endswith(".zst"):
+            import zstandard
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if is_open and not line.endswith("\n"):
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # EPERM: the pid exists but belongs to another user.
+        return True
+    return True
+
+
+def recover_segments(directory: str = LOD_DIR) -> List[Path]:
+    """Finalize '.open' segments whose writer process is gone; returns their final paths.
+
+    Segments of this process or of a running pid are left alone. Complete
+    lines are kept; a line cut off mid-write is dropped. Safe to run from
+    several processes at once: a segment another process finalized first
+    is skipped (and only that process returns it).
+    """
+    recovered = []
+    for temp in sorted(Path(directory).glob("shadow-*.open")):
+        match = _OPEN_SEGMENT.match(temp.name)
+        if match is None:
+            continue
+        pid = int(match.group(1))
+        if pid == os.getpid() or _pid_alive(pid):
+            continue
+        final = temp.with_name(temp.name[:-len(".open")])
+        if final.name.endswith(".zst"):
+            # A frame can end mid-line; re-compress the complete lines.
+            import zstandard
+            # A unique scratch file: sharded workers may recover the same segment at once.
+            fd, scratch = tempfile.mkstemp(prefix=temp.name + ".", suffix=".recover", dir=temp.parent)
+            try:
+                with open(temp, "rb") as src, open(fd, "wb") as raw:
+                    lines = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(
+                        src, read_across_frames=True, closefd=False))
+                    with zstandard.ZstdCompressor().stream_writer(raw, closefd=False) as out:
+                        for line in lines:
+                            if not line.endswith(b"\n"):
+                                break
+                            out.write(line)
+                    raw.flush()
+                    os.fsync(raw.fileno())
+                os.replace(scratch, final)
+                os.remove(temp)
+            except FileNotFoundError:
+                # Another process finalized it first; the content is the same.
+                continue
+            finally:
+                if os.path.exists(scratch):
+                    os.remove(scratch)
+        else:
+            try:
+                with open(temp, "r+b") as raw:
+                    complete = 0
+                    for line in raw:
+                        if not line.endswith(b"\n"):
+                            break
+                        complete += len(line)
+                    raw.truncate(complete)
+                    os.fsync(raw.fileno())
+                os.replace(temp, final)
+            except FileNotFoundError:
+                continue
+        recovered.append(final)
+    return recovered
+
+
+def iter_shadow_records(directory: str = LOD_DIR, include_open: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield shadow-log records from every file in directory, oldest first."""
+    for path in shadow_sources(directory, include_open):
+        yield from read_source(path)
+
+
+_writer: Optional[ShadowLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> ShadowLogWriter:
+    """Return the process-wide writer, starting it (and its exit hook) on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from core.log_index import LogIndex, default_index_path
+                directory = os.getenv("SHADOW_LOG_DIR", LOD_DIR)
+                index_path = default_index_path()
+                index = None
+                if index_path.lower() not in ("off", "0", "none"):
+                    index = LogIndex(index_path, logs_dir=directory)
+                _writer = ShadowLogWriter(
+                    directory=directory,
+                    max_bytes=int(os.getenv("SHADOW_LOG_MAX_BYTES", 64 * 1024 * 1024)),
+                    max_queue=int(os.getenv("SHADOW_LOG_QUEUE", 10000)),
+                    compress=os.getenv("SHADOW_LOG_COMPRESS", "none").lower() == "zstd",
+                    index=index,
+                    block_timeout=float(os.getenv("SHADOW_LOG_BLOCK_TIMEOUT", 1.0))
+                )
+                atexit.register(_writer.close)
+    return _writer
+
+
+def dropped_records() -> int:
+    """Records the process-wide writer has dropped so far; 0 before it starts."""
+    writer = _writer
+    return writer.stats()["dropped"] if writer is not None else 0
+
+
+_record_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+
+def add_record_listener(listener: Callable[[Dict[str, Any]], None]) -> None:
+    """Call listener with every record write_shadow_log builds (e.g. core/dedup.py's index)."""
+    _record_listeners.append(listener)
+
+
+def write_shadow_log(state: dict) -> bool:
+    """Queue a shadow-log record for state; never blocks on disk, only (briefly) on a full queue.
+
+    Record listeners run first, on the caller's thread.
+    Returns False if the record was dropped because the queue is full.
+    """
+    record = shadow_record(state)
+    for listener in _record_listeners:
+        listener(record)
+    return get_writer().submit(record)
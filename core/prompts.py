@@ -1,29 +1,121 @@
+import hashlib
 import os
+import threading
 from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+"""Prompt registry.
+
+All prompts/*.txt files are read once when the registry is created and served
+from memory afterwards, so agents pay a dict lookup per call instead of a
+stat + read. Each prompt carries a SHA-256 of its content, which shadow logs
+record so a decision can be traced back to the exact prompt text.
+
+Hot reload is opt-in (PROMPTS_HOT_RELOAD=1 or hot_reload=True): every lookup
+then stats the file and re-reads it only when its mtime changed.
+"""
+
+# Assuming this file is in <project_root>/core/prompts.py
+# We want <project_root>/prompts/
+PROMPTS_DIR = Path(__file__).parent.absolute().parent / "prompts"
+
+
+class Prompt(NamedTuple):
+    # One loaded prompt; immutable so callers can share it freely.
+    name: str
+    text: str
+    sha256: str
+    mtime_ns: int
+
+
+def _read_prompt(path: Path) -> Prompt:
+    stat = path.stat()
+    text = path.read_text(encoding="utf-8")
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return Prompt(path.name, text, digest, stat.st_mtime_ns)
+
+
+class PromptRegistry:
+    # In-memory view of a prompts directory, loaded eagerly.
+    def __init__(self, directory: Optional[Path] = None, hot_reload: bool = False):
+        self.directory = Path(directory) if directory else PROMPTS_DIR
+        self.hot_reload = hot_reload
+        self._lock = threading.Lock()
+        self._prompts: Dict[str, Prompt] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        """Re-read every *.txt file in the directory."""
+        loaded = {p.name: _read_prompt(p) for p in sorted(self.directory.glob("*.txt"))}
+        with self._lock:
+            self._prompts = loaded
+
+    def prompt(self, name: str) -> Prompt:
+        """Return the Prompt for a filename (e.g. 'market_eval.txt').
+
+        Raises:
+            FileNotFoundError: If the prompt file does not exist.
+        """
+        entry = self._prompts.get(name)
+        if entry is not None and not self.hot_reload:
+            return entry
+
+        # Miss or hot reload: consult the filesystem for this one file.
+        path = self.directory / name
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Prompt file not found: {path}") from None
+        if entry is not None and entry.mtime_ns == mtime_ns:
+            return entry
+
+        entry = _read_prompt(path)
+        with self._lock:
+            self._prompts[name] = entry
+        return entry
+
+    def get(self, name: str) -> str:
+        return self.prompt(name).text
+
+    def version(self, name: str) -> str:
+        """SHA-256 of the prompt text currently served for name."""
+        return self.prompt(name).sha256
+
+    def versions(self) -> Dict[str, str]:
+        """Map of every loaded prompt name to its content hash."""
+        return {name: entry.sha256 for name, entry in self._prompts.items()}
+
+
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> PromptRegistry:
+    """Return the process-wide registry, loading prompts/ on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                hot_reload = os.getenv("PROMPTS_HOT_RELOAD", "0").lower() in ("1", "true", "yes")
+                _registry = PromptRegistry(hot_reload=hot_reload)
+    return _registry
+
 
 def load_prompt(prompt_name: str) -> str:
     """Load a system prompt from the prompts/ directory.
-    
+
     Args:
         prompt_name: The filename of the prompt (e.g., 'market_eval.txt').
-    
+
     Returns:
-        The content of the prompt file.
-    
+        The content of the prompt file, served from the shared registry.
+
     Raises:
         FileNotFoundError: If the prompt file does not exist.
     """
-    # Assuming this file is in <project_root>/core/prompts.py
-    # We want <project_root>/prompts/
-    
-    # Get the directory of this file (core/)
-    current_dir = Path(__file__).parent.absolute()
-    
-    # Go up one level to project root, then into prompts/
-    project_root = current_dir.parent
-    prompt_path = project_root / "prompts" / prompt_name
-    
-    if not prompt_path.exists():
-        raise FileNotFoundError(f"Prompt file not found: {prompt_path}")
-        
-    return prompt_path.read_text(encoding="utf-8")
+    return get_registry().get(prompt_name)
+
+
+def prompt_versions() -> Dict[str, str]:
+    """Content hashes of the prompts currently served, keyed by filename."""
+    return get_registry().versions()
@@ -0,0 +1,75 @@
+from functools import lru_cache
+from typing import Any, Type, TypeVar, Union
+
+from core.state import EvalResult, Status, _Result
+
+"""Parsing and validation of agent results.
+
+Evaluators and the workflow gate used to hand back whatever dict json.loads
+produced: any keys the model emitted, status as a bare string, confidence
+unchecked. They now return EvalResult / GateResult (core/state.py), frozen
+slots dataclasses of 64 bytes against 184 for a four-key dict (before the
+values). A pydantic-core validator per type builds them straight from the
+LLM's output text or bytes in one pass, which also beats json.loads on its
+own (bench/results.py):
+- status / decision are coerced to Status (case and surrounding whitespace
+  ignored); any other value is rejected;
+- confidence is clamped to [0, 1], 0.0 when missing; NaN and infinity are
+  rejected;
+- component and reason default to ""; unknown keys are dropped.
+A malformed answer raises ValueError (pydantic_core.ValidationError), as a
+bad json.loads did (json.JSONDecodeError).
+
+json_default lets json.dumps write results as plain objects; orjson encodes
+the dataclasses natively. pydantic_core is imported on first parse, not when
+this module loads, so commands that never evaluate a brief skip it.
+"""
+
+R = TypeVar("R", bound=_Result)
+
+
+def parse_result(raw: Union[str, bytes], result_type: Type[R] = EvalResult) -> R:
+    """Parse and validate one JSON object from LLM output."""
+    return _validator(result_type).validate_json(raw)
+
+
+def result_from(data: Any, result_type: Type[R] = EvalResult) -> R:
+    """Validate an already-parsed object (a fused-response section, streamed fields)."""
+    if isinstance(data, result_type):
+        return data
+    return _validator(result_type).validate_python(data)
+
+
+def json_default(value: Any) -> Any:
+    """json.dumps default= hook: results as plain objects, anything else as str."""
+    if isinstance(value, _Result):
+        return value.to_dict()
+    return str(value)
+
+
+def _verdict(value: Any) -> Any:
+    return value.strip().upper() if isinstance(value, str) else value
+
+
+def _clamp(value: float) -> float:
+    return min(1.0, max(0.0, value))
+
+
+@lru_cache(maxsize=None)
+def _validator(result_type: type):
+    from pydantic_core import SchemaValidator, core_schema as cs
+
+    verdict = cs.no_info_before_validator_function(_verdict, cs.enum_schema(Status, list(Status), sub_type="str"))
+    schemas = {
+        "component": cs.with_default_schema(cs.str_schema(strip_whitespace=True), default=""),
+        "status": verdict,
+        "decision": verdict,
+        "confidence": cs.with_default_schema(
+            cs.no_info_after_validator_function(_clamp, cs.float_schema(allow_inf_nan=False)), default=0.0),
+        "reason": cs.with_default_schema(cs.str_schema(), default=""),
+    }
+    names = list(result_type.__match_args__)
+    fields = [cs.dataclass_field(name, schemas[name]) for name in names]
+    schema = cs.dataclass_schema(result_type, cs.dataclass_args_schema(result_type.__name__, fields), names,
+                                 slots=True, frozen=True)
+    return SchemaValidator(schema)
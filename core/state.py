@@ -1,13 +1,21 @@
 #core/state.py
-from typing import TypedDict, Optional, Dict, Any
+from typing import TypedDict, Optional, Dict, Any, Iterable
+import uuid
+from collections.abc import Mapping
+from dataclasses import dataclass
 from enum import Enum
 
+from core.brief import PreparedBrief, prepare_brief
+
 """State definitions used across the evaluation graph.
 
-This module defines the canonical EngineState shape and EvalResult type that
-agents and the arbiter rely on. Keep these types stable: downstream logic
-assumes these keys exist (or are Optional) and that status values match the
-Status enum.
+This module defines the canonical EngineState shape and the EvalResult and
+GateResult types that agents and the arbiter rely on. Keep these types
+stable: downstream logic assumes these keys exist (or are Optional) and that
+status values match the Status enum.
+
+Results are frozen slots dataclasses that also behave as read-only
+Mappings, so result["status"] and result.get("confidence") keep working.
 """
 
 # Accepted evaluation outcomes.
@@ -16,20 +24,121 @@ class Status(str, Enum):
     KILL = "KILL"
     INSUFFICIENT_INFO = "INSUFFICIENT_INFO"
 
-# Evaluator result shape.
-class EvalResult(TypedDict):
+class _Result(Mapping):
+    # Read-only Mapping over a slots dataclass's fields (__match_args__ lists
+    # them in order), so results still read like the dicts they replaced.
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__match_args__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.__match_args__)
+
+    def __len__(self) -> int:
+        return len(self.__match_args__)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict of the fields (Status is a str Enum, so it encodes as its value)."""
+        return {key: getattr(self, key) for key in self.__match_args__}
+
+# Evaluator result; built and validated by core/results.py.
+@dataclass(frozen=True, slots=True, eq=False)
+class EvalResult(_Result):
     component: str
     status: Status
     confidence: float
     reason: str
 
+# Workflow gate result.
+@dataclass(frozen=True, slots=True, eq=False)
+class GateResult(_Result):
+    decision: Status
+    confidence: float
+    reason: str
+
 # Engine state passed through the graph.
 class EngineState(TypedDict):
     run_id: str
     brief: Optional[Dict[str, Any]]
-    workflow_gate_result: Optional[Dict[str, Any]]
+    prepared_brief: Optional[PreparedBrief]
+    workflow_gate_result: Optional[GateResult]
     market_eval: Optional[EvalResult]
     business_eval: Optional[EvalResult]
     technical_eval: Optional[EvalResult]
     final_decision: Optional[str]
     judgment_status: Optional[Status]
+    # Prior near-duplicate run, set by the dedup stage (core/dedup.py).
+    duplicate_of: Optional[Dict[str, Any]]
+
+def state_schema(eval_keys: Iterable[str]) -> type:
+    """EngineState extended with an Optional[EvalResult] key per evaluator.
+
+    build_graph passes the registry's keys (agents/registry.py), so nodes
+    can write dimensions beyond the three declared above.
+    """
+    extra = {key: Optional[EvalResult] for key in eval_keys if key not in EngineState.__annotations__}
+    if not extra:
+        return EngineState
+    return TypedDict("EngineState", {**EngineState.__annotations__, **extra})
+
+def eval_results(state: EngineState) -> Dict[str, Any]:
+    # Every "<name>_eval" key, the default three first even when unset.
+    results = {"market_eval": None, "business_eval": None, "technical_eval": None}
+    results.update((key, value) for key, value in state.items() if key.endswith("_eval"))
+    return results
+
+def new_run_id(prefix: str = "run") -> str:
+    # Short random id; unique enough to key shadow logs and batch results.
+    return f"{prefix}_{uuid.uuid4().hex[:8]}"
+
+def stable_run_id(position: int, digest: str, prefix: str = "run") -> str:
+    # Reproducible id for the brief at position in a batch input (digest: PreparedBrief.sha256).
+    return f"{prefix}_{position:08d}_{digest[:8]}"
+
+def initial_state(
+    brief: Optional[Dict[str, Any]],
+    run_id: Optional[str] = None,
+    prepared: Optional[PreparedBrief] = None
+) -> EngineState:
+    """Compose the initial EngineState for one run.
+
+    Inputs:
+    - brief: structured input to evaluate (may be None)
+    - run_id: optional explicit id; a fresh one is generated when omitted
+    - prepared: the brief's PreparedBrief when the caller already built one
+      (core/brief.py); otherwise it is prepared here, once for the run
+
+    Output:
+    - EngineState with every result key present and set to None
+    """
+    return {
+        "run_id": run_id or new_run_id(),
+        "brief": brief,
+        "prepared_brief": prepared or prepare_brief(brief),
+        "workflow_gate_result": None,
+        "market_eval": None,
+        "business_eval": None,
+        "technical_eval": None,
+        "final_decision": None,
+        "judgment_status": None,
+        "duplicate_of": None
+    }
+
+def final_state_view(state: EngineState) -> Dict[str, Any]:
+    """Read-only projection of a final state used for display and result records.
+
+    Layout: { run_id, brief, evaluations: {market,business,technical,...}, final_decision }
+    Evaluations cover every "<name>_eval" key on the state, so registry
+    dimensions beyond the default three appear too.
+    """
+    evaluations = {key[:-len("_eval")]: value for key, value in eval_results(state).items()}
+    return {
+        "run_id": state.get("run_id"),
+        "brief": state.get("brief"),
+        "evaluations": evaluations,
+        "final_decision": state.get("final_decision"),
+        **({"duplicate_of": state["duplicate_of"]} if state.get("duplicate_of") else {})
+    }
@@ -0,0 +1,388 @@
+import atexit
+import bisect
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+"""Lightweight tracing for evaluation runs.
+
+Spans cover each graph node (and each panel job), each LLM call (prompt and
+response sizes, provider token usage, latency, rate-limit queue wait,
+retries) and each JSON parse. Spans carry the run_id, and the trace id is
+derived from it, so every span of a run shares one trace across threads,
+tasks and processes.
+
+Finished spans go to exporters:
+- OTLPFileExporter: OTLP/JSON lines (one ExportTraceServiceRequest per
+  line), readable by the OpenTelemetry collector's otlpjsonfile receiver,
+- OTLPHttpExporter: the same payload POSTed to a collector's /v1/traces,
+- SpanMetrics: Prometheus text exposition (span duration histograms, LLM
+  token counters), served on /metrics by serve_metrics().
+
+Tracing is off unless configured. When off, span() returns a shared no-op
+and nothing is allocated, so the cost is one global check per call site.
+
+Configuration (configure_from_env, called by build_graph): TRACING=1 enables
+it; TRACING_OTLP_FILE, TRACING_OTLP_ENDPOINT and TRACING_PROMETHEUS_PORT
+add the exporters. TRACING_SERVICE_NAME names the OTLP resource.
+"""
+
+
+class Span:
+    # One timed operation; attributes are plain JSON-friendly values.
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, name: str, amount: float = 1) -> None:
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    @property
+    def duration_s(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+
+class _NoopSpan:
+    # Stand-in returned while tracing is off.
+    __slots__ = ()
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def add(self, name: str, amount: float = 1) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP = _NoopSpan()
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+_exporters: List[Any] = []
+_enabled = False
+
+
+def trace_id_for(run_id: Optional[str]) -> str:
+    """128-bit trace id derived from run_id (random when there is none)."""
+    if not run_id:
+        return os.urandom(16).hex()
+    return hashlib.sha256(run_id.encode("utf-8")).hexdigest()[:32]
+
+
+class _SpanContext:
+    # Context manager that opens a span, makes it current and exports it on exit.
+    __slots__ = ("span", "token")
+
+    def __init__(self, span: Span):
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.end_ns = time.time_ns()
+        if exc is not None:
+            span.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self.token)
+        for exporter in _exporters:
+            exporter.export(span)
+        return False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, kind: str = "internal", run_id: Optional[str] = None, **attributes):
+    """Open a child of the current span (or a new trace for run_id).
+
+    Use as `with span("parse") as s: ...; s.set(key=value)`.
+    """
+    if not _enabled:
+        return NOOP
+    parent = _current.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+        run_id = run_id or parent.attributes.get("run_id")
+    else:
+        trace_id, parent_id = trace_id_for(run_id), None
+    if run_id:
+        attributes["run_id"] = run_id
+    return _SpanContext(Span(name, kind, trace_id, parent_id, attributes))
+
+
+def node_span(name: str, state: Any):
+    """Span for a graph node or panel job; picks run_id up from the state."""
+    if not _enabled:
+        return NOOP
+    run_id = state.get("run_id") if isinstance(state, dict) else None
+    return span(name, kind="node", run_id=run_id)
+
+
+def current_span():
+    """The innermost open span, or the no-op span."""
+    return (_current.get() or NOOP) if _enabled else NOOP
+
+
+def parse_json(raw_output: str, loads: Callable[[str], Any] = json.loads) -> Any:
+    """loads (json.loads, or a result parser from core/results.py) with a 'parse' span around it."""
+    if not _enabled:
+        return loads(raw_output)
+    with span("parse", chars=len(raw_output)):
+        return loads(raw_output)
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        wrapped = {"boolValue": value}
+    elif isinstance(value, int):
+        wrapped = {"intValue": str(value)}
+    elif isinstance(value, float):
+        wrapped = {"doubleValue": value}
+    else:
+        wrapped = {"stringValue": str(value)}
+    return {"key": key, "value": wrapped}
+
+
+_KINDS = {"internal": 1, "node": 1, "client": 3}
+
+
+def otlp_payload(spans: List[Span], service_name: str = "blackbox-engine") -> Dict[str, Any]:
+    """Spans as an OTLP/JSON ExportTraceServiceRequest."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [_attribute("service.name", service_name)]},
+        "scopeSpans": [{
+            "scope": {"name": "core.tracing"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": s.name,
+                "kind": _KINDS.get(s.kind, 1),
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [_attribute(k, v) for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+class BatchExporter(ABC):
+    # Collects spans and ships them in batches from a background thread;
+    # subclasses define _send.
+    def __init__(self, service_name: str = "blackbox-engine", batch_size: int = 512, interval: float = 2.0):
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=100000)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name=f"{type(self).__name__}", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """Ship everything queued so far and stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch = []
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self._send(otlp_payload(batch, self.service_name))
+                except Exception:
+                    self.dropped += len(batch)
+
+    @abstractmethod
+    def _send(self, payload: Dict[str, Any]) -> None:
+        """Ship one OTLP/JSON request; raising counts the batch as dropped."""
+
+
+class OTLPFileExporter(BatchExporter):
+    # Appends one OTLP/JSON request per line to a file.
+    def __init__(self, path: str, **options):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        super().__init__(**options)
+
+    def _send(self, payload: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OTLPHttpExporter(BatchExporter):
+    # POSTs OTLP/JSON to a collector, e.g. http://localhost:4318/v1/traces.
+    def __init__(self, endpoint: str, **options):
+        import httpx
+        self.endpoint = endpoint
+        self._client = httpx.Client(timeout=5.0)
+        super().__init__(**options)
+
+    def _send(self, payload: Dict[str, Any]) -> None:
+        self._client.post(self.endpoint, json=payload).raise_for_status()
+
+
+class SpanMetrics:
+    # Prometheus-style aggregation of finished spans.
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[tuple, list] = {}  # (kind, name) -> [bucket counts..., sum, count]
+        self._tokens: Dict[tuple, float] = {}     # (role, direction) -> tokens
+        self._errors: Dict[tuple, int] = {}
+
+    def export(self, span: Span) -> None:
+        duration = span.duration_s
+        key = (span.kind, span.name)
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [0] * len(self.BUCKETS) + [0.0, 0]
+            index = bisect.bisect_left(self.BUCKETS, duration)
+            if index < len(self.BUCKETS):
+                entry[index] += 1
+            entry[-2] += duration
+            entry[-1] += 1
+            if span.error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+            role = span.attributes.get("role")
+            for direction in ("input_tokens", "cached_input_tokens", "output_tokens"):
+                if direction in span.attributes:
+                    token_key = (role or "default", direction[:-len("_tokens")])
+                    self._tokens[token_key] = self._tokens.get(token_key, 0) + span.attributes[direction]
+
+    def render(self) -> str:
+        """Current values in the Prometheus text exposition format."""
+        lines = [
+            "# HELP blackbox_span_duration_seconds Duration of traced operations.",
+            "# TYPE blackbox_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (kind, name), entry in sorted(self._histograms.items()):
+                labels = f'kind="{kind}",name="{name}"'
+                cumulative = 0
+                for bound, count in zip(self.BUCKETS, entry):
+                    cumulative += count
+                    lines.append(f'blackbox_span_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'blackbox_span_duration_seconds_bucket{{{labels},le="+Inf"}} {entry[-1]}')
+                lines.append(f"blackbox_span_duration_seconds_sum{{{labels}}} {entry[-2]}")
+                lines.append(f"blackbox_span_duration_seconds_count{{{labels}}} {entry[-1]}")
+            lines += ["# HELP blackbox_span_errors_total Traced operations that raised.",
+                      "# TYPE blackbox_span_errors_total counter"]
+            for (kind, name), count in sorted(self._errors.items()):
+                lines.append(f'blackbox_span_errors_total{{kind="{kind}",name="{name}"}} {count}')
+            lines += ["# HELP blackbox_llm_tokens_total LLM tokens by agent role and direction (cached_input is part of input).",
+                      "# TYPE blackbox_llm_tokens_total counter"]
+            for (role, direction), tokens in sorted(self._tokens.items()):
+                lines.append(f'blackbox_llm_tokens_total{{role="{role}",direction="{direction}"}} {tokens}')
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(metrics: SpanMetrics, port: int, host: str = "127.0.0.1"):
+    """Serve metrics.render() on http://host:port/metrics from a daemon thread."""
+    # Imported here: http.server is only needed when the endpoint is on.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def configure(exporters: Optional[List[Any]] = None, enable: bool = True) -> None:
+    """Turn tracing on with these exporters (or off with enable=False)."""
+    global _enabled
+    _exporters[:] = list(exporters or [])
+    _enabled = enable
+
+
+_configured = False
+_metrics: Optional[SpanMetrics] = None
+
+
+def metrics() -> Optional[SpanMetrics]:
+    """The SpanMetrics installed by configure_from_env, if tracing is on."""
+    return _metrics
+
+
+def configure_from_env() -> None:
+    """Apply the TRACING* env vars once per process."""
+    global _configured, _metrics
+    if _configured:
+        return
+    _configured = True
+    if os.getenv("TRACING", "0").lower() not in ("1", "true", "yes", "on"):
+        return
+    service_name = os.getenv("TRACING_SERVICE_NAME", "blackbox-engine")
+    _metrics = SpanMetrics()
+    exporters: List[Any] = [_metrics]
+    if os.getenv("TRACING_OTLP_FILE"):
+        exporters.append(OTLPFileExporter(os.environ["TRACING_OTLP_FILE"], service_name=service_name))
+    if os.getenv("TRACING_OTLP_ENDPOINT"):
+        exporters.append(OTLPHttpExporter(os.environ["TRACING_OTLP_ENDPOINT"], service_name=service_name))
+    if os.getenv("TRACING_PROMETHEUS_PORT"):
+        serve_metrics(_metrics, int(os.environ["TRACING_PROMETHEUS_PORT"]))
+    for exporter in exporters:
+        if isinstance(exporter, BatchExporter):
+            atexit.register(exporter.close)
+    configure(exporters)
@@ -1,11 +1,25 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, InvalidStateError, ThreadPoolExecutor, wait
+from typing import List, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
 from langgraph.graph import StateGraph, END
-from core.state import EngineState
-from core.context import ExecutionContext
+from core.state import EngineState, state_schema
+from core.context import ExecutionContext, POLICIES
+from core.prompts import get_registry
+from core import tracing
+from core.json_stream import verdict_listener
+from core.dedup import dedup_patch, dedup_settings, get_index, get_log_index
+from core.checkpoint import get_checkpointer
+from llm.base import current_role
+from llm.tracing_llm import TracingLLM
 
-from agents.workflow_gate import workflow_gate
-from agents.market_eval import market_evaluator
-from agents.business_eval import business_evaluator
-from agents.technical_eval import technical_evaluator
+from agents.workflow_gate import workflow_gate, aworkflow_gate
+from agents.registry import resolve_evaluators
+from agents.evaluator import evaluate, aevaluate
+from agents.fused_eval import fused_evaluator, afused_evaluator
 from agents.arbiter import final_arbiter
 
 """Graph construction for the evaluation pipeline.
@@ -14,45 +28,463 @@ The StateGraph composes nodes that receive the EngineState and return a
 partial state patch. The runtime merges patches to form the new EngineState.
 Keep node implementations free of orchestration concerns — they should only
 perform state transformation for their responsibility.
+
+Every node carries a sync and an async implementation, so the same compiled
+graph serves graph.invoke (agents block on llm.generate) and graph.ainvoke
+(agents await llm.agenerate on the caller's event loop).
+
+Execution policies (build_graph(ctx, policy=...), ctx.config["execution_policy"]
+or EXECUTION_POLICY env var):
+- "strict" (default): gate runs to completion, then the evaluators fan
+  out, then the arbiter.
+- "speculative": gate and evaluators start together; if the gate KILLs, the
+  evaluators still in flight are cancelled and finished ones are discarded.
+  Saves one round-trip of latency on PASS briefs at the cost of evaluator
+  tokens on gate-KILL briefs.
+- "short-circuit": gate first, then the evaluators; the first evaluator KILL
+  ends the panel and cancels the rest. final_arbiter is rejection-first, so
+  the decision is the same as strict.
+- "fused": gate and all evaluators answer in one LLM call
+  (agents/fused_eval.py); 1 round-trip per brief instead of 1 + N.
+- "gate-fused": gate first, then one fused call for the evaluators; keeps
+  the cheap early exit on gate KILLs with 2 round-trips on PASS briefs.
+
+Final decisions are identical across the fan-out policies; the fused ones
+depend on the model judging every section of a combined prompt as it would
+alone, so calibrate before switching. Cancellation is real on the
+async path; on the sync path a running provider call cannot be interrupted,
+so its thread finishes in the background and the result is dropped.
+
+With streaming on (LLM_STREAM=1 or ctx.config["stream"], see
+core/json_stream.py) agents read the verdict before the reason finishes:
+the panel policies act on a KILL verdict as soon as it is read, and with
+early_kill the KILLing agent stops reading too, so the gate's KILL reaches
+route_after_gate without waiting for its reason.
+
+With dedup on (DEDUP=attach|skip or ctx.config["dedup"], core/dedup.py) a
+"dedup" node runs first and looks the brief up among previously evaluated
+near-duplicates; skip ends the run with the prior verdict and the prior
+run's gate and evaluator results (read from the shadow-log index, or
+ctx.config["log_index"]), attach only records the match (duplicate_of) and
+evaluates as usual.
+
+With a checkpointer (CHECKPOINT_DB or ctx.config["checkpointer"], see
+core/checkpoint.py) the graph is compiled with it, and runs invoked through
+core.checkpoint.invoke_run resume at the node where they stopped.
+
+The evaluators come from the registry (agents/registry.py; market, business
+and technical by default): each one becomes a node (or panel job) with its
+own state key, role and optional llm and timeout, and the state schema and
+arbiter are built for the same set, so adding a dimension needs no code here.
 """
 
-def build_graph(ctx: ExecutionContext):
+GATE_KEY = "workflow_gate_result"
+
+
+def _in_role(role: str, func):
+    # Run a sync agent with current_role set, e.g. inside a pool thread,
+    # inside a tracing span for the node (no-op while tracing is off).
+    def run(*args):
+        token = current_role.set(role)
+        try:
+            with tracing.node_span(role, args[0]):
+                return func(*args)
+        finally:
+            current_role.reset(token)
+    return run
+
+
+def _in_arole(role: str, afunc):
+    async def run(*args):
+        token = current_role.set(role)
+        try:
+            with tracing.node_span(role, args[0]):
+                return await afunc(*args)
+        finally:
+            current_role.reset(token)
+    return run
+
+
+class _Node(Runnable):
+    # A sync node and its coroutine twin; ainvoke picks afunc. Untraced, like
+    # the wrapper add_node builds for plain functions (RunnableLambda would
+    # open a callback run per node, about 2 ms per run), and built on the
+    # public Runnable interface only.
+    def __init__(self, func, afunc, name: str):
+        self.func = func
+        self.afunc = afunc
+        self.name = name
+
+    def invoke(self, input: EngineState, config: Optional[RunnableConfig] = None, **kwargs) -> EngineState:
+        return self.func(input)
+
+    async def ainvoke(self, input: EngineState, config: Optional[RunnableConfig] = None, **kwargs) -> EngineState:
+        return await self.afunc(input)
+
+
+def _node(func, afunc, name: str) -> _Node:
+    # LLM calls made by the node are attributed to its name via current_role.
+    return _Node(_in_role(name, func), _in_arole(name, afunc), name)
+
+
+def _broadcast(state: EngineState) -> EngineState:
+    # Writes nothing: echoing the state back would give every channel (the
+    # brief included) a new version, and a new checkpoint blob, for no change.
+    return {}
+
+
+async def _abroadcast(state: EngineState) -> EngineState:
+    return {}
+
+
+def _arbiter_node(keys) -> _Node:
+    # The node's patch is the decision only (final_arbiter returns the whole state).
+    def arbiter(state: EngineState) -> EngineState:
+        return {"final_decision": final_arbiter(state, keys)["final_decision"]}
+
+    async def aarbiter(state: EngineState) -> EngineState:
+        # Pure computation; run inline rather than in an executor thread.
+        return arbiter(state)
+
+    return _node(arbiter, aarbiter, "arbiter")
+
+
+def route_after_dedup(state: EngineState):
+    duplicate = state.get("duplicate_of") or {}
+    return "end" if duplicate.get("skipped") else "continue"
+
+
+def _set_entry(graph: StateGraph, node: str, ctx: ExecutionContext, keys: List[str]) -> None:
+    # Start at node, behind the dedup stage when it is on.
+    dedup = dedup_settings(ctx.config)
+    if dedup is None:
+        graph.set_entry_point(node)
+        return
+    # An empty BriefIndex is falsy (len 0) but still the caller's index.
+    index = ctx.config.get("dedup_index")
+    if index is None:
+        index = get_index()
+    # Skipped runs copy the prior run's results from the shadow-log index.
+    runs = None
+    if dedup["mode"] == "skip":
+        runs = ctx.config.get("log_index")
+        if runs is None:
+            runs = get_log_index()
+
+    def run(state: EngineState) -> EngineState:
+        return dedup_patch(index, state, dedup["mode"], dedup["threshold"], runs, keys)
+
+    async def arun(state: EngineState) -> EngineState:
+        # Fingerprint plus a few bisections; cheaper inline than in a thread.
+        return run(state)
+
+    graph.add_node("dedup", _node(run, arun, "dedup"))
+    graph.set_entry_point("dedup")
+    graph.add_conditional_edges("dedup", route_after_dedup, {"end": END, "continue": node})
+
+
+def _kill(value) -> bool:
+    # Verdicts compare case- and whitespace-insensitively, as validation reads them.
+    return isinstance(value, str) and value.strip().upper() == "KILL"
+
+
+def route_after_gate(state: EngineState):
+    result = state.get(GATE_KEY) or {}
+    decision = result.get("decision")
+
+    if _kill(decision):
+        return "end"
+    return "continue"
+
+
+def _is_kill(key: str, patch: dict) -> bool:
+    result = patch.get(key) or {}
+    if key == GATE_KEY:
+        return _kill(result.get("decision"))
+    return _kill(result.get("status"))
+
+
+def _evaluator_context(spec, ctx: ExecutionContext) -> ExecutionContext:
+    # An evaluator with its own llm config gets its own client; the rest
+    # share the context's.
+    if spec.llm is None:
+        return ctx
+    from llm.factory import get_llm
+    llm = get_llm(spec.llm)
+    if tracing.enabled():
+        llm = TracingLLM(llm)
+    return ExecutionContext(llm=llm, retriever=ctx.retriever, tools=ctx.tools, config=ctx.config)
+
+
+def _evaluator_jobs(specs, ctx: ExecutionContext):
+    # State key -> (role, sync agent, async agent), each taking the state.
+    jobs = {}
+    for spec in specs:
+        spec_ctx = _evaluator_context(spec, ctx)
+        jobs[spec.key] = (
+            spec.role,
+            lambda state, spec=spec, spec_ctx=spec_ctx: evaluate(spec, state, spec_ctx),
+            lambda state, spec=spec, spec_ctx=spec_ctx: aevaluate(spec, state, spec_ctx),
+        )
+    return jobs
+
+
+def _gate_job(ctx: ExecutionContext):
+    return ("workflow_gate", lambda state: workflow_gate(state, ctx), lambda state: aworkflow_gate(state, ctx))
+
+
+def _panel_result(gate_patch: dict, eval_patch: dict) -> dict:
+    # A gate KILL wins: evaluator output is discarded so the final state
+    # matches what the strict topology would have produced.
+    if _is_kill(GATE_KEY, gate_patch):
+        return gate_patch
+    return {**gate_patch, **eval_patch}
+
+
+def _listening(listener, func):
+    # Run a sync job with verdict_listener set (see core/json_stream.py).
+    def run(*args):
+        token = verdict_listener.set(listener)
+        try:
+            return func(*args)
+        finally:
+            verdict_listener.reset(token)
+    return run
+
+
+def _alistening(listener, afunc):
+    async def run(*args):
+        token = verdict_listener.set(listener)
+        try:
+            return await afunc(*args)
+        finally:
+            verdict_listener.reset(token)
+    return run
+
+
+def _stops_panel(key: str, short_circuit: bool) -> bool:
+    return key == GATE_KEY or short_circuit
+
+
+def run_panel(state: EngineState, jobs: dict, short_circuit: bool) -> EngineState:
+    """Run the panel jobs (evaluators, optionally the gate) concurrently in threads.
+
+    Stops waiting as soon as the gate KILLs, or, with short_circuit, as soon
+    as any evaluator KILLs. With streaming on, that happens when the KILL
+    verdict is read rather than when its reason finishes: the other jobs
+    are dropped at once and only the KILLing job is awaited. Returns the
+    merged partial state patch. jobs maps state key -> (role, func, afunc)
+    as built by _evaluator_jobs / _gate_job.
+    """
+    pool = ThreadPoolExecutor(max_workers=len(jobs))
+    verdict = Future()
+
+    def heard(key):
+        def listener(value):
+            if _kill(value) and _stops_panel(key, short_circuit):
+                try:
+                    verdict.set_result(key)
+                except InvalidStateError:
+                    pass  # Another job's verdict got there first.
+        return listener
+
+    # Each job runs in a copy of the caller's context (e.g. the usage meter).
+    futures = {
+        pool.submit(contextvars.copy_context().run, _listening(heard(key), _in_role(role, func)), state): key
+        for key, (role, func, _) in jobs.items()
+    }
+    pending = set(futures)
+    gate_patch, eval_patch = {}, {}
+    try:
+        while pending:
+            done, _ = wait(pending if verdict.done() else pending | {verdict}, return_when=FIRST_COMPLETED)
+            if verdict in done:
+                # Keep only the KILLing job; the rest finish unobserved.
+                pending = {future for future in pending if futures[future] == verdict.result()}
+                done.discard(verdict)
+            pending -= done
+            stop = False
+            for future in done:
+                key = futures[future]
+                patch = future.result()
+                if key == GATE_KEY:
+                    gate_patch = patch
+                else:
+                    eval_patch.update(patch)
+                stop = stop or (_is_kill(key, patch) and _stops_panel(key, short_circuit))
+            if stop:
+                break
+    finally:
+        # Queued jobs are dropped; running ones finish unobserved.
+        pool.shutdown(wait=False, cancel_futures=True)
+    return _panel_result(gate_patch, eval_patch)
+
+
+async def arun_panel(state: EngineState, jobs: dict, short_circuit: bool) -> EngineState:
+    """Async variant of run_panel; stopped evaluators are cancelled outright."""
+    verdict = asyncio.get_running_loop().create_future()
+
+    def heard(key):
+        def listener(value):
+            if _kill(value) and _stops_panel(key, short_circuit) and not verdict.done():
+                verdict.set_result(key)
+        return listener
+
+    tasks = {
+        asyncio.ensure_future(_alistening(heard(key), _in_arole(role, afunc))(state)): key
+        for key, (role, _, afunc) in jobs.items()
+    }
+    pending, dropped = set(tasks), set()
+    gate_patch, eval_patch = {}, {}
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending if verdict.done() else pending | {verdict}, return_when=asyncio.FIRST_COMPLETED)
+            if verdict in done:
+                # Verdict read: cancel the others, keep reading the KILLing job.
+                dropped = {task for task in pending if tasks[task] != verdict.result()}
+                pending -= dropped
+                for task in dropped:
+                    task.cancel()
+                done.discard(verdict)
+            pending -= done
+            stop = False
+            for task in done:
+                key = tasks[task]
+                patch = task.result()
+                if key == GATE_KEY:
+                    gate_patch = patch
+                else:
+                    eval_patch.update(patch)
+                stop = stop or (_is_kill(key, patch) and _stops_panel(key, short_circuit))
+            if stop:
+                break
+    finally:
+        verdict.cancel()
+        for task in pending:
+            task.cancel()
+        if pending or dropped:
+            await asyncio.gather(*pending, *dropped, return_exceptions=True)
+    return _panel_result(gate_patch, eval_patch)
+
+
+def resolve_policy(ctx: ExecutionContext, policy: str = None) -> str:
+    policy = policy or ctx.config.get("execution_policy") or os.getenv("EXECUTION_POLICY", "strict")
+    if policy not in POLICIES:
+        raise ValueError(f"Unsupported execution policy: {policy} (expected one of {', '.join(POLICIES)})")
+    return policy
+
+
+def build_graph(ctx: ExecutionContext, policy: str = None):
     """Build and compile the evaluation state graph.
 
     Inputs:
     - ctx: ExecutionContext provided to agent nodes.
+    - policy: one of POLICIES; defaults to
+      ctx.config["execution_policy"], then EXECUTION_POLICY, then "strict".
 
     Output:
-    - A compiled graph ready for invocation.
+    - A compiled graph ready for invoke() or ainvoke().
 
-    Structure:
+    Market, Business and Technical below stand for the registered evaluators
+    (resolve_evaluators(ctx.config)), however many there are.
+
+    Structure (strict):
     Start -> Workflow Gate -> (Conditional)
          -> PASS -> [Market, Business, Technical] -> Arbiter -> End
          -> KILL -> End
+
+    Structure (speculative):
+    Start -> Panel [Gate, Market, Business, Technical] -> (Conditional)
+         -> PASS -> Arbiter -> End
+         -> KILL -> End
+
+    Structure (short-circuit):
+    Start -> Workflow Gate -> (Conditional)
+         -> PASS -> Panel [Market, Business, Technical; stop on first KILL] -> Arbiter -> End
+         -> KILL -> End
+
+    Structure (fused):
+    Start -> Fused Eval [Gate + Market + Business + Technical, one call] -> (Conditional)
+         -> PASS -> Arbiter -> End
+         -> KILL -> End
+
+    Structure (gate-fused):
+    Start -> Workflow Gate -> (Conditional)
+         -> PASS -> Fused Eval [Market + Business + Technical, one call] -> Arbiter -> End
+         -> KILL -> End
     """
+    policy = resolve_policy(ctx, policy)
+
+    # Load every prompt up front so no run pays for disk reads.
+    get_registry()
+    specs = resolve_evaluators(ctx.config)
+    keys = [spec.key for spec in specs]
+
+    # LLM spans only when tracing is on, so the untraced path has no extra layer.
+    tracing.configure_from_env()
+    if tracing.enabled():
+        ctx = ExecutionContext(llm=TracingLLM(ctx.llm), retriever=ctx.retriever, tools=ctx.tools, config=ctx.config)
+
+    evaluators = _evaluator_jobs(specs, ctx)
+    panel = {**evaluators, GATE_KEY: _gate_job(ctx)}
+    checkpointer = get_checkpointer(ctx.config)
+
     # Create state graph.
-    graph = StateGraph(EngineState)
-
-    # Add nodes
-    graph.add_node("workflow_gate", lambda state: workflow_gate(state, ctx))
-    graph.add_node("broadcast", lambda state: state) # Dummy node for fan-out
-    graph.add_node("market_eval", lambda state: market_evaluator(state, ctx))
-    graph.add_node("business_eval", lambda state: business_evaluator(state, ctx))
-    graph.add_node("technical_eval", lambda state: technical_evaluator(state, ctx))
-    graph.add_node("arbiter", final_arbiter)
-
-    # Define Conditional Logic
-    def route_after_gate(state: EngineState):
-        result = state.get("workflow_gate_result", {})
-        decision = result.get("decision")
-        
-        if decision == "KILL":
-            return "end"
-        return "continue"
-
-    # Set up edges
-    graph.set_entry_point("workflow_gate")
-    
+    graph = StateGraph(state_schema(keys))
+    graph.add_node("arbiter", _arbiter_node(keys))
+    graph.set_finish_point("arbiter")
+
+    if policy == "speculative":
+        graph.add_node("panel", _node(
+            lambda state: run_panel(state, panel, short_circuit=False),
+            lambda state: arun_panel(state, panel, short_circuit=False),
+            "panel"
+        ))
+        _set_entry(graph, "panel", ctx, keys)
+        graph.add_conditional_edges("panel", route_after_gate, {"end": END, "continue": "arbiter"})
+        return graph.compile(checkpointer=checkpointer)
+
+    if policy == "fused":
+        graph.add_node("fused_eval", _node(
+            lambda state: fused_evaluator(state, ctx, include_gate=True, specs=specs),
+            lambda state: afused_evaluator(state, ctx, include_gate=True, specs=specs),
+            "fused_eval"
+        ))
+        _set_entry(graph, "fused_eval", ctx, keys)
+        graph.add_conditional_edges("fused_eval", route_after_gate, {"end": END, "continue": "arbiter"})
+        return graph.compile(checkpointer=checkpointer)
+
+    graph.add_node("workflow_gate", _node(
+        lambda state: workflow_gate(state, ctx),
+        lambda state: aworkflow_gate(state, ctx),
+        "workflow_gate"
+    ))
+    _set_entry(graph, "workflow_gate", ctx, keys)
+
+    if policy == "short-circuit":
+        graph.add_node("panel", _node(
+            lambda state: run_panel(state, evaluators, short_circuit=True),
+            lambda state: arun_panel(state, evaluators, short_circuit=True),
+            "panel"
+        ))
+        graph.add_conditional_edges("workflow_gate", route_after_gate, {"end": END, "continue": "panel"})
+        graph.add_edge("panel", "arbiter")
+        return graph.compile(checkpointer=checkpointer)
+
+    if policy == "gate-fused":
+        graph.add_node("fused_eval", _node(
+            lambda state: fused_evaluator(state, ctx, include_gate=False, specs=specs),
+            lambda state: afused_evaluator(state, ctx, include_gate=False, specs=specs),
+            "fused_eval"
+        ))
+        graph.add_conditional_edges("workflow_gate", route_after_gate, {"end": END, "continue": "fused_eval"})
+        graph.add_edge("fused_eval", "arbiter")
+        return graph.compile(checkpointer=checkpointer)
+
+    graph.add_node("broadcast", _node(_broadcast, _abroadcast, "broadcast")) # Dummy node for fan-out
+    for key, (role, func, afunc) in evaluators.items():
+        graph.add_node(key, _node(func, afunc, role))
+
     graph.add_conditional_edges(
         "workflow_gate",
         route_after_gate,
@@ -62,16 +494,9 @@ def build_graph(ctx: ExecutionContext):
         }
     )
 
-    # Fan-out from broadcast
-    graph.add_edge("broadcast", "market_eval")
-    graph.add_edge("broadcast", "business_eval")
-    graph.add_edge("broadcast", "technical_eval")
-
-    # Fan-in to arbiter
-    graph.add_edge("market_eval", "arbiter")
-    graph.add_edge("business_eval", "arbiter")
-    graph.add_edge("technical_eval", "arbiter")
-    
-    graph.set_finish_point("arbiter")
+    # Fan-out from broadcast, fan-in to arbiter
+    for key in evaluators:
+        graph.add_edge("broadcast", key)
+        graph.add_edge(key, "arbiter")
 
-    return graph.compile()
\ No newline at end of file
+    return graph.compile(checkpointer=checkpointer)
@@ -1,14 +1,84 @@
+import asyncio
+from contextvars import ContextVar
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterator
 
 """LLM client interface.
 
-Defines the minimal contract agents rely on: synchronous generation of text
-given system and user prompts. Implementations must return the raw string
-model output (parsing/validation happens in agents).
+Defines the minimal contract agents rely on: generation of text given system
+and user prompts, either blocking (generate) or as a coroutine (agenerate).
+Implementations must return the raw string model output (parsing/validation
+happens in agents).
+
+generate_stream / agenerate_stream yield the same output in chunks as the
+provider produces it. The defaults yield the whole completion as one chunk,
+so every client can be streamed; wrappers that do not override them keep
+their full behaviour (cache, retries) at the cost of not streaming.
+Consumers may stop early by closing the iterator.
 """
 
 class LLMClient(ABC):
     # Minimal LLM client interface; returns string output.
+    @classmethod
+    def from_config(cls, config: dict, retry: bool = False) -> "LLMClient":
+        """Build a client for get_llm from explicit config plus the environment.
+
+        retry is True when get_llm wraps the client in ResilientLLM, so
+        backends with their own retry loop should turn it off.
+        """
+        return cls()
+
     @abstractmethod
     def generate(self, system: str, user: str) -> str:
         pass
+
+    async def agenerate(self, system: str, user: str) -> str:
+        """Async variant of generate.
+
+        The default runs the blocking generate in a worker thread so every
+        backend works under ainvoke; backends with a native async SDK should
+        override this to avoid holding a thread per outstanding request.
+        """
+        return await asyncio.to_thread(self.generate, system, user)
+
+    def generate_stream(self, system: str, user: str) -> Iterator[str]:
+        """Yield the completion in chunks; the default yields generate() once."""
+        yield self.generate(system, user)
+
+    async def agenerate_stream(self, system: str, user: str) -> AsyncIterator[str]:
+        """Async variant of generate_stream; the default yields agenerate() once."""
+        yield await self.agenerate(system, user)
+
+
+class LLMWrapper(LLMClient):
+    # Base for clients that decorate another LLMClient (cache, limits,
+    # retries). Exposes the wrapped client's identity so outer layers,
+    # e.g. cache keys, see the real provider and model settings.
+    def __init__(self, inner: LLMClient):
+        self.inner = inner
+
+    @property
+    def provider(self):
+        return getattr(self.inner, "provider", type(self.inner).__name__)
+
+    @property
+    def model(self):
+        return getattr(self.inner, "model", None)
+
+    @property
+    def temperature(self):
+        return getattr(self.inner, "temperature", None)
+
+    @property
+    def max_tokens(self):
+        return getattr(self.inner, "max_tokens", None)
+
+    @property
+    def retry_rules(self):
+        return getattr(self.inner, "retry_rules", ())
+
+
+# Agent role of the LLM call in progress (e.g. "workflow_gate",
+# "market_eval"). The graph sets it around each agent so wrappers can apply
+# per-role policy without widening the generate() signature.
+current_role: ContextVar[str] = ContextVar("llm_role", default="default")
@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from llm.base import LLMClient, LLMWrapper
+
+"""Content-addressed response cache wrapping any LLMClient.
+
+Responses are keyed on a SHA-256 of (provider, model, temperature,
+max_tokens, system, user), so identical requests are answered without a
+provider round-trip. Two tiers:
+
+- an in-process LRU bounded by entry count;
+- an optional sqlite file (WAL mode) that several processes can share.
+
+Memory-tier access is serialized by a lock, and each thread gets its own
+sqlite connection, so the wrapper is safe under the graph's parallel
+fan-out and from the async path. Concurrent misses on the same key may both
+reach the provider; the last write wins.
+
+With validate_json=True (what llm/factory.py builds) only completions that
+parse as JSON are stored; a malformed answer is returned to the caller but
+not cached, so its parse failure is not replayed on the next identical
+request. Skipped stores are counted as "rejected".
+"""
+
+
+class CachingLLM(LLMWrapper):
+    # Read-through cache in front of another LLMClient.
+    def __init__(self, inner: LLMClient, max_entries: int = 4096, path: Optional[str] = None,
+                 validate_json: bool = False):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        super().__init__(inner)
+        self.max_entries = max_entries
+        self.path = path
+        self.validate_json = validate_json
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "rejected": 0}
+        if path:
+            self._connection()  # Create the schema eagerly so bad paths fail fast.
+
+    def cache_key(self, system: str, user: str) -> str:
+        """Return the content address for a request against the wrapped client."""
+        inner = self.inner
+        parts = [
+            getattr(inner, "provider", type(inner).__name__),
+            getattr(inner, "model", None),
+            getattr(inner, "temperature", None),
+            getattr(inner, "max_tokens", None),
+            system,
+            user
+        ]
+        payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def generate(self, system: str, user: str) -> str:
+        key = self.cache_key(system, user)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        output = self.inner.generate(system, user)
+        self._store(key, output)
+        return output
+
+    async def agenerate(self, system: str, user: str) -> str:
+        key = self.cache_key(system, user)
+        # The memory tier is a dict lookup; only the disk tier leaves the loop.
+        if self.path:
+            cached = await asyncio.to_thread(self._lookup, key)
+        else:
+            cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        output = await self.inner.agenerate(system, user)
+        if self.path:
+            await asyncio.to_thread(self._store, key, output)
+        else:
+            self._store(key, output)
+        return output
+
+    def generate_stream(self, system: str, user: str) -> Iterator[str]:
+        # A hit is one chunk; a miss streams through and is stored only if
+        # the consumer read it to the end (a truncated answer is no answer).
+        key = self.cache_key(system, user)
+        cached = self._lookup(key)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        for chunk in self.inner.generate_stream(system, user):
+            parts.append(chunk)
+            yield chunk
+        self._store(key, "".join(parts))
+
+    async def agenerate_stream(self, system: str, user: str) -> AsyncIterator[str]:
+        key = self.cache_key(system, user)
+        if self.path:
+            cached = await asyncio.to_thread(self._lookup, key)
+        else:
+            cached = self._lookup(key)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        stream = self.inner.agenerate_stream(system, user)
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+                yield chunk
+        finally:
+            await stream.aclose()
+        if self.path:
+            await asyncio.to_thread(self._store, key, "".join(parts))
+        else:
+            self._store(key, "".join(parts))
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of hit/miss/eviction counters and current LRU size."""
+        with self._lock:
+            return {**self._counters, "size": len(self._entries)}
+
+    def clear(self) -> None:
+        # Drop the memory tier only; the disk tier is shared and left intact.
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return value
+
+        if self.path:
+            row = self._connection().execute(
+                "SELECT value FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                self._remember(key, row[0])
+                return row[0]
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def _store(self, key: str, value: str) -> None:
+        if self.validate_json and not _is_json(value):
+            with self._lock:
+                self._counters["rejected"] += 1
+            return
+        self._remember(key, value)
+        if self.path:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, time.time())
+                )
+
+    def _remember(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not cross threads; keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+
+def _is_json(value: str) -> bool:
+    # Same acceptance as ResilientLLM's validate_json.
+    try:
+        json.loads(value)
+    except (TypeError, ValueError):
+        return False
+    return True
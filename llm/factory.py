@@ -1,21 +1,124 @@
+import importlib
 import os
-import json
+from typing import Any, Dict, Optional, Type
+
 from llm.base import LLMClient
-from llm.openai_llm import OpenAILLM
-from llm.mock_llm import MockLLM
 
 """Factory to select the LLM implementation.
 
 Selection is controlled via the LLM_PROVIDER environment variable. Default is
-'mock' to keep local runs deterministic and fast.
+'mock' to keep local runs deterministic and fast. PROVIDERS maps provider
+names to "module:Class" strings that are imported on first use, so a mock
+run never loads the OpenAI SDK (or httpx/pydantic through it); the
+wrappers below are likewise imported only when enabled.
+register_provider(name, "package.module:Class") adds a backend; the class
+builds itself with from_config(config, retry) (see llm/base.py). MOCK_PROFILE (JSON file
+or inline JSON, see llm/mock_llm.py) gives the mock per-role latency, error
+rate and output size, and MOCK_SEED makes its timing reproducible.
+
+get_llm(config) accepts explicit settings that take precedence over the
+environment:
+- provider: overrides LLM_PROVIDER
+- model, max_tokens: passed to the backend
+- transport: OpenAI HTTP pool settings (max_connections,
+  max_keepalive_connections, keepalive_expiry, http2, timeout,
+  connect_timeout); env fallbacks are OPENAI_MAX_CONNECTIONS,
+  OPENAI_MAX_KEEPALIVE, OPENAI_KEEPALIVE_EXPIRY, OPENAI_HTTP2,
+  OPENAI_TIMEOUT and OPENAI_CONNECT_TIMEOUT.
+
+Client-side rate limiting is opt-in: any of LLM_RPM (requests/min), LLM_TPM
+(estimated tokens/min) or LLM_MAX_IN_FLIGHT wraps the backend in a
+RateLimitedLLM. config["rate_limits"] (a SharedRateLimits) replaces the
+RPM/TPM buckets with ones shared across processes, and
+config["max_in_flight"] overrides LLM_MAX_IN_FLIGHT (batch.run_sharded_batch
+gives each _shard_worker its share).
+
+Retries are on by default for real providers (LLM_RETRY=0 disables, =1
+forces them on for mock): per-error-class attempts, exponential backoff with
+jitter, a total deadline of LLM_DEADLINE seconds (default 120) and JSON
+validation of every completion. LLM_HEDGE=1 adds hedged requests past the
+observed p95 latency. When enabled, the OpenAI SDK's own retries are turned
+off so attempts are not multiplied.
+
+Response caching is opt-in via LLM_CACHE:
+- 'memory': in-process LRU bounded by LLM_CACHE_SIZE entries (default 4096)
+- 'sqlite': LRU plus a shared on-disk tier at LLM_CACHE_PATH
+  (default .cache/llm_cache.sqlite3)
 """
 
-def get_llm() -> LLMClient:
-    """Return LLM implementation based on LLM_PROVIDER env var."""
-    provider = os.getenv("LLM_PROVIDER", "mock")
-    if provider == "mock":
-        return MockLLM()
-    elif provider == "openai":
-        return OpenAILLM()
-    
-    raise ValueError(f"Unsupported LLM provider: {provider}")
\ No newline at end of file
+# Provider name -> "module:Class", imported when the provider is selected.
+PROVIDERS: Dict[str, str] = {
+    "mock": "llm.mock_llm:MockLLM",
+    "openai": "llm.openai_llm:OpenAILLM",
+}
+
+
+def register_provider(name: str, spec: str) -> None:
+    """Make LLM_PROVIDER=name build the LLMClient class at spec ("module:Class")."""
+    if ":" not in spec:
+        raise ValueError(f"Provider spec must look like 'module:Class', got {spec!r}")
+    PROVIDERS[name] = spec
+
+
+def load_class(spec: str) -> Type:
+    # Import "module:Class" on demand.
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def get_llm(config: Optional[Dict[str, Any]] = None) -> LLMClient:
+    """Return LLM implementation based on config and the LLM_PROVIDER env var."""
+    config = config or {}
+    provider = config.get("provider") or os.getenv("LLM_PROVIDER", "mock")
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    retry = os.getenv("LLM_RETRY", "0" if provider == "mock" else "1").lower() in ("1", "true", "yes")
+    llm = load_class(PROVIDERS[provider]).from_config(config, retry=retry)
+
+    # Layering, inside out: rate limit each provider request (retries and
+    # hedges included), retry around it, cache outermost so hits never
+    # consume budget. The cache stores only well-formed JSON, so a malformed
+    # completion (LLM_RETRY=0) is not replayed.
+    llm = _with_rate_limit(llm, config)
+    if retry:
+        from llm.resilient_llm import ResilientLLM
+        llm = ResilientLLM(
+            llm,
+            deadline=float(os.getenv("LLM_DEADLINE", "120")),
+            validate_json=True,
+            hedge=os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+        )
+    return _with_cache(llm)
+
+
+def _with_rate_limit(llm: LLMClient, config: Dict[str, Any]) -> LLMClient:
+    shared = config.get("rate_limits")
+    rpm = os.getenv("LLM_RPM")
+    tpm = os.getenv("LLM_TPM")
+    in_flight = config.get("max_in_flight") or os.getenv("LLM_MAX_IN_FLIGHT")
+    if not (shared or rpm or tpm or in_flight):
+        return llm
+    from llm.rate_limited_llm import RateLimitedLLM
+    return RateLimitedLLM(
+        llm,
+        requests_per_minute=float(rpm) if rpm else None,
+        tokens_per_minute=float(tpm) if tpm else None,
+        max_in_flight=int(in_flight) if in_flight else None,
+        shared=shared
+    )
+
+
+def _with_cache(llm: LLMClient) -> LLMClient:
+    mode = os.getenv("LLM_CACHE", "off").lower()
+    if mode in ("", "off", "0", "false"):
+        return llm
+
+    from llm.caching_llm import CachingLLM
+    max_entries = int(os.getenv("LLM_CACHE_SIZE", "4096"))
+    if mode == "memory":
+        return CachingLLM(llm, max_entries=max_entries, validate_json=True)
+    if mode == "sqlite":
+        path = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3"))
+        return CachingLLM(llm, max_entries=max_entries, path=path, validate_json=True)
+
+    raise ValueError(f"Unsupported LLM_CACHE mode: {mode}")
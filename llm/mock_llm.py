@@ -1,28 +1,205 @@
+import asyncio
 import json
-from llm.base import LLMClient
+import os
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, NamedTuple, Optional
+
+from llm.base import LLMClient, current_role
+from llm.usage import estimate_tokens, record_usage
 
 """Deterministic mock LLM used for tests and local development.
 
 Returns well-formed JSON aligned with the prompts' expected schema so agents
 can parse without network dependency.
+
+By default answers are instant. With latency profiles (per agent role, see
+llm.base.current_role) the mock behaves like a provider for benchmarks:
+lognormal latency around a median plus time per output token, a rate of
+transient failures (MockProviderError, a ConnectionError, so ResilientLLM
+retries it) and answers padded to a target output token count. Verdicts
+stay deterministic; only timing and failures are random (seedable).
+generate_stream / agenerate_stream deliver the same answer in CHUNK_CHARS
+pieces with the per-token time spread across them, so time to first
+token and time to verdict can be measured.
+Profiles come from the constructor or, via get_llm, from MOCK_PROFILE (a
+JSON file path or inline JSON).
 """
 
+
+# Characters per streamed chunk (about 4 tokens).
+CHUNK_CHARS = 16
+
+
+class MockProviderError(ConnectionError):
+    # Simulated transient provider failure.
+    pass
+
+
+class LatencyProfile(NamedTuple):
+    # Simulated provider behaviour for one role.
+    p50_ms: float = 0.0
+    spread: float = 0.0  # sigma of the lognormal latency; 0 = fixed latency
+    error_rate: float = 0.0
+    output_tokens: Optional[int] = None  # pad answers to about this many tokens
+    ms_per_token: float = 0.0
+
+
+def load_profiles(spec: str) -> Dict[str, LatencyProfile]:
+    """Parse {role: {field: value}} from a JSON file path or inline JSON.
+
+    The "default" entry applies to roles without their own profile.
+    """
+    if os.path.exists(spec):
+        with open(spec, "r") as f:
+            raw = json.load(f)
+    else:
+        raw = json.loads(spec)
+    return {role: LatencyProfile(**fields) for role, fields in raw.items()}
+
+
+def _pad(output: str, tokens: int) -> str:
+    # Lengthen every "reason" so the answer is about `tokens` tokens long.
+    missing = tokens * 4 - len(output)
+    if missing <= 0:
+        return output
+    result = json.loads(output)
+    sections = [v for v in result.values() if isinstance(v, dict)] if "reason" not in result else [result]
+    if not sections:
+        return output
+    filler = "lorem " * (missing // (6 * len(sections)) + 1)
+    for section in sections:
+        section["reason"] = f"{section.get('reason', '')} {filler}".strip()
+    return json.dumps(result)
+
+
 class MockLLM(LLMClient):
     # Deterministic mock that returns fixed JSON for prompts.
+    provider = "mock"
+    # Class-level defaults keep subclasses with their own __init__ instant.
+    profiles: Optional[Dict[str, LatencyProfile]] = None
+    _rng = random.Random()
+
+    def __init__(self, profiles: Optional[Dict[str, LatencyProfile]] = None, seed: Optional[int] = None):
+        """Create a mock; profiles maps role (or "default") to LatencyProfile."""
+        self.profiles = profiles
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, retry: bool = False) -> "MockLLM":
+        """MOCK_PROFILE (file or inline JSON) and MOCK_SEED from the environment."""
+        profile = os.getenv("MOCK_PROFILE")
+        seed = os.getenv("MOCK_SEED")
+        return cls(load_profiles(profile) if profile else None, int(seed) if seed else None)
+
     def generate(self, system: str, user: str) -> str:
+        output, first, per_token, fail = self._simulate(system, user)
+        delay = first + per_token * estimate_tokens(output)
+        if delay:
+            time.sleep(delay)
+        return self._finish(system, user, output, fail)
+
+    async def agenerate(self, system: str, user: str) -> str:
+        output, first, per_token, fail = self._simulate(system, user)
+        delay = first + per_token * estimate_tokens(output)
+        if delay:
+            await asyncio.sleep(delay)
+        # Instant answers stay on the event loop without a thread hop.
+        return self._finish(system, user, output, fail)
+
+    def generate_stream(self, system: str, user: str) -> Iterator[str]:
+        """Yield the answer in CHUNK_CHARS pieces: the base latency before the
+        first one, then ms_per_token for each piece's tokens."""
+        output, first, per_token, fail = self._simulate(system, user)
+        if first:
+            time.sleep(first)
+        sent = 0
+        try:
+            self._check(system, user, fail)
+            for start in range(0, len(output), CHUNK_CHARS):
+                chunk = output[start:start + CHUNK_CHARS]
+                if per_token:
+                    time.sleep(per_token * estimate_tokens(chunk))
+                yield chunk
+                sent += len(chunk)
+        finally:
+            # A consumer that stops early only pays for what was generated.
+            if not fail:
+                record_usage(estimate_tokens(system, user), estimate_tokens(output[:sent]))
+
+    async def agenerate_stream(self, system: str, user: str) -> AsyncIterator[str]:
+        """Async variant of generate_stream."""
+        output, first, per_token, fail = self._simulate(system, user)
+        if first:
+            await asyncio.sleep(first)
+        sent = 0
+        try:
+            self._check(system, user, fail)
+            for start in range(0, len(output), CHUNK_CHARS):
+                chunk = output[start:start + CHUNK_CHARS]
+                if per_token:
+                    await asyncio.sleep(per_token * estimate_tokens(chunk))
+                yield chunk
+                sent += len(chunk)
+        finally:
+            if not fail:
+                record_usage(estimate_tokens(system, user), estimate_tokens(output[:sent]))
+
+    def _simulate(self, system: str, user: str):
+        # (answer, seconds before the first token, seconds per output token,
+        # whether to fail) for this call.
+        output = self._respond(system, user)
+        if not self.profiles:
+            return output, 0.0, 0.0, False
+        profile = self.profiles.get(current_role.get()) or self.profiles.get("default")
+        if profile is None:
+            return output, 0.0, 0.0, False
+        if profile.output_tokens:
+            output = _pad(output, profile.output_tokens)
+        with self._rng_lock:
+            jitter = self._rng.lognormvariate(0.0, profile.spread) if profile.spread else 1.0
+            fail = self._rng.random() < profile.error_rate
+        return output, profile.p50_ms * jitter / 1000, profile.ms_per_token / 1000, fail
+
+    def _check(self, system: str, user: str, fail: bool) -> None:
+        # A failed request still sent its prompt.
+        if fail:
+            record_usage(estimate_tokens(system, user), 0)
+            raise MockProviderError("Mock provider: simulated transient failure")
+
+    def _finish(self, system: str, user: str, output: str, fail: bool) -> str:
+        # A failed request still sent its prompt.
+        record_usage(estimate_tokens(system, user), 0 if fail else estimate_tokens(output))
+        if fail:
+            raise MockProviderError("Mock provider: simulated transient failure")
+        return output
+
+    def _respond(self, system: str, user: str) -> str:
+        # Fused panel: answer every section present, as the single-role
+        # prompts would, in one JSON object.
+        if "PANEL" in system:
+            sections = {}
+            body = system.rsplit("# OUTPUT FORMAT", 1)[0]
+            for part in body.split("# SECTION: ")[1:]:
+                name, text = part.split("\n", 1)
+                sections[name.strip()] = json.loads(self._respond(text, user))
+            return json.dumps(sections)
+
         # Workflow Gate Check
         if "Gatekeeper" in system:
             # Deterministic Kills based on keywords in the brief (passed in user prompt)
             if "Tinder for Dogs" in user or "Recipe Generator" in user:
                 return json.dumps({
                     "decision": "KILL",
-                    "reason": "Mock Gate: Fake problem identified.",
-                    "confidence": 0.9
+                    "confidence": 0.9,
+                    "reason": "Mock Gate: Fake problem identified."
                 })
             return json.dumps({
                 "decision": "PASS",
-                "reason": "Mock Gate: Looks like a workflow.",
-                "confidence": 0.8
+                "confidence": 0.8,
+                "reason": "Mock Gate: Looks like a workflow."
             })
 
         if "MARKET" in system:
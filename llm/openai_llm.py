@@ -1,20 +1,236 @@
-from openai import OpenAI
-from llm.base import LLMClient
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import weakref
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import httpx
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    APIConnectionError,
+    InternalServerError,
+    RateLimitError,
+)
+from llm.base import LLMClient, current_role
+from llm.usage import estimate_tokens, record_usage
 
 """OpenAI-backed LLM client.
 
-This implementation performs a direct synchronous call to the OpenAI SDK.
-It intentionally keeps retries and error handling out of scope; callers should
-wrap or replace with a resilient wrapper in production.
+This implementation calls the OpenAI SDK directly, with a blocking client for
+generate and an AsyncOpenAI client for agenerate. It intentionally keeps
+retries and error handling out of scope; callers should wrap or replace with
+a resilient wrapper in production.
+
+SDK clients are process-wide and shared by every OpenAILLM with the same
+transport settings, so repeated get_llm() calls and batch runs reuse warm,
+kept-alive connections instead of paying connection setup and TLS handshakes
+per run. Async clients are additionally scoped to the event loop that uses
+them, since httpx async connections cannot cross loops.
+
+Prompt caching: OpenAI caches prompt prefixes (1024 tokens and up) on its
+side. Prompts are laid out for it: the static system prompt first, then
+the agent's fixed instructions, then the brief (core/brief.py). Each
+request carries a prompt_cache_key of the agent role and the system
+prompt's digest, so requests sharing a prefix are routed to the same cache.
+Cached token counts from the response's usage are reported with the
+request's latency to llm.usage (per-role cost and savings in role_stats()).
+Settings (config over env):
+- prompt_cache_key / OPENAI_PROMPT_CACHE_KEY: "0" disables the key, e.g.
+  for OpenAI-compatible servers that reject it (default on)
+- prompt_cache_retention / OPENAI_PROMPT_CACHE_RETENTION: e.g. "24h" to
+  ask for extended retention (default: the provider's)
 """
 
+# Transport defaults; override per instance or via the env vars in transport_from_env.
+DEFAULT_TRANSPORT: Dict[str, Any] = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+    "http2": False,
+    "timeout": 60.0,
+    "connect_timeout": 5.0,
+    # SDK-internal retries; get_llm sets 0 when ResilientLLM owns retries.
+    "max_retries": 2,
+}
+
+
+def transport_from_env() -> Dict[str, Any]:
+    """Read transport overrides from OPENAI_* env vars; unset vars keep defaults."""
+    readers = {
+        "max_connections": ("OPENAI_MAX_CONNECTIONS", int),
+        "max_keepalive_connections": ("OPENAI_MAX_KEEPALIVE", int),
+        "keepalive_expiry": ("OPENAI_KEEPALIVE_EXPIRY", float),
+        "http2": ("OPENAI_HTTP2", lambda v: v.lower() in ("1", "true", "yes")),
+        "timeout": ("OPENAI_TIMEOUT", float),
+        "connect_timeout": ("OPENAI_CONNECT_TIMEOUT", float),
+        "max_retries": ("OPENAI_MAX_RETRIES", int),
+    }
+    settings = {}
+    for key, (env_var, parse) in readers.items():
+        value = os.getenv(env_var)
+        if value:
+            settings[key] = parse(value)
+    return settings
+
+
+def _httpx_options(transport: Dict[str, Any]) -> Dict[str, Any]:
+    # Pool, keep-alive and timeout settings for httpx; max_retries is passed
+    # to the SDK client instead. http2=True requires the optional 'h2' package (pip install httpx[http2]).
+    return {
+        "limits": httpx.Limits(
+            max_connections=transport["max_connections"],
+            max_keepalive_connections=transport["max_keepalive_connections"],
+            keepalive_expiry=transport["keepalive_expiry"],
+        ),
+        "timeout": httpx.Timeout(transport["timeout"], connect=transport["connect_timeout"]),
+        "http2": transport["http2"],
+    }
+
+
+@lru_cache(maxsize=256)
+def _system_digest(system: str) -> str:
+    return hashlib.sha256(system.encode("utf-8")).hexdigest()[:16]
+
+
+def _client_key(transport: Dict[str, Any]) -> tuple:
+    # The SDK reads endpoint and credentials from the environment at
+    # construction, so they are part of what makes two clients equivalent.
+    return (os.getenv("OPENAI_BASE_URL"), os.getenv("OPENAI_API_KEY")) + tuple(sorted(transport.items()))
+
+
+_lock = threading.Lock()
+_sync_clients: Dict[tuple, OpenAI] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def shared_client(transport: Dict[str, Any]) -> OpenAI:
+    """Return the process-wide OpenAI client for these transport settings."""
+    key = _client_key(transport)
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = OpenAI(
+                http_client=httpx.Client(**_httpx_options(transport)),
+                max_retries=transport["max_retries"]
+            )
+            _sync_clients[key] = client
+        return client
+
+
+def shared_async_client(transport: Dict[str, Any]) -> AsyncOpenAI:
+    """Return the AsyncOpenAI client for these settings on the running loop."""
+    key = _client_key(transport)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                http_client=httpx.AsyncClient(**_httpx_options(transport)),
+                max_retries=transport["max_retries"]
+            )
+            clients[key] = client
+        return client
+
 
 class OpenAILLM(LLMClient):
     # OpenAI-backed LLM client; calls the OpenAI chat completions API.
-    def __init__(self, model: str = "gpt-40-mini", max_tokens: int = 500):
-        self.client = OpenAI()
+    provider = "openai"
+    # Transient errors and attempts allowed, consumed by ResilientLLM.
+    # APIConnectionError also covers APITimeoutError.
+    retry_rules = (
+        ((RateLimitError,), 6),
+        ((APIConnectionError, InternalServerError), 4),
+    )
+
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        max_tokens: int = 500,
+        transport: Optional[Dict[str, Any]] = None,
+        shared: bool = True,
+        prompt_cache_key: bool = True,
+        prompt_cache_retention: Optional[str] = None
+    ):
+        """Create a client.
+
+        Inputs:
+        - transport: overrides for DEFAULT_TRANSPORT (pool limits, keep-alive,
+          http2, timeouts)
+        - shared: reuse the process-wide pooled client (False builds a private
+          client for this instance, as every instance did before pooling)
+        - prompt_cache_key: send a per-role, per-system-prompt cache key
+        - prompt_cache_retention: provider cache retention, e.g. "24h"
+        """
+        self.transport = {**DEFAULT_TRANSPORT, **(transport or {})}
+        self.shared = shared
+        self.client = shared_client(self.transport) if shared else OpenAI(
+            http_client=httpx.Client(**_httpx_options(self.transport)),
+            max_retries=self.transport["max_retries"]
+        )
+        # Private async client, created on first agenerate when not shared,
+        # and the loop its connections belong to.
+        self._async_client = None
+        self._async_loop = None
         self.model = model
         self.max_tokens = max_tokens
+        self.temperature = 0.7
+        self.prompt_cache_key = prompt_cache_key
+        self.prompt_cache_retention = prompt_cache_retention
+
+    @classmethod
+    def from_config(cls, config: dict, retry: bool = False) -> "OpenAILLM":
+        """model/max_tokens/transport/prompt cache settings from config over OPENAI_* env settings."""
+        options = {k: config[k] for k in ("model", "max_tokens") if k in config}
+        transport = {**transport_from_env(), **config.get("transport", {})}
+        if retry:
+            transport.setdefault("max_retries", 0)
+        cache_key = config.get("prompt_cache_key", os.getenv("OPENAI_PROMPT_CACHE_KEY", "1"))
+        if isinstance(cache_key, str):
+            cache_key = cache_key.lower() not in ("0", "false", "no", "off")
+        retention = config.get("prompt_cache_retention", os.getenv("OPENAI_PROMPT_CACHE_RETENTION") or None)
+        return cls(transport=transport, prompt_cache_key=cache_key, prompt_cache_retention=retention, **options)
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        if self.shared:
+            return shared_async_client(self.transport)
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                http_client=httpx.AsyncClient(**_httpx_options(self.transport)),
+                max_retries=self.transport["max_retries"]
+            )
+            self._async_loop = _running_loop()
+        return self._async_client
+
+    def _request(self, system: str, user: str) -> dict:
+        # Keyword arguments shared by the sync and async paths. The system
+        # prompt leads so the longest static prefix is cacheable.
+        request = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user}
+            ],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        }
+        if self.prompt_cache_key:
+            request["prompt_cache_key"] = f"{current_role.get() or 'default'}-{_system_digest(system)}"
+        if self.prompt_cache_retention:
+            request["prompt_cache_retention"] = self.prompt_cache_retention
+        return request
 
     def generate(self, system: str, user: str) -> str:
         """Call the OpenAI chat completions endpoint and return the content string.
@@ -28,13 +244,107 @@ class OpenAILLM(LLMClient):
 
         Note: no retry/backoff is implemented here.
         """
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user}
-            ],
-            max_tokens=self.max_tokens,
-            temperature=0.7
-        )
-        return response.choices[0].message.content
\ No newline at end of file
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(**self._request(system, user))
+        self._record_usage(response, time.perf_counter() - started)
+        return response.choices[0].message.content
+
+    async def agenerate(self, system: str, user: str) -> str:
+        """Async variant of generate using AsyncOpenAI; holds no thread while waiting."""
+        started = time.perf_counter()
+        response = await self.async_client.chat.completions.create(**self._request(system, user))
+        self._record_usage(response, time.perf_counter() - started)
+        return response.choices[0].message.content
+
+    def _stream_request(self, system: str, user: str) -> dict:
+        # include_usage adds a final chunk carrying the token counts.
+        return {**self._request(system, user), "stream": True, "stream_options": {"include_usage": True}}
+
+    def generate_stream(self, system: str, user: str) -> Iterator[str]:
+        """Stream the completion's content deltas (stream=True).
+
+        Closing the iterator early closes the HTTP response, which stops
+        generation; usage is then estimated from the text received. The
+        recorded latency runs to the end of the stream (or the early close).
+        """
+        started = time.perf_counter()
+        stream = self.client.chat.completions.create(**self._stream_request(system, user))
+        received, usage_seen = [], False
+        try:
+            for chunk in stream:
+                if chunk.usage is not None:
+                    self._record_usage(chunk, time.perf_counter() - started)
+                    usage_seen = True
+                if chunk.choices and chunk.choices[0].delta.content:
+                    received.append(chunk.choices[0].delta.content)
+                    yield received[-1]
+        finally:
+            stream.close()
+            if not usage_seen:
+                record_usage(estimate_tokens(system, user), estimate_tokens("".join(received)),
+                             model=self.model, latency_s=time.perf_counter() - started)
+
+    async def agenerate_stream(self, system: str, user: str) -> AsyncIterator[str]:
+        """Async variant of generate_stream using AsyncOpenAI."""
+        started = time.perf_counter()
+        stream = await self.async_client.chat.completions.create(**self._stream_request(system, user))
+        received, usage_seen = [], False
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    self._record_usage(chunk, time.perf_counter() - started)
+                    usage_seen = True
+                if chunk.choices and chunk.choices[0].delta.content:
+                    received.append(chunk.choices[0].delta.content)
+                    yield received[-1]
+        finally:
+            await stream.close()
+            if not usage_seen:
+                record_usage(estimate_tokens(system, user), estimate_tokens("".join(received)),
+                             model=self.model, latency_s=time.perf_counter() - started)
+
+    def _record_usage(self, response, latency_s: float) -> None:
+        # Provider-reported token counts, cached prompt tokens included.
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+            record_usage(usage.prompt_tokens or 0, usage.completion_tokens or 0, cached,
+                         model=self.model, latency_s=latency_s)
+
+    def close(self) -> None:
+        # Only private clients are closed; shared ones live for the process.
+        # The async pool is closed on its own loop: scheduled there when it
+        # is running, run to completion when idle. Once that loop is closed
+        # its connections are unusable and the client is only marked closed;
+        # async callers should use aclose().
+        if self.shared:
+            return
+        self.client.close()
+        client, loop = self._async_client, self._async_loop
+        self._async_client = self._async_loop = None
+        if client is None:
+            return
+        if loop is not None and loop.is_running():
+            if _running_loop() is loop:
+                loop.create_task(client.close())
+            else:
+                asyncio.run_coroutine_threadsafe(client.close(), loop).result()
+        elif loop is not None and not loop.is_closed():
+            loop.run_until_complete(client.close())
+        else:
+            try:
+                asyncio.run(client.close())
+            except RuntimeError:
+                # Transports tied to the dead loop; the client is closed regardless.
+                pass
+
+    async def aclose(self) -> None:
+        """close() for async callers: the private async client is closed on the running loop."""
+        if self.shared:
+            return
+        self.client.close()
+        client = self._async_client
+        self._async_client = self._async_loop = None
+        if client is not None:
+            await client.close()
@@ -0,0 +1,299 @@
+import asyncio
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from core.tracing import current_span
+from llm.base import LLMClient, LLMWrapper, current_role
+
+"""Client-side rate limiting and concurrency governor for any LLMClient.
+
+Every call must clear three limits before it reaches the provider:
+- a request bucket (requests_per_minute),
+- a token bucket charged with an estimate of the call's tokens: prompt
+  characters / chars_per_token plus the wrapped client's max_tokens,
+- a cap on calls in flight (max_in_flight).
+
+Waiting calls are queued per agent role (llm.base.current_role) and granted
+round-robin across roles, so a burst of evaluator calls cannot starve the
+gate. Sync callers block on a condition variable; async callers await an
+event, so no thread is held while queued. Both kinds can share one limiter.
+
+The request and token buckets can be shared by several processes
+(SharedRateLimits, e.g. the workers of batch.run_sharded_batch): their
+levels then live in shared memory behind one process-shared lock, so N
+workers together stay under one RPM/TPM budget. Role queues and the in-flight cap stay per process.
+"""
+
+
+class TokenBucket:
+    # Classic token bucket; not thread-safe on its own (the limiter locks).
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (0 when available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class SharedTokenBucket(TokenBucket):
+    # TokenBucket whose level and refill time live in shared memory.
+    def __init__(self, per_minute: float, burst: Optional[float] = None, ctx=multiprocessing):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        # time.monotonic() is system-wide, so refill times compare across processes.
+        self._state = ctx.RawArray("d", [self.capacity, time.monotonic()])
+
+    @property
+    def tokens(self) -> float:
+        return self._state[0]
+
+    @tokens.setter
+    def tokens(self, value: float) -> None:
+        self._state[0] = value
+
+    @property
+    def updated(self) -> float:
+        return self._state[1]
+
+    @updated.setter
+    def updated(self, value: float) -> None:
+        self._state[1] = value
+
+
+class SharedRateLimits:
+    # Request/token buckets shared by the RateLimitedLLMs of several processes.
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        ctx=multiprocessing
+    ):
+        """Create the shared buckets; pass this object to worker processes at start.
+
+        Inputs:
+        - requests_per_minute / tokens_per_minute: the budget for all processes together
+        - ctx: multiprocessing context the workers are started with
+        """
+        self.lock = ctx.Lock()
+        self.requests = SharedTokenBucket(requests_per_minute, ctx=ctx) if requests_per_minute else None
+        self.tokens = SharedTokenBucket(tokens_per_minute, ctx=ctx) if tokens_per_minute else None
+
+
+class RateLimitedLLM(LLMWrapper):
+    # Wraps an LLMClient with request/token buckets, an in-flight cap and
+    # fair per-role queuing.
+    def __init__(
+        self,
+        inner: LLMClient,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_in_flight: Optional[int] = None,
+        chars_per_token: float = 4.0,
+        shared: Optional[SharedRateLimits] = None
+    ):
+        """Inputs: per-minute limits and in-flight cap, or shared buckets
+        (shared replaces requests_per_minute and tokens_per_minute)."""
+        super().__init__(inner)
+        if shared is not None:
+            self.requests, self.tokens = shared.requests, shared.tokens
+            self._bucket_lock = shared.lock
+        else:
+            self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+            self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+            self._bucket_lock = nullcontext()
+        self.max_in_flight = max_in_flight
+        self.chars_per_token = chars_per_token
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._queues: Dict[str, deque] = {}
+        self._roles: list = []  # round-robin order of roles seen so far
+        self._turn = 0
+        self._in_flight = 0
+        self._async_waiters: set = set()
+        self._tickets = itertools.count()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def estimate_tokens(self, system: str, user: str) -> float:
+        prompt = (len(system) + len(user)) / self.chars_per_token
+        return prompt + (self.max_tokens or 0)
+
+    def generate(self, system: str, user: str) -> str:
+        cost = self.estimate_tokens(system, user)
+        self._acquire(current_role.get(), cost)
+        try:
+            return self.inner.generate(system, user)
+        finally:
+            self._release()
+
+    async def agenerate(self, system: str, user: str) -> str:
+        cost = self.estimate_tokens(system, user)
+        await self._aacquire(current_role.get(), cost)
+        try:
+            return await self.inner.agenerate(system, user)
+        finally:
+            self._release()
+
+    def generate_stream(self, system: str, user: str) -> Iterator[str]:
+        # The in-flight slot is held until the stream ends or is closed.
+        cost = self.estimate_tokens(system, user)
+        self._acquire(current_role.get(), cost)
+        try:
+            yield from self.inner.generate_stream(system, user)
+        finally:
+            self._release()
+
+    async def agenerate_stream(self, system: str, user: str) -> AsyncIterator[str]:
+        cost = self.estimate_tokens(system, user)
+        await self._aacquire(current_role.get(), cost)
+        stream = self.inner.agenerate_stream(system, user)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot: calls in flight, queue depth per role, wait times per role."""
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queue_depth": {role: len(q) for role, q in self._queues.items()},
+                "roles": {role: dict(m) for role, m in self._metrics.items()},
+            }
+
+    def _enqueue(self, role: str) -> tuple:
+        # Caller holds the lock.
+        if role not in self._queues:
+            self._queues[role] = deque()
+            self._roles.append(role)
+            self._metrics[role] = {"granted": 0, "wait_total_s": 0.0, "wait_max_s": 0.0}
+        ticket = (role, next(self._tickets))
+        self._queues[role].append(ticket)
+        return ticket
+
+    def _next_ticket(self) -> Optional[tuple]:
+        # Head of the first non-empty queue at or after the round-robin turn.
+        count = len(self._roles)
+        for offset in range(count):
+            role = self._roles[(self._turn + offset) % count]
+            if self._queues[role]:
+                return self._queues[role][0]
+        return None
+
+    def _try_grant(self, ticket: tuple, cost: float) -> Optional[float]:
+        """Grant ticket if it is next and every limit allows it.
+
+        Returns 0 when granted, seconds to wait for a bucket refill, or None
+        to wait for a wake-up (not our turn, or in-flight cap reached).
+        Caller holds the lock.
+        """
+        if self._next_ticket() != ticket:
+            return None
+        if self.max_in_flight is not None and self._in_flight >= self.max_in_flight:
+            return None
+        # Check and take atomically, also against other processes sharing the buckets.
+        with self._bucket_lock:
+            now = time.monotonic()
+            wait = max(
+                self.requests.wait_time(1, now) if self.requests else 0.0,
+                self.tokens.wait_time(cost, now) if self.tokens else 0.0
+            )
+            if wait > 0:
+                return wait
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(cost)
+        role = ticket[0]
+        self._queues[role].popleft()
+        self._turn = (self._roles.index(role) + 1) % len(self._roles)
+        self._in_flight += 1
+        self._wake()
+        return 0.0
+
+    def _record_wait(self, role: str, waited: float) -> None:
+        metrics = self._metrics[role]
+        metrics["granted"] += 1
+        metrics["wait_total_s"] += waited
+        metrics["wait_max_s"] = max(metrics["wait_max_s"], waited)
+        current_span().add("queue_wait_ms", waited * 1000)
+
+    def _abandon(self, ticket: tuple) -> None:
+        # Drop a ticket whose caller gave up (exception or cancellation).
+        queue = self._queues[ticket[0]]
+        if ticket in queue:
+            queue.remove(ticket)
+            self._wake()
+
+    def _wake(self) -> None:
+        # Caller holds the lock. Every waiter re-checks whether it is next.
+        self._cond.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _acquire(self, role: str, cost: float) -> None:
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(role)
+            try:
+                while True:
+                    wait = self._try_grant(ticket, cost)
+                    if wait == 0:
+                        break
+                    self._cond.wait(timeout=wait)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+            self._record_wait(role, time.monotonic() - started)
+
+    async def _aacquire(self, role: str, cost: float) -> None:
+        started = time.monotonic()
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            ticket = self._enqueue(role)
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_grant(ticket, cost)
+                    if wait == 0:
+                        self._record_wait(role, time.monotonic() - started)
+                        return
+                    waiter[1].clear()
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                self._abandon(ticket)
+            raise
+        finally:
+            with self._lock:
+                self._async_waiters.discard(waiter)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._wake()
@@ -0,0 +1,277 @@
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, Sequence, Tuple, Type
+
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception,
+    stop_before_delay,
+    wait_exponential_jitter,
+)
+
+from core.tracing import current_span
+from llm.base import LLMClient, LLMWrapper
+
+"""Retry, backoff and hedged requests for any LLMClient.
+
+Retries follow a per-error-class policy: each rule maps exception types to a
+maximum number of attempts; errors matching no rule are raised immediately.
+Backoff is exponential with jitter, and a total deadline bounds the whole
+call (no new attempt starts once it has passed; async attempts are also cut
+off at the deadline).
+
+Output validation is part of the attempt: with validate_json=True a
+malformed completion raises InvalidOutputError and is retried like a
+transient error, so agents' json.loads sees well-formed JSON.
+
+Hedging (hedge=True) fires a duplicate request when an attempt is still
+running after the observed p95 latency; whichever returns first wins and
+the loser is cancelled (async) or ignored (sync). Hedging only starts once
+min_samples latencies have been observed.
+
+Streams (generate_stream) are retried only until their first chunk; see
+ResilientLLM.generate_stream.
+"""
+
+
+class InvalidOutputError(ValueError):
+    # Raised when a completion fails validation; retried like a transient error.
+    pass
+
+
+# (exception types, max attempts). Backends add their own transient errors
+# through a `retry_rules` attribute (see OpenAILLM).
+DEFAULT_RETRY_RULES: Sequence[Tuple[Tuple[Type[BaseException], ...], int]] = (
+    ((InvalidOutputError,), 3),
+    ((TimeoutError, ConnectionError), 4),
+)
+
+
+def _validate_json(output: str) -> None:
+    try:
+        json.loads(output)
+    except (TypeError, ValueError) as exc:
+        raise InvalidOutputError(f"LLM output is not valid JSON: {exc}") from exc
+
+
+class ResilientLLM(LLMWrapper):
+    # Wraps an LLMClient with per-error retries, a deadline and optional hedging.
+    def __init__(
+        self,
+        inner: LLMClient,
+        rules: Optional[Sequence[Tuple[Tuple[Type[BaseException], ...], int]]] = None,
+        deadline: float = 120.0,
+        backoff_initial: float = 0.5,
+        backoff_max: float = 20.0,
+        jitter: float = 1.0,
+        validate_json: bool = False,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 500
+    ):
+        super().__init__(inner)
+        self.rules = list(rules) if rules is not None else [
+            *getattr(inner, "retry_rules", ()), *DEFAULT_RETRY_RULES
+        ]
+        self.deadline = deadline
+        self.wait = wait_exponential_jitter(initial=backoff_initial, max=backoff_max, jitter=jitter)
+        self.validate: Optional[Callable[[str], None]] = _validate_json if validate_json else None
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="llm-hedge") if hedge else None
+        self._counters = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0}
+
+    def max_attempts(self, exc: BaseException) -> int:
+        """Attempts allowed for this error class (1 = do not retry)."""
+        for types, attempts in self.rules:
+            if isinstance(exc, types):
+                return attempts
+        return 1
+
+    def generate(self, system: str, user: str) -> str:
+        self._count("calls")
+        try:
+            for attempt in Retrying(**self._retry_options()):
+                with attempt:
+                    return self._attempt(system, user)
+        except BaseException:
+            self._count("failures")
+            raise
+
+    async def agenerate(self, system: str, user: str) -> str:
+        self._count("calls")
+        started = time.monotonic()
+        try:
+            async for attempt in AsyncRetrying(**self._retry_options()):
+                with attempt:
+                    remaining = self.deadline - (time.monotonic() - started)
+                    return await asyncio.wait_for(self._aattempt(system, user), timeout=max(remaining, 0.001))
+        except BaseException:
+            self._count("failures")
+            raise
+
+    def generate_stream(self, system: str, user: str) -> Iterator[str]:
+        """Stream with retries until the first chunk arrives.
+
+        Once output has been yielded the consumer may have acted on it, so
+        later errors propagate instead of restarting the answer. Streams are
+        neither hedged nor JSON-validated.
+        """
+        self._count("calls")
+        try:
+            for attempt in Retrying(**self._retry_options()):
+                with attempt:
+                    self._count("attempts")
+                    stream = self.inner.generate_stream(system, user)
+                    first = next(stream, None)
+        except BaseException:
+            self._count("failures")
+            raise
+        if first is None:
+            return
+        yield first
+        yield from stream
+
+    async def agenerate_stream(self, system: str, user: str) -> AsyncIterator[str]:
+        """Async variant of generate_stream; the deadline bounds the wait for the first chunk."""
+        self._count("calls")
+        started = time.monotonic()
+        try:
+            async for attempt in AsyncRetrying(**self._retry_options()):
+                with attempt:
+                    self._count("attempts")
+                    remaining = self.deadline - (time.monotonic() - started)
+                    stream = self.inner.agenerate_stream(system, user)
+                    first = await asyncio.wait_for(anext(stream, None), timeout=max(remaining, 0.001))
+        except BaseException:
+            self._count("failures")
+            raise
+        if first is None:
+            return
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> Dict[str, float]:
+        """Counters plus the current hedge threshold (None until warmed up)."""
+        with self._lock:
+            return {**self._counters, "hedge_after_s": self._hedge_delay_locked()}
+
+    def _retry_options(self) -> dict:
+        def stop(retry_state):
+            exc = retry_state.outcome.exception()
+            return (
+                retry_state.attempt_number >= self.max_attempts(exc)
+                or stop_before_delay(self.deadline)(retry_state)
+            )
+
+        def before_sleep(retry_state):
+            self._count("retries")
+            current_span().add("retries")
+
+        return {
+            "retry": retry_if_exception(lambda exc: self.max_attempts(exc) > 1),
+            "stop": stop,
+            "wait": self.wait,
+            "before_sleep": before_sleep,
+            "reraise": True,
+        }
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def _hedge_delay_locked(self) -> Optional[float]:
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_quantile * len(ordered)))]
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        with self._lock:
+            return self._hedge_delay_locked()
+
+    def _timed(self, system: str, user: str) -> str:
+        # One provider request plus validation; records latency on success.
+        started = time.monotonic()
+        output = self.inner.generate(system, user)
+        if self.validate:
+            self.validate(output)
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+        return output
+
+    async def _atimed(self, system: str, user: str) -> str:
+        started = time.monotonic()
+        output = await self.inner.agenerate(system, user)
+        if self.validate:
+            self.validate(output)
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+        return output
+
+    def _attempt(self, system: str, user: str) -> str:
+        self._count("attempts")
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._timed(system, user)
+
+        # Pool threads run in a copy of the caller's context (keeps current_role).
+        first = self._pool.submit(contextvars.copy_context().run, self._timed, system, user)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        self._count("hedges")
+        hedge = self._pool.submit(contextvars.copy_context().run, self._timed, system, user)
+        pending = {first, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # First success wins, even when both finished together; a failure
+            # only counts once both have failed.
+            for future in sorted(done, key=lambda f: f.exception() is not None):
+                if future.exception() is None or not pending:
+                    if future is hedge and future.exception() is None:
+                        self._count("hedge_wins")
+                    return future.result()
+
+    async def _aattempt(self, system: str, user: str) -> str:
+        self._count("attempts")
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._atimed(system, user)
+
+        first = asyncio.ensure_future(self._atimed(system, user))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        self._count("hedges")
+        hedge = asyncio.ensure_future(self._atimed(system, user))
+        pending = {first, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: t.exception() is not None):
+                    if task.exception() is None or not pending:
+                        if task is hedge and task.exception() is None:
+                            self._count("hedge_wins")
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
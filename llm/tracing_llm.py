@@ -0,0 +1,61 @@
+from typing import AsyncIterator, Iterator
+
+from core.tracing import span
+from llm.base import LLMWrapper, current_role
+
+"""LLM call spans.
+
+TracingLLM opens an 'llm' span around every generate/agenerate with the
+agent role, model and prompt/response sizes. Layers below it annotate the
+same span: backends report provider token usage (llm.usage.record_usage),
+RateLimitedLLM the time spent queued and ResilientLLM the retries.
+build_graph wraps the context's client with it only when tracing is on.
+Streamed calls get the same span, open until the stream ends or is closed.
+"""
+
+
+class TracingLLM(LLMWrapper):
+    # Wraps an LLMClient with one tracing span per call.
+    def _span(self, system: str, user: str):
+        return span(
+            "llm",
+            kind="client",
+            role=current_role.get(),
+            provider=self.provider,
+            model=self.model or "",
+            prompt_chars=len(system) + len(user)
+        )
+
+    def generate(self, system: str, user: str) -> str:
+        with self._span(system, user) as current:
+            output = self.inner.generate(system, user)
+            current.set(response_chars=len(output))
+            return output
+
+    async def agenerate(self, system: str, user: str) -> str:
+        with self._span(system, user) as current:
+            output = await self.inner.agenerate(system, user)
+            current.set(response_chars=len(output))
+            return output
+
+    def generate_stream(self, system: str, user: str) -> Iterator[str]:
+        with self._span(system, user) as current:
+            chars = 0
+            try:
+                for chunk in self.inner.generate_stream(system, user):
+                    chars += len(chunk)
+                    yield chunk
+            finally:
+                current.set(response_chars=chars)
+
+    async def agenerate_stream(self, system: str, user: str) -> AsyncIterator[str]:
+        with self._span(system, user) as current:
+            chars = 0
+            stream = self.inner.agenerate_stream(system, user)
+            try:
+                async for chunk in stream:
+                    chars += len(chunk)
+                    yield chunk
+            finally:
+                await stream.aclose()
+                current.set(response_chars=chars)
@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from core.tracing import current_span
+from llm.base import current_role
+
+"""Per-unit-of-work LLM usage metering.
+
+A UsageMeter collects calls, tokens and priced cost for one unit of work,
+e.g. one calibration case. metered() installs a fresh meter in a context variable;
+backends report each provider request through record_usage(), which is a
+no-op when no meter is active. Context variables follow the graph into
+node threads and tasks, so every call made on behalf of the run is counted,
+retries and hedges included, while cache hits (which never reach a backend)
+cost nothing.
+
+Input tokens the provider served from its prompt cache (cached_input_tokens,
+a subset of input_tokens) are tracked separately, since they are billed
+at a discount and answered faster.
+
+Independently of any meter, every request is also added to process-wide
+per-role totals (role_stats(), keyed by current_role): tokens, cached share,
+cost, what the cached tokens saved, and mean latency of requests with and
+without a cache hit. Prices are USD per million tokens per model, from
+MODEL_PRICES over the LLM_PRICES env var (a JSON file path or inline JSON,
+e.g. {"gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.6}});
+models without a price report token counts only.
+"""
+
+# USD per million tokens; LLM_PRICES entries override or extend these.
+MODEL_PRICES: Dict[str, Dict[str, float]] = {
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+}
+
+
+class UsageMeter:
+    # Thread-safe call and token counters; nodes of one run may report concurrently.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+
+    def record(self, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0,
+               cost_usd: float = 0.0) -> None:
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.cached_input_tokens += cached_input_tokens
+            self.output_tokens += output_tokens
+            self.cost_usd += cost_usd
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "cached_input_tokens": self.cached_input_tokens,
+                "output_tokens": self.output_tokens,
+                "cost_usd": round(self.cost_usd, 6),
+            }
+
+
+class RoleStats:
+    # Process-wide usage, cost and latency per agent role.
+    FIELDS = ("calls", "input_tokens", "cached_input_tokens", "output_tokens", "cost_usd", "saved_usd",
+              "cached_calls", "cached_latency_s", "timed_cached_calls", "uncached_latency_s", "timed_uncached_calls")
+
+    def __init__(self, prices: Optional[Dict[str, Dict[str, float]]] = None):
+        self._lock = threading.Lock()
+        self._roles: Dict[str, Dict[str, float]] = {}
+        self.prices = prices if prices is not None else load_prices()
+
+    def record(self, role: str, model: Optional[str], input_tokens: int, output_tokens: int,
+               cached_input_tokens: int = 0, latency_s: Optional[float] = None) -> None:
+        cost, saved = self.cost(model, input_tokens, output_tokens, cached_input_tokens)
+        with self._lock:
+            entry = self._roles.get(role)
+            if entry is None:
+                entry = self._roles[role] = dict.fromkeys(self.FIELDS, 0)
+            entry["calls"] += 1
+            entry["input_tokens"] += input_tokens
+            entry["cached_input_tokens"] += cached_input_tokens
+            entry["output_tokens"] += output_tokens
+            entry["cost_usd"] += cost
+            entry["saved_usd"] += saved
+            if cached_input_tokens:
+                entry["cached_calls"] += 1
+            if latency_s is not None:
+                kind = "cached" if cached_input_tokens else "uncached"
+                entry[f"{kind}_latency_s"] += latency_s
+                entry[f"timed_{kind}_calls"] += 1
+
+    def cost(self, model: Optional[str], input_tokens: int, output_tokens: int,
+             cached_input_tokens: int = 0) -> Tuple[float, float]:
+        """(cost, cache savings) in USD of one request; zeros for a model without a price."""
+        price = self.prices.get(model) if model else None
+        if not price:
+            return 0.0, 0.0
+        cached_price = price.get("cached_input", price["input"])
+        cost = ((input_tokens - cached_input_tokens) * price["input"]
+                + cached_input_tokens * cached_price
+                + output_tokens * price["output"]) / 1e6
+        return cost, cached_input_tokens * (price["input"] - cached_price) / 1e6
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per role: counters plus cached_pct and mean latency with / without a cache hit."""
+        with self._lock:
+            roles = {role: dict(entry) for role, entry in self._roles.items()}
+        report = {}
+        for role, entry in sorted(roles.items()):
+            row = {field: entry[field] for field in ("calls", "input_tokens", "cached_input_tokens", "output_tokens")}
+            row["cached_pct"] = round(100.0 * entry["cached_input_tokens"] / entry["input_tokens"], 1) if entry["input_tokens"] else 0.0
+            row["cost_usd"] = round(entry["cost_usd"], 6)
+            row["saved_usd"] = round(entry["saved_usd"], 6)
+            for kind in ("cached", "uncached"):
+                timed = entry[f"timed_{kind}_calls"]
+                row[f"{kind}_latency_ms"] = round(entry[f"{kind}_latency_s"] / timed * 1000, 1) if timed else None
+            report[role] = row
+        return report
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Raw counters per role; unlike snapshot() they add up across processes."""
+        with self._lock:
+            return {role: dict(entry) for role, entry in self._roles.items()}
+
+    def merge(self, totals: Dict[str, Dict[str, float]]) -> None:
+        """Add another process's totals(), e.g. a sharded batch worker's."""
+        with self._lock:
+            for role, counters in totals.items():
+                entry = self._roles.setdefault(role, dict.fromkeys(self.FIELDS, 0))
+                for field in self.FIELDS:
+                    entry[field] += counters.get(field, 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._roles.clear()
+
+
+def load_prices() -> Dict[str, Dict[str, float]]:
+    """MODEL_PRICES updated with LLM_PRICES (file path or inline JSON)."""
+    prices = dict(MODEL_PRICES)
+    spec = os.getenv("LLM_PRICES")
+    if spec:
+        if os.path.exists(spec):
+            with open(spec, "r") as f:
+                prices.update(json.load(f))
+        else:
+            prices.update(json.loads(spec))
+    return prices
+
+
+_role_stats: Optional[RoleStats] = None
+_role_stats_lock = threading.Lock()
+
+
+def role_stats() -> RoleStats:
+    """The process-wide RoleStats, created (and LLM_PRICES read) on first use."""
+    global _role_stats
+    if _role_stats is None:
+        with _role_stats_lock:
+            if _role_stats is None:
+                _role_stats = RoleStats()
+    return _role_stats
+
+
+def format_role_stats(report: Dict[str, Dict[str, Any]]) -> str:
+    """RoleStats.snapshot() as a fixed-width table, one line per role."""
+    lines = [f"{'role':<16} {'calls':>6} {'input':>9} {'cached':>9} {'cached%':>7} {'output':>8} "
+             f"{'cost_usd':>10} {'saved_usd':>10} {'hit_ms':>7} {'miss_ms':>7}"]
+    for role, row in report.items():
+        hit = "-" if row["cached_latency_ms"] is None else f"{row['cached_latency_ms']:.0f}"
+        miss = "-" if row["uncached_latency_ms"] is None else f"{row['uncached_latency_ms']:.0f}"
+        lines.append(f"{role:<16} {row['calls']:>6} {row['input_tokens']:>9} {row['cached_input_tokens']:>9} "
+                     f"{row['cached_pct']:>6.1f}% {row['output_tokens']:>8} {row['cost_usd']:>10.4f} "
+                     f"{row['saved_usd']:>10.4f} {hit:>7} {miss:>7}")
+    return "\n".join(lines)
+
+
+current_meter: ContextVar[Optional[UsageMeter]] = ContextVar("llm_usage_meter", default=None)
+
+
+def estimate_tokens(*texts: str, chars_per_token: float = 4.0) -> int:
+    """Rough token count for backends that do not report usage."""
+    return int(sum(len(text or "") for text in texts) / chars_per_token)
+
+
+def record_usage(
+    input_tokens: int,
+    output_tokens: int,
+    cached_input_tokens: int = 0,
+    model: Optional[str] = None,
+    latency_s: Optional[float] = None
+) -> None:
+    """Charge one provider request to the active meter, the LLM span and the role totals.
+
+    Inputs:
+    - input_tokens: prompt tokens, cached ones included
+    - output_tokens: completion tokens
+    - cached_input_tokens: prompt tokens served from the provider's cache
+    - model: prices the request (role_stats cost); None reports tokens only
+    - latency_s: request duration, when the backend measured it
+    """
+    stats = role_stats()
+    meter = current_meter.get()
+    if meter is not None:
+        cost, _ = stats.cost(model, input_tokens, output_tokens, cached_input_tokens)
+        meter.record(input_tokens, output_tokens, cached_input_tokens, cost)
+    span = current_span()
+    span.add("input_tokens", input_tokens)
+    span.add("output_tokens", output_tokens)
+    if cached_input_tokens:
+        span.add("cached_input_tokens", cached_input_tokens)
+    stats.record(current_role.get() or "default", model, input_tokens, output_tokens,
+                 cached_input_tokens, latency_s)
+
+
+@contextmanager
+def metered() -> Iterator[UsageMeter]:
+    """Meter every LLM request made inside the block (and tasks/threads it starts)."""
+    meter = UsageMeter()
+    token = current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        current_meter.reset(token)
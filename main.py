@@ -1,23 +1,42 @@
-import uuid
+import argparse
+import asyncio
 import json
+import os
+import sys
 
-from core.state import EngineState
-from core.context import ExecutionContext
+from core.state import EngineState, Status, initial_state, final_state_view
+from core.results import json_default
+from core.context import ExecutionContext, POLICIES
+from core import tracing
 from core.logger import write_shadow_log
-from llm.factory import get_llm
-from graph import build_graph
+from core.log_index import LogIndex, COMPONENTS, default_index_path
+from core.dedup import BriefIndex, default_dedup_path
+from batch import BatchManifest, iter_briefs, jsonl_writer, run_batch, arun_batch, run_sharded_batch
 
-"""Orchestrator for a single evaluation run.
+"""Orchestrator for single and batch evaluation runs.
 
 Responsibilities:
 - Compose initial EngineState.
 - Instantiate ExecutionContext and LLM.
 - Build and execute the state graph.
 - Persist a shadow log and print the final state.
+- `python main.py batch briefs.jsonl --out results.jsonl --concurrency N`
+  evaluates a JSONL stream of briefs with a single compiled graph;
+  `--workers N` shards it over N processes with results in input order;
+  `--manifest batch.manifest --checkpoint runs.sqlite3` makes it resumable.
+- `python main.py serve --port 8080` keeps one compiled graph warm and
+  serves POST /evaluate (see server.py).
+- `python main.py index` indexes existing shadow logs; `python main.py query
+  --component technical --status KILL --since 2026-10-11` looks runs up.
+- `python main.py rearbitrate --rule min_kill_confidence:threshold=0.7`
+  re-decides every indexed run under other rules and prints the decision
+  diffs (core/bulk_arbiter.py, needs NumPy).
 
 Assumptions:
 - Agents return partial state patches that the graph runtime merges into the EngineState.
 - This module performs orchestration only; decision/business logic lives in agents/.
+- langgraph, the agents and the LLM provider are imported only by commands
+  that evaluate briefs (build_engine), so index/query and --help start fast.
 """
 
 def format_final_state(state: EngineState) -> str:
@@ -35,50 +54,45 @@ def format_final_state(state: EngineState) -> str:
       { run_id, brief, evaluations: {market,business,technical}, final_decision }
 
     Important:
-    - Uses json.dumps(..., default=str) to safely serialize enums or unexpected
-      objects for display. This does not change the underlying state.
+    - Uses json.dumps(..., default=json_default) so results print as plain
+      objects and anything unexpected as str. This does not change the
+      underlying state.
     """
-    display_view = {
-        "run_id": state.get("run_id"),
-        "brief": state.get("brief"),
-        "evaluations": {
-            "market": state.get("market_eval"),
-            "business": state.get("business_eval"),
-            "technical": state.get("technical_eval"),
-        },
-        "final_decision": state.get("final_decision")
-    }
+    display_view = final_state_view(state)
     # Pretty-print for readability; do not mutate state.
-    return json.dumps(display_view, indent=2, ensure_ascii=False, default=str)
+    return json.dumps(display_view, indent=2, ensure_ascii=False, default=json_default)
+
+def build_engine(policy: str = None):
+    """Compile the evaluation graph around the configured LLM.
+
+    The imports live here so commands that never evaluate do not pay for
+    langgraph or a provider SDK.
+    """
+    from llm.factory import get_llm
+    from graph import build_graph
+
+    return build_graph(ExecutionContext(llm=get_llm()), policy=policy)
+
 
 def run_once():
     """Run one evaluation pass.
 
     Inputs: None
-    Outputs: prints final state and writes a JSON snapshot via write_shadow_log.
+    Outputs: prints final state and queues a shadow-log record via write_shadow_log.
     Assumptions:
     - run_id must be unique per run.
-    - The graph.invoke call will return the merged EngineState.
+    - The graph.invoke call will return the merged EngineState; with a
+      checkpointer (CHECKPOINT_DB) it runs under run_id via invoke_run.
     """
     # Prepare initial run state.
-    state: EngineState = {
-        # NOTE: current f-string contains a literal; if you want an 8-char hex slice,
-        # change to: uuid.uuid4().hex[:8]
-        "run_id": f"run_{uuid.uuid4().hex[:8]}",
-        "brief": None,
-        "market_eval": None,
-        "business_eval": None,
-        "technical_eval": None,
-        "final_decision": None
-    }
-
-    llm = get_llm()
-    ctx = ExecutionContext(llm=llm)
+    state: EngineState = initial_state(brief=None)
 
     # Build and execute the state graph.
-    graph = build_graph(ctx)
-    
-    final_state = graph.invoke(state)
+    from core.checkpoint import invoke_run
+    graph = build_engine()
+
+    with tracing.span("run", run_id=state["run_id"]):
+        final_state, _ = invoke_run(graph, state)
 
     # Persist a shadow log for debugging/observability.
     write_shadow_log(final_state)
@@ -88,6 +102,231 @@ def run_once():
     print(format_final_state(final_state))
     print("===================\n")
 
+def run_batch_cli(args: argparse.Namespace) -> None:
+    """Evaluate a JSONL file of briefs with one compiled graph.
+
+    Results are written one JSON object per line to --out (stdout for "-") as
+    each run finishes; a throughput summary and per-role LLM usage are
+    printed to stderr at the end.
+    Runs are driven by graph.ainvoke on one event loop unless --threads;
+    with --workers N > 1, by N worker processes (--concurrency runs each),
+    written in input order.
+    With --manifest, finished positions are recorded there and a re-run of
+    the same command skips them and appends the rest to --out; --checkpoint
+    (CHECKPOINT_DB) also resumes interrupted runs at the node they reached.
+    """
+    if args.workers > 1 and args.threads:
+        raise SystemExit("--threads cannot be combined with --workers")
+    if args.checkpoint:
+        # Set before building graphs; sharded workers inherit it.
+        os.environ["CHECKPOINT_DB"] = args.checkpoint
+    manifest = BatchManifest(args.manifest, os.path.abspath(args.input)) if args.manifest else None
+    # Build LLM, context and graph once for the whole batch (once per worker when sharded).
+    graph = build_engine(args.policy) if args.workers <= 1 else None
+
+    mode = "a" if manifest is not None else "w"
+    out = sys.stdout if args.out == "-" else open(args.out, mode, encoding="utf-8")
+    try:
+        with open(args.input, "r", encoding="utf-8") as src:
+            options = dict(concurrency=args.concurrency, shadow_log=not args.no_shadow_log, manifest=manifest)
+            if graph is None:
+                summary = run_sharded_batch(src, lambda line: out.write(line + "\n"),
+                                            workers=args.workers, policy=args.policy, **options)
+            elif args.threads:
+                summary = run_batch(graph, iter_briefs(src), jsonl_writer(out), **options)
+            else:
+                summary = asyncio.run(arun_batch(graph, iter_briefs(src), jsonl_writer(out), **options))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if manifest is not None:
+            manifest.close()
+
+    skipped = f", {summary['skipped']} already done" if "skipped" in summary else ""
+    print(
+        f"Evaluated {summary['total']} briefs ({summary['failed']} failed{skipped}) "
+        f"in {summary['elapsed_s']}s: {summary['briefs_per_sec']} briefs/sec",
+        file=sys.stderr
+    )
+    if summary["dropped"]:
+        print(f"Shadow log dropped {summary['dropped']} records (queue full; see SHADOW_LOG_QUEUE)", file=sys.stderr)
+    # Per-role tokens, prompt-cache hits and cost (llm/usage.py).
+    from llm.usage import format_role_stats, role_stats
+    report = role_stats().snapshot()
+    if report:
+        print(format_role_stats(report), file=sys.stderr)
+
+
+def serve_cli(args: argparse.Namespace) -> None:
+    """Run the resident evaluation server until interrupted."""
+    from server import EvaluationServer, serve
+
+    # Build LLM, context and graph once for the life of the server.
+    graph = build_engine(args.policy)
+    server = EvaluationServer(
+        graph,
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        shadow_log=not args.no_shadow_log
+    )
+    where = args.unix or f"http://{args.host}:{args.port}"
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix,
+                          ready=lambda _: print(f"Serving on {where}", file=sys.stderr)))
+    except KeyboardInterrupt:
+        pass
+
+
+def open_index(args: argparse.Namespace) -> LogIndex:
+    path = args.index or (os.path.join(args.logs, "index.sqlite3") if args.logs else default_index_path())
+    return LogIndex(path, logs_dir=args.logs)
+
+
+def index_cli(args: argparse.Namespace) -> None:
+    """Bring the shadow-log index up to date with the files in the logs directory."""
+    index = open_index(args)
+    added = index.build()
+    print(f"Indexed {added} new runs ({index.count()} total) into {index.path}", file=sys.stderr)
+    if args.dedup:
+        path = os.path.join(args.logs, "dedup.sqlite3") if args.logs else default_dedup_path()
+        dedup = BriefIndex(path=path)
+        added = dedup.build(args.logs)
+        print(f"Fingerprinted {added} new briefs ({len(dedup)} total) into {path}", file=sys.stderr)
+
+
+def query_cli(args: argparse.Namespace) -> None:
+    """Print indexed runs matching the filters, one JSON object per line, newest first."""
+    index = open_index(args)
+    filters = dict(
+        run_id=args.run_id,
+        decision=args.decision,
+        gate=args.gate,
+        component=args.component,
+        status=args.status,
+        since=args.since,
+        until=args.until
+    )
+    if args.count:
+        print(index.count(**filters))
+        return
+    for row in index.query(limit=args.limit, **filters):
+        print(json.dumps(index.record(row) if args.full else row, ensure_ascii=False, default=str))
+
+
+def rearbitrate_cli(args: argparse.Namespace) -> None:
+    """Decide every logged run under --base and each --rule; print one JSON diff per rule.
+
+    Verdicts come from the shadow-log index (--source index) or straight
+    from the shadow logs (--source logs), for --components or else the
+    evaluator registry's (EVALUATORS, agents/registry.py). --base recorded
+    compares against the logged decisions.
+    """
+    import time
+    from agents.registry import resolve_evaluators
+    from core import bulk_arbiter
+    from core.logger import LOD_DIR, iter_shadow_records
+
+    for plugin in args.rule_plugin or ():
+        name, _, spec = plugin.partition("=")
+        bulk_arbiter.register_rule(name, spec)
+    if args.components:
+        components = [name.strip() for name in args.components.split(",") if name.strip()]
+    else:
+        components = [spec.name for spec in resolve_evaluators({})]
+    started = time.perf_counter()
+    if args.source == "index":
+        index = open_index(args)
+        index.build()
+        columns = bulk_arbiter.load_index(index, components, since=args.since, until=args.until)
+    else:
+        columns = bulk_arbiter.load_records(iter_shadow_records(args.logs or os.getenv("SHADOW_LOG_DIR", LOD_DIR)),
+                                            components)
+    loaded = time.perf_counter()
+    if args.base == "recorded":
+        base = columns.recorded
+    else:
+        base = bulk_arbiter.rule_from_spec(args.base)(columns)
+    for spec in args.rule or ["rejection_first"]:
+        report = bulk_arbiter.diff(columns, base, bulk_arbiter.rule_from_spec(spec)(columns), examples=args.examples)
+        print(json.dumps({"base": args.base, "rule": spec, **report}, ensure_ascii=False))
+    print(f"{len(columns)} runs: loaded in {loaded - started:.2f}s, decided and diffed in "
+          f"{time.perf_counter() - loaded:.3f}s", file=sys.stderr)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Blackbox evaluation engine")
+    sub = parser.add_subparsers(dest="command")
+
+    batch = sub.add_parser("batch", help="Evaluate a JSONL file of briefs")
+    batch.add_argument("input", help="JSONL file, one brief (or {run_id, brief}) per line")
+    batch.add_argument("--out", default="-", help="JSONL results file (default: stdout)")
+    batch.add_argument("--concurrency", type=int, default=64, help="Max runs in flight (per worker)")
+    batch.add_argument("--workers", type=int, default=1,
+                       help="Worker processes; above 1, results are written in input order with stable run_ids")
+    batch.add_argument("--threads", action="store_true", help="Use the thread-pool (sync) path instead of asyncio")
+    batch.add_argument("--policy", choices=POLICIES, help="Execution policy (default: EXECUTION_POLICY or strict)")
+    batch.add_argument("--no-shadow-log", action="store_true", help="Skip per-run shadow logs")
+    batch.add_argument("--manifest", help="Record finished positions here; a re-run skips them and appends to --out")
+    batch.add_argument("--checkpoint", help="Checkpoint runs to this sqlite file (sets CHECKPOINT_DB)")
+
+    serve = sub.add_parser("serve", help="Run the resident evaluation server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--unix", help="Listen on this unix socket instead of TCP")
+    serve.add_argument("--max-concurrency", type=int, default=64, help="Evaluations running at once")
+    serve.add_argument("--max-queue", type=int, default=256, help="Evaluations waiting for a slot before 503s")
+    serve.add_argument("--policy", choices=POLICIES, help="Execution policy (default: EXECUTION_POLICY or strict)")
+    serve.add_argument("--no-shadow-log", action="store_true", help="Skip per-run shadow logs")
+
+    verdict = str.upper
+    statuses = tuple(status.value for status in Status)
+    for name, help_text in (("index", "Index existing shadow logs"), ("query", "Query the shadow-log index")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("--logs", help="Shadow-log directory (default: SHADOW_LOG_DIR or logs/)")
+        command.add_argument("--index", help="Index file (default: SHADOW_LOG_INDEX or <logs>/index.sqlite3)")
+        if name == "index":
+            command.add_argument("--dedup", action="store_true", help="Also fingerprint briefs for near-duplicate detection")
+        if name == "query":
+            command.add_argument("--run-id")
+            command.add_argument("--decision", type=verdict, choices=("BUILD", "KILL", "INSUFFICIENT_INFO"),
+                                 help="Final decision")
+            command.add_argument("--gate", type=verdict, choices=statuses, help="Workflow gate decision")
+            command.add_argument("--component",
+                                 help=f"Filter on this component's status ({', '.join(COMPONENTS)} or a registry evaluator)")
+            command.add_argument("--status", type=verdict, choices=statuses, help="Status for --component")
+            command.add_argument("--since", help="ISO date/time, inclusive")
+            command.add_argument("--until", help="ISO date/time, exclusive")
+            command.add_argument("--limit", type=int, default=100)
+            command.add_argument("--count", action="store_true", help="Print only the number of matches")
+            command.add_argument("--full", action="store_true", help="Print full shadow-log records")
+
+    rearb = sub.add_parser("rearbitrate", help="Re-decide logged runs under other rules and diff the decisions")
+    rearb.add_argument("--logs", help="Shadow-log directory (default: SHADOW_LOG_DIR or logs/)")
+    rearb.add_argument("--index", help="Index file (default: SHADOW_LOG_INDEX or <logs>/index.sqlite3)")
+    rearb.add_argument("--source", choices=("index", "logs"), default="index",
+                       help="Read verdicts from the index (fast) or straight from the shadow logs")
+    rearb.add_argument("--components", help="Comma-separated components (default: the evaluator registry's)")
+    rearb.add_argument("--base", default="recorded", help="Rule to compare against, or 'recorded' for the logged decisions")
+    rearb.add_argument("--rule", action="append",
+                       help="Rule spec, name[:key=value,...]; repeatable (default: rejection_first)")
+    rearb.add_argument("--rule-plugin", action="append", help="name=module:factory, a custom rule for --rule/--base")
+    rearb.add_argument("--since", help="ISO date/time, inclusive (--source index)")
+    rearb.add_argument("--until", help="ISO date/time, exclusive (--source index)")
+    rearb.add_argument("--examples", type=int, default=20, help="Changed runs listed per rule")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    run_once()
\ No newline at end of file
+    args = parse_args()
+    if args.command == "batch":
+        run_batch_cli(args)
+    elif args.command == "serve":
+        serve_cli(args)
+    elif args.command == "index":
+        index_cli(args)
+    elif args.command == "rearbitrate":
+        rearbitrate_cli(args)
+    elif args.command == "query":
+        query_cli(args)
+    else:
+        run_once()
\ No newline at end of file
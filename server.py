@@ -0,0 +1,207 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from core import tracing
+from core.brief import PreparedBrief, prepare_brief
+from core.logger import write_shadow_log
+from core.results import json_default
+from core.state import initial_state, final_state_view, new_run_id
+from llm.usage import role_stats
+
+"""Resident evaluation server.
+
+Holds one compiled graph (and so one pooled LLM client) for the life of the
+process and serves evaluations over a minimal HTTP/1.1 interface on TCP or
+a unix socket:
+- POST /evaluate   body: a brief, or {"run_id": ..., "brief": {...}}
+                   200: the format_final_state payload (run_id, brief,
+                   evaluations, final_decision) as JSON
+- GET  /health     liveness plus in-flight / queued counts
+- GET  /stats      counters (requests, evaluations, coalesced, rejected)
+- GET  /usage      LLM usage per agent role since start: tokens, prompt-cache
+                   hits, cost and savings, latency with / without a hit
+- GET  /metrics    Prometheus text, when tracing is on
+
+Concurrent requests for the same brief (same canonical JSON, see
+core/brief.py) are coalesced:
+they wait on the evaluation already in flight and share its result, run_id
+included (X-Coalesced: 1). Backpressure: at most max_concurrency
+evaluations run at once and at most max_queue more wait for a slot; beyond
+that new briefs are rejected with 503 and Retry-After instead of queuing
+without bound. Joining an in-flight evaluation is always accepted.
+
+Start with `python main.py serve --port 8080` (see main.py).
+"""
+
+MAX_BODY_BYTES = 1024 * 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class Overloaded(Exception):
+    # Raised when a new evaluation would exceed max_concurrency + max_queue.
+    pass
+
+
+class EvaluationServer:
+    # Evaluates briefs on one event loop with coalescing and bounded admission.
+    def __init__(self, graph, max_concurrency: int = 64, max_queue: int = 256, shadow_log: bool = True):
+        """Create a server around a compiled graph.
+
+        Inputs:
+        - graph: compiled graph from build_graph(ctx); its ainvoke is used
+        - max_concurrency: evaluations running at once
+        - max_queue: evaluations admitted beyond that, waiting for a slot
+        - shadow_log: queue a shadow-log record per evaluation
+        """
+        self.graph = graph
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.shadow_log = shadow_log
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._running = 0
+        self._counters = {"requests": 0, "evaluations": 0, "coalesced": 0, "rejected": 0, "failed": 0}
+
+    async def evaluate(self, brief: Dict[str, Any], run_id: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Return (final state view, coalesced) for brief.
+
+        Raises Overloaded when the brief is not in flight and admission is full.
+        """
+        # Coalescing key: the prepared brief's digest; the run reuses its text.
+        prepared = prepare_brief(brief)
+        key = prepared.sha256
+        task = self._in_flight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self._counters["coalesced"] += 1
+        else:
+            if len(self._in_flight) >= self.max_concurrency + self.max_queue:
+                self._counters["rejected"] += 1
+                raise Overloaded(f"{len(self._in_flight)} evaluations admitted")
+            task = asyncio.ensure_future(self._run(prepared, run_id or new_run_id()))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield: a client disconnecting must not cancel a run others wait on.
+        return await asyncio.shield(task), coalesced
+
+    async def _run(self, prepared: PreparedBrief, run_id: str) -> Dict[str, Any]:
+        from core.checkpoint import ainvoke_run
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        async with self._slots:
+            self._running += 1
+            self._counters["evaluations"] += 1
+            try:
+                with tracing.span("run", run_id=run_id):
+                    final_state, _ = await ainvoke_run(self.graph, initial_state(prepared.brief, run_id, prepared))
+            except Exception:
+                self._counters["failed"] += 1
+                raise
+            finally:
+                self._running -= 1
+        if self.shadow_log:
+            write_shadow_log(final_state)
+        return final_state_view(final_state)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._counters, "running": self._running, "queued": len(self._in_flight) - self._running}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one connection (keep-alive by default)."""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload, extra = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Disconnects and malformed request lines just end the connection.
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes):
+        # (status, body, extra headers) for one request.
+        if path == "/health":
+            return 200, {"status": "ok", **self.stats()}, {}
+        if path == "/stats":
+            return 200, self.stats(), {}
+        if path == "/usage":
+            return 200, role_stats().snapshot(), {}
+        if path == "/metrics" and tracing.metrics() is not None:
+            return 200, tracing.metrics().render(), {"Content-Type": "text/plain; version=0.0.4"}
+        if path != "/evaluate":
+            return 404, {"error": f"no route for {path}"}, {}
+        if method != "POST":
+            return 405, {"error": "use POST"}, {"Allow": "POST"}
+        if body is None:
+            return 413, {"error": f"body exceeds {MAX_BODY_BYTES} bytes"}, {}
+
+        self._counters["requests"] += 1
+        try:
+            record = json.loads(body)
+        except ValueError as exc:
+            return 400, {"error": f"invalid JSON: {exc}"}, {}
+        if not isinstance(record, dict):
+            return 400, {"error": "expected a JSON object"}, {}
+        run_id, brief = (record.get("run_id"), record["brief"]) if isinstance(record.get("brief"), dict) else (None, record)
+
+        try:
+            view, coalesced = await self.evaluate(brief, run_id)
+        except Overloaded as exc:
+            return 503, {"error": f"overloaded: {exc}"}, {"Retry-After": "1"}
+        except Exception as exc:
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}, {}
+        return 200, view, {"X-Coalesced": "1" if coalesced else "0"}
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    # (method, path, headers, body) or None at EOF; body None when too large.
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY_BYTES:
+        return method, path, {**headers, "connection": "close"}, None
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?", 1)[0], headers, body
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, payload, extra: Dict[str, str], keep_alive: bool) -> None:
+    if isinstance(payload, str):
+        data = payload.encode("utf-8")
+    else:
+        data = json.dumps(payload, ensure_ascii=False, default=json_default).encode("utf-8")
+    headers = {"Content-Type": "application/json", **extra, "Content-Length": str(len(data)),
+               "Connection": "keep-alive" if keep_alive else "close"}
+    head = f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+    writer.write(head.encode("latin-1") + b"\r\n" + data)
+
+
+async def serve(server: EvaluationServer, host: str = "127.0.0.1", port: int = 8080, unix_path: Optional[str] = None, ready=None):
+    """Listen on TCP (or unix_path) until cancelled; ready(sockets) is called once bound."""
+    if unix_path:
+        listener = await asyncio.start_unix_server(server.handle, path=unix_path)
+    else:
+        listener = await asyncio.start_server(server.handle, host=host, port=port)
+    if ready:
+        ready(listener.sockets)
+    async with listener:
+        await listener.serve_forever()
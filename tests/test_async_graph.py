@@ -0,0 +1,29 @@
+# tests/test_async_graph.py
+import asyncio
+import json
+
+from core.context import ExecutionContext
+from core.state import initial_state
+from graph import build_graph
+from llm.base import LLMClient
+from llm.mock_llm import MockLLM
+
+
+def test_ainvoke_matches_invoke():
+    graph = build_graph(ExecutionContext(llm=MockLLM()))
+
+    for hook in ["Invoice reconciliation", "Tinder for Dogs", "Blockchain payroll"]:
+        brief = {"concept_hook": hook}
+        sync_state = graph.invoke(initial_state(brief, "run_sync"))
+        async_state = asyncio.run(graph.ainvoke(initial_state(brief, "run_async")))
+        assert async_state["final_decision"] == sync_state["final_decision"]
+
+
+def test_default_agenerate_wraps_sync_generate():
+    class SyncOnly(LLMClient):
+        def generate(self, system: str, user: str) -> str:
+            return json.dumps({"system": system, "user": user})
+
+    output = asyncio.run(SyncOnly().agenerate(system="s", user="u"))
+
+    assert json.loads(output) == {"system": "s", "user": "u"}
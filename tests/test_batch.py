@@ -0,0 +1,73 @@
+# tests/test_batch.py
+import asyncio
+import io
+import json
+
+from batch import arun_batch, iter_briefs, run_batch, run_sharded_batch
+from core.context import ExecutionContext
+from graph import build_graph
+from llm.mock_llm import MockLLM
+
+
+def test_iter_briefs_accepts_bare_and_enveloped_lines():
+    lines = io.StringIO(
+        '{"concept_hook": "A"}\n'
+        '\n'
+        '{"run_id": "run_x", "brief": {"concept_hook": "B"}}\n'
+    )
+
+    pairs = list(iter_briefs(lines))
+
+    assert pairs == [(None, {"concept_hook": "A"}), ("run_x", {"concept_hook": "B"})]
+
+
+def test_bad_lines_become_error_records_in_every_mode():
+    graph = build_graph(ExecutionContext(llm=MockLLM()))
+    lines = ['{"concept_hook": "A"}', '{"concept_hook": ', "", "[1, 2]", '{"concept_hook": "B"}']
+    threaded, looped = [], []
+
+    summary = run_batch(graph, iter_briefs(lines), threaded.append, concurrency=2, shadow_log=False)
+    asyncio.run(arun_batch(graph, iter_briefs(lines), looped.append, shadow_log=False))
+
+    assert summary["total"] == 4 and summary["failed"] == 2 and summary["succeeded"] == 2
+    assert summary["dropped"] == 0
+    for records in (threaded, looped):
+        errors = sorted((r["line"], r["error"].split(":")[0]) for r in records if "error" in r)
+        assert errors == [(2, "JSONDecodeError"), (4, "expected a JSON object, got list")]
+        assert sorted(r["brief"]["concept_hook"] for r in records if "error" not in r) == ["A", "B"]
+
+
+def test_run_batch_shares_graph_and_reports_every_brief():
+    graph = build_graph(ExecutionContext(llm=MockLLM()))
+    briefs = [("run_kill", {"concept_hook": "Tinder for Dogs"})] + [
+        (None, {"concept_hook": f"Idea {i}"}) for i in range(20)
+    ]
+    results = []
+
+    summary = run_batch(graph, briefs, results.append, concurrency=4, shadow_log=False)
+
+    assert summary["total"] == 21 and summary["failed"] == 0
+    assert len(results) == 21
+    by_id = {r["run_id"]: r for r in results}
+    assert by_id["run_kill"]["final_decision"] == "KILL"
+    assert sum(r["final_decision"] == "BUILD" for r in results) == 20
+    json.dumps(results, default=str)
+
+
+def test_sharded_batch_keeps_input_order_and_stable_run_ids():
+    lines = ['{"run_id": "run_kill", "brief": {"concept_hook": "Tinder for Dogs"}}', "", "not json"] + [
+        json.dumps({"concept_hook": f"Idea {i}"}) for i in range(12)
+    ]
+    first, second = [], []
+
+    summary = run_sharded_batch(lines, first.append, workers=2, concurrency=3, shadow_log=False, chunk_size=2)
+    run_sharded_batch(lines, second.append, workers=1, shadow_log=False)
+
+    assert summary["total"] == 14 and summary["failed"] == 1 and summary["workers"] == 2
+    assert summary["dropped"] == 0
+    assert first == second
+    records = [json.loads(line) for line in first]
+    assert records[0]["run_id"] == "run_kill" and records[0]["final_decision"] == "KILL"
+    assert records[1]["line"] == 3 and "JSONDecodeError" in records[1]["error"]
+    assert [r["brief"]["concept_hook"] for r in records[2:]] == [f"Idea {i}" for i in range(12)]
+    assert records[2]["run_id"].startswith("run_00000002_")
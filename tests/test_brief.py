@@ -0,0 +1,60 @@
+# tests/test_brief.py
+import core.brief
+from core.brief import prepare_brief, prepared
+from core.context import ExecutionContext
+from core.state import initial_state
+from graph import build_graph
+from llm.mock_llm import MockLLM
+
+
+class RecordingLLM(MockLLM):
+    # Mock that keeps every (system, user) pair it is sent.
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate(self, system: str, user: str) -> str:
+        self.prompts.append((system, user))
+        return super().generate(system, user)
+
+
+def test_canonical_text_ignores_key_order():
+    a = prepare_brief({"concept_hook": "Invoice matching", "why_now": "Café close"})
+    b = prepare_brief({"why_now": "Café close", "concept_hook": "Invoice matching"})
+
+    assert a.text == b.text
+    assert a.sha256 == b.sha256
+    assert "Café" in a.text
+
+
+def test_brief_is_serialized_once_per_run(monkeypatch):
+    calls = []
+    canonical_json = core.brief.canonical_json
+    monkeypatch.setattr(core.brief, "canonical_json", lambda brief: calls.append(1) or canonical_json(brief))
+    graph = build_graph(ExecutionContext(llm=MockLLM()))
+
+    state = graph.invoke(initial_state({"concept_hook": "Invoice matching"}, "run_brief"))
+
+    assert state["final_decision"] == "BUILD"
+    assert len(calls) == 1
+
+
+def test_prompts_are_byte_stable_across_key_order():
+    llm = RecordingLLM()
+    graph = build_graph(ExecutionContext(llm=llm))
+
+    graph.invoke(initial_state({"concept_hook": "Invoice matching", "target_customer": "AP teams"}, "run_a"))
+    first, llm.prompts = llm.prompts, []
+    graph.invoke(initial_state({"target_customer": "AP teams", "concept_hook": "Invoice matching"}, "run_b"))
+
+    assert sorted(llm.prompts) == sorted(first)
+    # The brief comes last, after each agent's fixed instructions.
+    assert all(user.endswith(prepare_brief({"concept_hook": "Invoice matching", "target_customer": "AP teams"}).text)
+               for _, user in first)
+
+
+def test_replaced_brief_is_prepared_again():
+    state = initial_state({"concept_hook": "Old"}, "run_stale")
+    state["brief"] = {"concept_hook": "New"}
+
+    assert '"New"' in prepared(state).text
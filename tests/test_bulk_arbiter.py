@@ -0,0 +1,105 @@
+# tests/test_bulk_arbiter.py
+import itertools
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from agents.arbiter import final_arbiter
+from core import bulk_arbiter
+from core.bulk_arbiter import COMPONENTS, decision_names, diff, load_index, load_records, rule_from_spec
+from core.context import ExecutionContext
+from core.log_index import LogIndex
+from core.logger import ShadowLogWriter, shadow_record
+from core.state import initial_state
+from graph import build_graph
+from llm.mock_llm import MockLLM
+
+VERDICTS = (None, "PASS", "KILL", "INSUFFICIENT_INFO")
+
+
+def record(run_id, gate, statuses, confidence=0.9, decision=None):
+    evals = {f"{c}_eval": {"status": s, "confidence": confidence} if s else None for c, s in zip(COMPONENTS, statuses)}
+    return {"run_id": run_id, "workflow_gate": {"decision": gate} if gate else None, **evals, "final_decision": decision}
+
+
+def test_rejection_first_matches_final_arbiter_on_every_combination():
+    records = []
+    for gate in ("PASS", "KILL"):
+        for statuses in itertools.product(VERDICTS, repeat=len(COMPONENTS)):
+            rec = record(str(len(records)), gate, statuses)
+            expected = "KILL" if gate == "KILL" else final_arbiter(dict(rec))["final_decision"]
+            records.append((rec, expected))
+
+    decisions = decision_names(rule_from_spec("rejection_first")(load_records(r for r, _ in records)))
+
+    assert decisions == [expected for _, expected in records]
+
+
+def test_alternative_rules_and_decision_diff(monkeypatch):
+    columns = load_records([
+        record("weak_kill", "PASS", ("PASS", "KILL", "PASS"), confidence=0.4, decision="KILL"),
+        record("strong_kill", "PASS", ("PASS", "KILL", "PASS"), decision="KILL"),
+        record("unsure", "PASS", ("PASS", "INSUFFICIENT_INFO", "PASS"), decision="INSUFFICIENT_INFO"),
+        record("gate_kill", "KILL", (None, None, None), decision="KILL"),
+        record("dedup_skip", None, (None, None, None), decision="BUILD"),
+    ])
+
+    lenient = rule_from_spec("min_kill_confidence:threshold=0.5")(columns)
+    assert decision_names(lenient) == ["BUILD", "KILL", "INSUFFICIENT_INFO", "KILL", "BUILD"]
+    assert decision_names(rule_from_spec("insufficient_as:verdict=pass")(columns))[2] == "BUILD"
+
+    report = diff(columns, columns.recorded, lenient)
+    assert report["changed"] == 1 and report["transitions"] == {"KILL->BUILD": 1}
+    assert report["examples"] == [{"run_id": "weak_kill", "base": "KILL", "other": "BUILD"}]
+
+    with pytest.raises(ValueError):
+        rule_from_spec("nope")
+    with pytest.raises(ValueError):
+        rule_from_spec("weighted:market=0,business=0,technical=0")
+    with pytest.raises(ValueError):
+        rule_from_spec("weighted:market=-1")
+    monkeypatch.setattr(bulk_arbiter, "RULES", dict(bulk_arbiter.RULES))
+    bulk_arbiter.register_rule("always_build", "tests.test_bulk_arbiter:always_build")
+    assert decision_names(rule_from_spec("always_build")(columns)) == ["BUILD"] * 5
+
+
+def always_build():
+    def rule(columns):
+        return columns.recorded * 0 + bulk_arbiter.BUILD
+    return rule
+
+
+def test_index_columns_reproduce_logged_decisions(tmp_path):
+    graph = build_graph(ExecutionContext(llm=MockLLM()))
+    index = LogIndex(str(tmp_path / "index.sqlite3"))
+    writer = ShadowLogWriter(directory=tmp_path, index=index)
+    for i, hook in enumerate(["Tinder for Dogs", "Invoice matching", "Freight audit"]):
+        writer.submit(shadow_record(graph.invoke(initial_state({"concept_hook": hook}, f"run_{i}"))))
+    writer.close()
+
+    columns = load_index(index)
+
+    assert columns.run_ids == ["run_0", "run_1", "run_2"]
+    assert decision_names(columns.recorded) == ["KILL", "BUILD", "BUILD"]
+    assert (rule_from_spec("rejection_first")(columns) == columns.recorded).all()
+
+
+def test_index_columns_cover_registry_components(tmp_path):
+    components = (*COMPONENTS, "security")
+    records = []
+    for i, security in enumerate(("PASS", "KILL", "INSUFFICIENT_INFO", None)):
+        rec = record(f"run_{i}", "PASS", ("PASS", "PASS", "PASS"))
+        rec["security_eval"] = {"status": security, "confidence": 0.6} if security else None
+        rec["final_decision"] = final_arbiter(dict(rec), [f"{c}_eval" for c in components])["final_decision"]
+        records.append(rec)
+    index = LogIndex(str(tmp_path / "index.sqlite3"))
+    index.add((rec, "live.jsonl", i) for i, rec in enumerate(records))
+
+    columns = load_index(index, components)
+    expected = load_records(records, components)
+
+    assert columns.components == components
+    assert (columns.status == expected.status).all()
+    assert (rule_from_spec("rejection_first")(columns) == columns.recorded).all()
+    assert decision_names(columns.recorded) == ["BUILD", "KILL", "INSUFFICIENT_INFO", "KILL"]
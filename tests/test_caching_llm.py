@@ -0,0 +1,84 @@
+# tests/test_caching_llm.py
+import asyncio
+
+from llm.base import LLMClient
+from llm.caching_llm import CachingLLM
+
+
+class CountingLLM(LLMClient):
+    provider = "counting"
+    model = "m1"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, system: str, user: str) -> str:
+        self.calls += 1
+        return f"{system}|{user}"
+
+
+def test_repeat_requests_hit_memory_tier():
+    inner = CountingLLM()
+    llm = CachingLLM(inner, max_entries=2)
+
+    assert llm.generate("s", "a") == "s|a"
+    assert llm.generate("s", "a") == "s|a"
+    assert asyncio.run(llm.agenerate("s", "a")) == "s|a"
+
+    assert inner.calls == 1
+    assert llm.stats()["hits"] == 2 and llm.stats()["misses"] == 1
+
+
+def test_lru_evicts_least_recently_used():
+    inner = CountingLLM()
+    llm = CachingLLM(inner, max_entries=2)
+
+    llm.generate("s", "a")
+    llm.generate("s", "b")
+    llm.generate("s", "a")  # refresh a; b is now oldest
+    llm.generate("s", "c")  # evicts b
+
+    assert llm.stats()["evictions"] == 1
+    llm.generate("s", "a")
+    assert inner.calls == 3
+    llm.generate("s", "b")
+    assert inner.calls == 4
+
+
+def test_sqlite_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = CachingLLM(CountingLLM(), path=path)
+    first.generate("s", "a")
+
+    inner = CountingLLM()
+    second = CachingLLM(inner, path=path)
+
+    assert second.generate("s", "a") == "s|a"
+    assert inner.calls == 0
+    assert second.stats()["disk_hits"] == 1
+
+
+def test_key_includes_model():
+    inner = CountingLLM()
+    llm = CachingLLM(inner)
+    key_m1 = llm.cache_key("s", "a")
+    inner.model = "m2"
+
+    assert llm.cache_key("s", "a") != key_m1
+
+
+def test_malformed_completions_are_not_cached():
+    class FlakyLLM(CountingLLM):
+        def generate(self, system: str, user: str) -> str:
+            self.calls += 1
+            return "not json" if self.calls == 1 else '{"status": "PASS"}'
+
+    inner = FlakyLLM()
+    llm = CachingLLM(inner, validate_json=True)
+
+    assert llm.generate("s", "a") == "not json"
+    assert llm.generate("s", "a") == '{"status": "PASS"}'
+    assert llm.generate("s", "a") == '{"status": "PASS"}'
+
+    assert inner.calls == 2
+    assert llm.stats()["rejected"] == 1
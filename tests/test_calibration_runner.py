@@ -0,0 +1,56 @@
+# tests/test_calibration_runner.py
+import json
+
+import pytest
+
+from core.context import ExecutionContext
+from graph import build_graph
+from llm.mock_llm import MockLLM
+from tests.verify_calibration import build_report, load_calibration_set, run_cases, verify
+
+
+@pytest.mark.parametrize("mode", ["async", "threads"])
+def test_parallel_run_matches_expectations(mode):
+    cases = load_calibration_set()
+    graph = build_graph(ExecutionContext(llm=MockLLM()))
+    report = build_report(run_cases(graph, cases, workers=4, mode=mode), cases)
+
+    assert report["total"] == len(cases)
+    assert report["pass_rate"] == 1.0
+    assert report["confusion"]["final"]["BUILD"] == {"BUILD": 1}
+    assert report["usage"]["total"]["calls"] > 0
+    assert report["usage"]["per_case"]["input_tokens"] > report["usage"]["per_case"]["output_tokens"] > 0
+    assert report["latency_s"]["p50"] <= report["latency_s"]["p99"]
+
+
+def test_resume_skips_recorded_cases(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "mock")
+    results = tmp_path / "results.jsonl"
+    report = tmp_path / "report.json"
+    verify(["--results", str(results), "--report", str(report)])
+
+    # Keep one good result and one errored result; only the rest (and the error) rerun.
+    lines = results.read_text().splitlines()
+    errored = {**json.loads(lines[1]), "error": "TimeoutError: boom", "correct": False}
+    results.write_text(lines[0] + "\n" + json.dumps(errored) + "\n")
+
+    final = verify(["--results", str(results), "--report", str(report), "--resume"])
+    assert final["total"] == len(load_calibration_set())
+    assert final["errors"] == 0
+    assert len(results.read_text().splitlines()) == final["total"]
+
+
+def test_report_prices_cases_and_prints_an_empty_set(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("LLM_PROVIDER", "mock")
+    usage = {"calls": 4, "input_tokens": 4000, "output_tokens": 400, "cost_usd": 0.00084}
+    results = [{"id": f"c{i}", "expected": "BUILD", "decision": "BUILD", "correct": True, "latency_s": 0.1,
+                "usage": usage, "components": {}, "kill_reasons": {}} for i in range(2)]
+    assert build_report(results, [])["usage"]["per_case"]["cost_usd"] == 0.00084
+
+    cases = tmp_path / "cases.json"
+    cases.write_text("[]")
+    report = verify(["--cases", str(cases), "--results", str(tmp_path / "r.jsonl"),
+                     "--report", str(tmp_path / "report.json"), "--resume"])
+
+    assert report["pass_rate"] is None
+    assert "Sensitivity: n/a" in capsys.readouterr().out
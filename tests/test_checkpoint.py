@@ -0,0 +1,125 @@
+# tests/test_checkpoint.py
+import threading
+import time
+
+import pytest
+
+from batch import BatchManifest, run_batch
+from core.checkpoint import SqliteCheckpointSaver, invoke_run, run_config
+from core.context import ExecutionContext
+from core.state import initial_state
+from graph import build_graph
+from llm.base import current_role
+from llm.mock_llm import MockLLM
+
+
+class FlakyLLM(MockLLM):
+    # Records the role of every call and fails the roles in `failing`, once
+    # the roles in `after` have answered: a sibling still running when a node
+    # fails is cancelled and never checkpointed.
+    def __init__(self, failing=(), after=()):
+        super().__init__()
+        self.calls = []
+        self.failing = set(failing)
+        self.after = set(after)
+        self.answered = threading.Event() if after else None
+        self._done = set()
+
+    def generate(self, system, user):
+        role = current_role.get()
+        self.calls.append(role)
+        if role in self.failing:
+            if self.answered is not None:
+                self.answered.wait(timeout=5)
+                time.sleep(0.05)  # let their writes be saved
+            raise RuntimeError(f"{role} unavailable")
+        answer = super().generate(system, user)
+        self._done.add(role)
+        if self.answered is not None and self.after <= self._done:
+            self.answered.set()
+        return answer
+
+
+def test_interrupted_strict_run_resumes_at_the_failed_node(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "runs.sqlite3"))
+    llm = FlakyLLM(failing={"technical_eval"}, after={"market_eval", "business_eval"})
+    graph = build_graph(ExecutionContext(llm=llm, config={"checkpointer": saver}), policy="strict")
+    state = initial_state({"concept_hook": "Invoice reconciliation for clinics"}, "run_resume")
+
+    with pytest.raises(RuntimeError):
+        invoke_run(graph, state)
+    assert llm.calls.count("workflow_gate") == 1
+
+    llm.failing.clear()
+    llm.calls.clear()
+    final, origin = invoke_run(graph, state)
+
+    assert origin == "resumed"
+    assert llm.calls == ["technical_eval"]
+    assert final["final_decision"] == "BUILD"
+
+    llm.calls.clear()
+    stored, origin = invoke_run(graph, state)
+    assert origin == "stored" and llm.calls == []
+    assert stored["final_decision"] == final["final_decision"]
+
+
+def test_saver_survives_reopening(tmp_path):
+    path = str(tmp_path / "runs.sqlite3")
+    graph = build_graph(ExecutionContext(llm=MockLLM(), config={"checkpointer": SqliteCheckpointSaver(path)}))
+    final, origin = invoke_run(graph, initial_state({"concept_hook": "Tinder for Dogs"}, "run_kill"))
+    assert origin == "new" and final["final_decision"] == "KILL"
+
+    reopened = SqliteCheckpointSaver(path)
+    snapshot = build_graph(ExecutionContext(llm=MockLLM(), config={"checkpointer": reopened})).get_state(
+        run_config("run_kill"))
+
+    assert snapshot.next == ()
+    assert snapshot.values["final_decision"] == "KILL"
+    assert snapshot.values["brief"] == final["brief"]
+    reopened.delete_thread("run_kill")
+    assert reopened.get_tuple(run_config("run_kill")) is None
+
+
+def test_manifest_skips_finished_positions(tmp_path):
+    graph = build_graph(ExecutionContext(llm=MockLLM()))
+    briefs = [(None, {"concept_hook": f"Idea {i}"}) for i in range(5)]
+    path = str(tmp_path / "batch.manifest")
+    first, second = [], []
+
+    with BatchManifest(path, "briefs.jsonl") as manifest:
+        run_batch(graph, briefs[:3], first.append, concurrency=2, shadow_log=False, manifest=manifest)
+    with BatchManifest(path, "briefs.jsonl") as manifest:
+        summary = run_batch(graph, briefs, second.append, concurrency=2, shadow_log=False, manifest=manifest)
+
+    assert summary["total"] == 2 and summary["skipped"] == 3
+    assert sorted(r["brief"]["concept_hook"] for r in second) == ["Idea 3", "Idea 4"]
+    assert second[0]["run_id"].startswith("run_0000000")
+    with pytest.raises(ValueError):
+        BatchManifest(path, "other.jsonl")
+
+
+def test_entry_points_run_under_a_checkpointer(tmp_path, monkeypatch, capsys):
+    import asyncio
+    import json
+
+    import main
+    from server import EvaluationServer
+
+    monkeypatch.setenv("CHECKPOINT_DB", str(tmp_path / "runs.sqlite3"))
+    monkeypatch.setenv("LLM_PROVIDER", "mock")
+    logged = []
+    monkeypatch.setattr(main, "write_shadow_log", logged.append)
+
+    main.run_once()
+    assert logged[0]["final_decision"] in ("BUILD", "KILL")
+    assert "FINAL STATE" in capsys.readouterr().out
+
+    graph = build_graph(ExecutionContext(llm=MockLLM()))
+    assert graph.checkpointer is not None
+    server = EvaluationServer(graph, shadow_log=False)
+    body = json.dumps({"run_id": "run_served", "brief": {"concept_hook": "Invoice matching"}}).encode()
+    status, view, _ = asyncio.run(server._dispatch("POST", "/evaluate", body))
+
+    assert status == 200 and view["final_decision"] == "BUILD"
+    assert graph.get_state(run_config("run_served")).values["final_decision"] == "BUILD"
@@ -0,0 +1,186 @@
+# tests/test_dedup.py
+import pytest
+
+import graph as graph_module
+from core.context import ExecutionContext
+from core.dedup import BriefIndex
+from core.log_index import LogIndex
+from core.logger import ShadowLogWriter, shadow_record
+from core.state import initial_state
+from graph import build_graph
+from llm.mock_llm import MockLLM
+
+BRIEF = {
+    "concept_hook": "Autopilot for accounts payable teams",
+    "target_customer": "Finance teams at mid-market manufacturers with several ERPs",
+    "core_pain_point": "Invoices arrive as PDFs from hundreds of vendors and clerks key them into the ERP by hand, "
+                       "then chase approvers over email before every month-end close",
+    "mechanism": "OCR extracts line items, matches them against purchase orders and goods receipts, and routes "
+                 "exceptions to the right approver with the discrepancy highlighted",
+    "monetization": "Per-invoice pricing with a monthly platform minimum",
+    "why_now": "Vendors have moved to e-invoicing while ERP vendors still ship no matching engine",
+}
+REWORDED = {**BRIEF, "concept_hook": "Hands-free invoice processing for AP"}
+UNRELATED = {
+    "concept_hook": "Tinder for dogs",
+    "target_customer": "Urban dog owners looking for playmates",
+    "core_pain_point": "Dogs in apartments get too little social time with other dogs",
+    "mechanism": "Swipe-based matching on breed, size and temperament near the owner",
+    "monetization": "Subscription for premium filters",
+}
+
+
+class CountingLLM(MockLLM):
+    # Mock that counts requests.
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def generate(self, system: str, user: str) -> str:
+        self.calls += 1
+        return super().generate(system, user)
+
+
+def test_reworded_brief_matches_and_unrelated_does_not():
+    index = BriefIndex()
+    index.add(BRIEF, "run_original", "BUILD")
+
+    match = index.lookup(REWORDED, threshold=0.7)
+
+    assert match.run_id == "run_original"
+    assert match.final_decision == "BUILD"
+    assert 0.7 <= match.similarity < 1.0
+    assert index.lookup(BRIEF, threshold=0.7).similarity == 1.0
+    assert index.lookup(UNRELATED, threshold=0.3) is None
+
+
+def test_skip_mode_returns_prior_verdict_without_llm_calls(tmp_path):
+    index = BriefIndex()
+    index.add(BRIEF, "run_original", "KILL")
+    llm = CountingLLM()
+    runs = LogIndex(str(tmp_path / "index.sqlite3"))
+    graph = build_graph(ExecutionContext(llm=llm, config={"dedup": "skip", "dedup_index": index, "log_index": runs}))
+
+    state = graph.invoke(initial_state(REWORDED, "run_dup"))
+
+    assert llm.calls == 0
+    assert state["final_decision"] == "KILL"
+    assert state["duplicate_of"]["run_id"] == "run_original"
+    assert state["duplicate_of"]["skipped"] is True
+    # The prior run was never logged, so there is nothing to copy.
+    assert state["duplicate_of"]["copied"] is False
+    # A skipped duplicate is not indexed again.
+    index.observe(shadow_record(state))
+    assert len(index) == 1
+
+
+def test_wordless_briefs_never_match():
+    index = BriefIndex()
+    index.add({"concept_hook": ""}, "run_empty", "KILL")
+    index.add({"concept_hook": "Garbage"}, "run_garbage", "KILL")
+    index.add(None, "run_none", "KILL")
+    llm = CountingLLM()
+    graph = build_graph(ExecutionContext(llm=llm, config={"dedup": "skip", "dedup_index": index}))
+
+    state = graph.invoke(initial_state({"concept_hook": "!!! ???"}, "run_blank"))
+
+    assert len(index) == 1
+    assert index.lookup({}, threshold=0.0) is None
+    assert llm.calls > 0 and not state.get("duplicate_of")
+
+
+def test_attach_mode_evaluates_and_records_match():
+    index = BriefIndex()
+    index.add(BRIEF, "run_original", "KILL")
+    llm = CountingLLM()
+    graph = build_graph(ExecutionContext(llm=llm, config={"dedup": "attach", "dedup_index": index}))
+
+    state = graph.invoke(initial_state(REWORDED, "run_dup"))
+    fresh = graph.invoke(initial_state(UNRELATED, "run_fresh"))
+
+    assert llm.calls > 0
+    assert state["final_decision"] == "BUILD"
+    assert state["duplicate_of"] == {"run_id": "run_original", "final_decision": "KILL",
+                                     "similarity": state["duplicate_of"]["similarity"], "skipped": False}
+    assert fresh["duplicate_of"] is None
+
+
+def test_build_caches_signatures_from_shadow_logs(tmp_path):
+    logs = tmp_path / "logs"
+    writer = ShadowLogWriter(directory=logs)
+    writer.submit(shadow_record({"run_id": "run_original", "brief": BRIEF, "final_decision": "BUILD"}))
+    writer.submit(shadow_record({"run_id": "run_other", "brief": UNRELATED, "final_decision": "KILL"}))
+    writer.close()
+    path = str(tmp_path / "dedup.sqlite3")
+
+    index = BriefIndex(path=path)
+    assert index.build(str(logs)) == 2
+    assert index.build(str(logs)) == 0
+
+    reloaded = BriefIndex(path=path)
+    assert len(reloaded) == 2
+    assert reloaded.lookup(REWORDED).run_id == "run_original"
+    assert reloaded.build(str(logs)) == 0
+
+
+def test_skip_mode_copies_prior_results_from_the_log_index(tmp_path):
+    logs = tmp_path / "logs"
+    runs = LogIndex(str(logs / "index.sqlite3"), logs_dir=str(logs))
+    evaluate = build_graph(ExecutionContext(llm=CountingLLM()))
+    original = evaluate.invoke(initial_state(BRIEF, "run_original"))
+    writer = ShadowLogWriter(directory=logs, index=runs)
+    writer.submit(shadow_record(original))
+    writer.close()
+
+    index = BriefIndex()
+    index.add(BRIEF, "run_original", original["final_decision"])
+    llm = CountingLLM()
+    graph = build_graph(ExecutionContext(llm=llm, config={"dedup": "skip", "dedup_index": index, "log_index": runs}))
+    state = graph.invoke(initial_state(REWORDED, "run_dup"))
+
+    assert llm.calls == 0
+    assert state["duplicate_of"]["copied"] is True
+    assert state["final_decision"] == original["final_decision"]
+    assert state["workflow_gate_result"].to_dict() == original["workflow_gate_result"].to_dict()
+    for key in ("market_eval", "business_eval", "technical_eval"):
+        assert state[key].to_dict() == original[key].to_dict()
+
+    # The copy is indexed with its results, marked as a duplicate.
+    runs.add([(shadow_record(state), "live", 0)])
+    row = runs.query(run_id="run_dup")[0]
+    assert row["duplicate_of"] == "run_original"
+    assert row["market_status"] == original["market_eval"]["status"]
+    assert runs.query(run_id="run_original")[0]["duplicate_of"] is None
+
+
+def test_empty_index_from_config_is_used_and_updated(monkeypatch):
+    monkeypatch.setattr(graph_module, "get_index", lambda: pytest.fail("the configured index was ignored"))
+    index = BriefIndex()
+    llm = CountingLLM()
+    graph = build_graph(ExecutionContext(llm=llm, config={"dedup": "attach", "dedup_index": index}))
+
+    first = graph.invoke(initial_state(BRIEF, "run_first"))
+    index.observe(shadow_record(first))
+    second = graph.invoke(initial_state(REWORDED, "run_second"))
+
+    assert len(index) == 1
+    assert first["duplicate_of"] is None
+    assert second["duplicate_of"]["run_id"] == "run_first"
+
+
+def test_build_skips_runs_already_observed(tmp_path):
+    logs = tmp_path / "logs"
+    record = shadow_record({"run_id": "run_original", "brief": BRIEF, "final_decision": "BUILD"})
+    index = BriefIndex(path=str(tmp_path / "dedup.sqlite3"))
+    index.lookup(BRIEF, run_id="run_original")
+    index.observe(record)
+    writer = ShadowLogWriter(directory=logs)
+    writer.submit(record)
+    writer.submit(shadow_record({"run_id": "run_other", "brief": UNRELATED, "final_decision": "KILL"}))
+    writer.close()
+
+    assert index.build(str(logs)) == 1
+    # Without the check run_original would be indexed (and matched) twice.
+    assert len(index) == 2
+    # The cache still holds both runs for other processes.
+    assert len(BriefIndex(path=str(tmp_path / "dedup.sqlite3"))) == 2
@@ -0,0 +1,60 @@
+# tests/test_fused_eval.py
+import json
+
+import pytest
+
+from agents.fused_eval import fused_evaluator
+from core.context import ExecutionContext
+from core.state import initial_state, final_state_view
+from graph import build_graph
+from llm.mock_llm import MockLLM
+
+
+class CountingLLM(MockLLM):
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, system: str, user: str) -> str:
+        self.calls += 1
+        return super().generate(system, user)
+
+
+class FixedLLM(MockLLM):
+    def __init__(self, output: dict):
+        self.output = output
+
+    def generate(self, system: str, user: str) -> str:
+        return json.dumps(self.output)
+
+
+def test_fused_matches_strict_state_in_one_call():
+    brief = {"concept_hook": "Invoice reconciliation for freight brokers"}
+    strict = build_graph(ExecutionContext(llm=MockLLM()), "strict").invoke(initial_state(brief, "r1"))
+    llm = CountingLLM()
+    fused = build_graph(ExecutionContext(llm=llm), "fused").invoke(initial_state(brief, "r1"))
+
+    assert llm.calls == 1
+    assert final_state_view(fused) == final_state_view(strict)
+
+
+def test_gate_kill_drops_evaluator_sections():
+    llm = CountingLLM()
+    final_state = build_graph(ExecutionContext(llm=llm), "gate-fused").invoke(
+        initial_state({"concept_hook": "Tinder for Dogs"})
+    )
+    assert llm.calls == 1
+    assert final_state["final_decision"] == "KILL"
+    assert final_state["market_eval"] is None
+
+    patch = fused_evaluator(initial_state({"concept_hook": "Tinder for Dogs"}), ExecutionContext(llm=MockLLM()))
+    assert patch["workflow_gate_result"]["decision"] == "KILL"
+    assert "market_eval" not in patch
+
+
+def test_missing_section_is_rejected():
+    llm = FixedLLM({
+        "market": {"component": "MARKET", "status": "PASS", "confidence": 0.8, "reason": "ok"},
+        "business": {"component": "BUSINESS", "status": "MAYBE", "confidence": 0.8, "reason": "?"},
+    })
+    with pytest.raises(ValueError):
+        fused_evaluator(initial_state({"concept_hook": "x"}), ExecutionContext(llm=llm), include_gate=False)
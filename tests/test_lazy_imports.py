@@ -0,0 +1,41 @@
+# tests/test_lazy_imports.py
+import os
+import subprocess
+import sys
+
+import pytest
+
+from llm import factory
+from llm.mock_llm import MockLLM
+
+
+def test_mock_path_does_not_import_the_openai_sdk():
+    code = (
+        "import sys, main\n"
+        "assert 'langgraph' not in sys.modules, 'main imported langgraph'\n"
+        "main.build_engine()\n"
+        "print('openai' in sys.modules)\n"
+    )
+    env = {**os.environ, "LLM_PROVIDER": "mock"}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True)
+
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "False"
+
+
+class EchoLLM(MockLLM):
+    provider = "echo"
+
+
+def test_registered_provider_is_loaded_from_its_spec(monkeypatch):
+    monkeypatch.setitem(factory.PROVIDERS, "echo", f"{__name__}:EchoLLM")
+    monkeypatch.setenv("LLM_RETRY", "0")
+
+    llm = factory.get_llm({"provider": "echo"})
+
+    assert isinstance(llm, EchoLLM)
+    with pytest.raises(ValueError):
+        factory.get_llm({"provider": "nope"})
+    with pytest.raises(ValueError):
+        factory.register_provider("bad", "no_colon")
@@ -0,0 +1,87 @@
+# tests/test_log_index.py
+import json
+import sqlite3
+
+from core.log_index import LogIndex
+from core.logger import ShadowLogWriter, shadow_record
+
+
+def make_state(i, technical="PASS"):
+    return {
+        "run_id": f"run-{i}",
+        "brief": {"concept_hook": f"idea {i}"},
+        "workflow_gate_result": {"decision": "PASS"},
+        "technical_eval": {"component": "TECHNICAL", "status": technical, "confidence": 0.9},
+        "final_decision": technical,
+    }
+
+
+def test_index_maintained_by_writer(tmp_path):
+    index = LogIndex(str(tmp_path / "index.sqlite3"))
+    writer = ShadowLogWriter(directory=tmp_path, max_bytes=1500, index=index)
+    for i in range(20):
+        writer.submit(shadow_record(make_state(i, "KILL" if i % 4 == 0 else "PASS")))
+    writer.close()
+
+    assert index.count() == 20
+    killed = index.query(component="technical", status="KILL", limit=None)
+    assert sorted(row["run_id"] for row in killed) == ["run-0", "run-12", "run-16", "run-4", "run-8"]
+    assert index.record(index.query(run_id="run-7")[0])["brief"] == {"concept_hook": "idea 7"}
+    # Every finalized segment is already marked indexed.
+    assert index.build() == 0
+
+
+def test_build_offline_from_legacy_files(tmp_path):
+    record = shadow_record(make_state(1, "KILL"))
+    record["timestamp"] = "20260101_120000"
+    (tmp_path / "run-1_20260101_120000.json").write_text(json.dumps(record, indent=2))
+
+    index = LogIndex(str(tmp_path / "index.sqlite3"))
+    assert index.build() == 1
+    assert index.build() == 0
+    assert index.count(decision="KILL", since="2026-01-01", until="2026-01-02") == 1
+    assert index.count(since="2026-01-02") == 0
+
+
+def test_query_cli_accepts_every_stored_decision():
+    from main import parse_args
+
+    args = parse_args(["query", "--decision", "build", "--gate", "kill",
+                       "--component", "technical", "--status", "insufficient_info"])
+
+    assert (args.decision, args.gate, args.status) == ("BUILD", "KILL", "INSUFFICIENT_INFO")
+    assert parse_args(["query", "--decision", "INSUFFICIENT_INFO"]).decision == "INSUFFICIENT_INFO"
+
+
+def test_registry_components_go_to_the_side_table(tmp_path):
+    index = LogIndex(str(tmp_path / "index.sqlite3"))
+    writer = ShadowLogWriter(directory=tmp_path, index=index)
+    for i in range(4):
+        state = make_state(i)
+        state["security_eval"] = {"component": "SECURITY", "status": "KILL" if i % 2 else "PASS", "confidence": 0.8}
+        writer.submit(shadow_record(state))
+    writer.close()
+
+    assert index.components() == ("market", "business", "technical", "security")
+    killed = index.query(component="security", status="KILL", limit=None)
+    assert sorted(row["run_id"] for row in killed) == ["run-1", "run-3"]
+    assert index.count(component="security", status="KILL", decision="PASS") == 2
+
+
+def test_files_indexed_before_the_side_table_are_read_again(tmp_path):
+    state = make_state(1)
+    state["security_eval"] = {"component": "SECURITY", "status": "KILL", "confidence": 0.8}
+    writer = ShadowLogWriter(directory=tmp_path)
+    writer.submit(shadow_record(state))
+    writer.close()
+    path = str(tmp_path / "index.sqlite3")
+    assert LogIndex(path).build() == 1
+    # Simulate an index file written by a version without the side table.
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE components")
+    conn.commit()
+    conn.close()
+
+    index = LogIndex(path)
+    assert index.build() == 1
+    assert index.count() == 1 and index.count(component="security", status="KILL") == 1
@@ -0,0 +1,48 @@
+# tests/test_mock_profiles.py
+import asyncio
+import json
+import time
+
+import pytest
+
+from bench.suite import compare
+from llm.base import current_role
+from llm.factory import get_llm
+from llm.mock_llm import LatencyProfile, MockLLM, MockProviderError
+
+
+def test_profile_applies_per_role_latency_and_size():
+    llm = MockLLM({"default": LatencyProfile(p50_ms=0), "market_eval": LatencyProfile(p50_ms=50, output_tokens=100)})
+
+    token = current_role.set("market_eval")
+    try:
+        started = time.perf_counter()
+        output = asyncio.run(llm.agenerate("MARKET", "{}"))
+        assert time.perf_counter() - started >= 0.05
+    finally:
+        current_role.reset(token)
+
+    assert json.loads(output)["status"] == "PASS"
+    assert len(output) >= 400
+    assert llm.generate("MARKET", "{}") == MockLLM().generate("MARKET", "{}")
+
+
+def test_error_rate_raises_retryable_error():
+    llm = MockLLM({"default": LatencyProfile(error_rate=1.0)})
+    with pytest.raises(ConnectionError):
+        llm.generate("MARKET", "{}")
+    with pytest.raises(MockProviderError):
+        asyncio.run(llm.agenerate("MARKET", "{}"))
+
+
+def test_factory_reads_mock_profile(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "mock")
+    monkeypatch.setenv("MOCK_PROFILE", '{"default": {"p50_ms": 5, "spread": 0.2}}')
+    llm = get_llm()
+    assert llm.profiles["default"] == LatencyProfile(p50_ms=5, spread=0.2)
+
+
+def test_compare_flags_regressions_by_direction():
+    base = {"a.p99_ms": 100.0, "a.c8_briefs_per_sec": 50.0, "a.agent_us": 10.0}
+    current = {"a.p99_ms": 120.0, "a.c8_briefs_per_sec": 40.0, "a.agent_us": 9.0}
+    assert compare(base, current, threshold=0.1) == ["a.p99_ms", "a.c8_briefs_per_sec"]
@@ -0,0 +1,143 @@
+# tests/test_openai_transport.py
+import asyncio
+import json
+
+from bench.stub_server import StubServer
+from llm.base import current_role
+from llm.factory import get_llm
+from llm.openai_llm import OpenAILLM
+from llm.usage import RoleStats, metered, role_stats
+
+
+def test_instances_share_pooled_client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    assert OpenAILLM().client is OpenAILLM().client
+    assert OpenAILLM(shared=False).client is not OpenAILLM().client
+    assert OpenAILLM(transport={"max_connections": 3}).client is not OpenAILLM().client
+
+
+def test_get_llm_passes_transport_config(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_MAX_KEEPALIVE", "7")
+
+    monkeypatch.setenv("LLM_RETRY", "0")
+    llm = get_llm({"provider": "openai", "transport": {"timeout": 12.0}})
+
+    assert llm.transport["max_keepalive_connections"] == 7
+    assert llm.transport["timeout"] == 12.0
+    assert llm.transport["max_retries"] == 2
+
+
+def test_resilient_wrapper_owns_retries(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("LLM_RETRY", raising=False)
+
+    llm = get_llm({"provider": "openai"})
+
+    assert llm.inner.transport["max_retries"] == 0
+    assert llm.provider == "openai"
+
+
+def test_pooled_client_reuses_connections(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    with StubServer() as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        llm = OpenAILLM(transport={"max_connections": 5})
+
+        for _ in range(5):
+            assert json.loads(llm.generate(system="MARKET", user="{}"))["status"] == "PASS"
+        asyncio.run(llm.agenerate(system="MARKET", user="{}"))
+
+        # One connection for the sync client, one for the async client.
+        assert server.connections == 2
+
+
+def test_streamed_completion_reassembles_and_records_usage(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    with StubServer() as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        llm = OpenAILLM()
+
+        with metered() as meter:
+            chunks = list(llm.generate_stream(system="MARKET", user="{}"))
+
+        async def astream():
+            return [chunk async for chunk in llm.agenerate_stream(system="MARKET", user="{}")]
+
+        assert len(chunks) > 1
+        assert json.loads("".join(chunks))["status"] == "PASS"
+        assert "".join(asyncio.run(astream())) == "".join(chunks)
+        assert meter.snapshot()["output_tokens"] == 10
+
+
+def test_prompt_cache_key_and_cached_tokens_are_reported(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    system = "MARKET " + "criteria " * 600  # about 1350 tokens: cacheable
+    with StubServer() as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        llm = OpenAILLM(model="gpt-4o-mini")
+        role_stats().reset()
+        role = current_role.set("market_eval")
+        try:
+            with metered() as meter:
+                llm.generate(system=system, user="first brief")
+                llm.generate(system=system, user="second brief")
+        finally:
+            current_role.reset(role)
+
+        [key] = server.cache_keys
+        assert key.startswith("market_eval-") and server.cache_keys[key] == 2
+        assert meter.snapshot()["cached_input_tokens"] == 1280
+        assert meter.snapshot()["cost_usd"] > 0
+        stats = role_stats().snapshot()["market_eval"]
+        assert stats["calls"] == 2 and stats["cached_input_tokens"] == 1280
+        assert stats["saved_usd"] > 0
+        assert stats["cached_latency_ms"] is not None and stats["uncached_latency_ms"] is not None
+
+
+def test_prompt_cache_key_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_PROMPT_CACHE_KEY", "0")
+
+    request = OpenAILLM.from_config({"prompt_cache_retention": "24h"})._request("system", "user")
+
+    assert "prompt_cache_key" not in request
+    assert request["prompt_cache_retention"] == "24h"
+
+
+def test_default_model_is_priced(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("LLM_PRICES", raising=False)
+    stats = RoleStats()
+
+    stats.record("market_eval", OpenAILLM().model, input_tokens=2000, output_tokens=100, cached_input_tokens=1024)
+
+    row = stats.snapshot()["market_eval"]
+    assert row["cost_usd"] > 0 and row["saved_usd"] > 0
+
+
+def test_private_clients_close_both_pools(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    with StubServer() as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+
+        llm = OpenAILLM(shared=False)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(llm.agenerate(system="MARKET", user="{}"))
+            async_client = llm.async_client
+            llm.close()
+        finally:
+            loop.close()
+        assert llm.client.is_closed() and async_client.is_closed()
+
+        async def use_and_aclose():
+            llm = OpenAILLM(shared=False)
+            await llm.agenerate(system="MARKET", user="{}")
+            client = llm.async_client
+            await llm.aclose()
+            return llm, client
+
+        llm, async_client = asyncio.run(use_and_aclose())
+        assert llm.client.is_closed() and async_client.is_closed()
@@ -0,0 +1,54 @@
+# tests/test_policies.py
+import asyncio
+import json
+import time
+
+import pytest
+
+from core.context import ExecutionContext
+from core.state import initial_state
+from graph import build_graph, POLICIES
+from llm.mock_llm import MockLLM
+
+
+def load_cases():
+    with open("tests/calibration_set.json", "r") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("policy", POLICIES)
+def test_policies_agree_with_strict(policy):
+    ctx = ExecutionContext(llm=MockLLM())
+    strict = build_graph(ctx, "strict")
+    graph = build_graph(ctx, policy)
+
+    for case in load_cases():
+        expected = strict.invoke(initial_state(case["brief"]))["final_decision"]
+        assert graph.invoke(initial_state(case["brief"]))["final_decision"] == expected
+        assert asyncio.run(graph.ainvoke(initial_state(case["brief"])))["final_decision"] == expected
+
+
+class SlowUnlessKill(MockLLM):
+    # Market KILLs instantly; every other async call hangs.
+    async def agenerate(self, system: str, user: str) -> str:
+        output = self.generate(system, user)
+        if '"KILL"' not in output and "Gatekeeper" not in system:
+            await asyncio.sleep(30)
+        return output
+
+
+def test_short_circuit_cancels_remaining_evaluators():
+    graph = build_graph(ExecutionContext(llm=SlowUnlessKill()), "short-circuit")
+
+    started = time.perf_counter()
+    final_state = asyncio.run(graph.ainvoke(initial_state({"concept_hook": "Social Network for CFOs"})))
+
+    assert time.perf_counter() - started < 5
+    assert final_state["final_decision"] == "KILL"
+    assert final_state["market_eval"]["status"] == "KILL"
+    assert final_state["technical_eval"] is None
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        build_graph(ExecutionContext(llm=MockLLM()), "eager")
@@ -0,0 +1,29 @@
+# tests/test_prompts.py
+import os
+
+import pytest
+
+from core.prompts import PromptRegistry, load_prompt
+
+
+def test_load_prompt_serves_repo_prompts():
+    assert "Gatekeeper" in load_prompt("workflow_gate.txt")
+    with pytest.raises(FileNotFoundError):
+        load_prompt("does_not_exist.txt")
+
+
+def test_registry_hashes_and_hot_reload(tmp_path):
+    prompt = tmp_path / "a.txt"
+    prompt.write_text("v1", encoding="utf-8")
+    static = PromptRegistry(tmp_path)
+    live = PromptRegistry(tmp_path, hot_reload=True)
+    v1 = live.version("a.txt")
+
+    prompt.write_text("v2", encoding="utf-8")
+    stat = prompt.stat()
+    os.utime(prompt, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert static.get("a.txt") == "v1"
+    assert live.get("a.txt") == "v2"
+    assert live.version("a.txt") != v1
+    assert set(live.versions()) == {"a.txt"}
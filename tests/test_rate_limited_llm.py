@@ -0,0 +1,98 @@
+# tests/test_rate_limited_llm.py
+import asyncio
+import threading
+import time
+
+from llm.base import LLMClient, current_role
+from llm.rate_limited_llm import RateLimitedLLM, SharedRateLimits
+
+
+class RecordingLLM(LLMClient):
+    max_tokens = 0
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.order = []
+        self.lock = threading.Lock()
+
+    def generate(self, system: str, user: str) -> str:
+        with self.lock:
+            self.order.append(current_role.get())
+        time.sleep(self.delay)
+        return "ok"
+
+    async def agenerate(self, system: str, user: str) -> str:
+        self.order.append(current_role.get())
+        await asyncio.sleep(self.delay)
+        return "ok"
+
+
+def test_max_in_flight_caps_concurrency_from_threads():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    class Tracking(RecordingLLM):
+        def generate(self, system, user):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return "ok"
+
+    llm = RateLimitedLLM(Tracking(), max_in_flight=2)
+    threads = [threading.Thread(target=llm.generate, args=("s", "u")) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peak[0] == 2
+    assert llm.stats()["in_flight"] == 0
+
+
+def test_roles_are_served_round_robin():
+    inner = RecordingLLM(delay=0.01)
+    llm = RateLimitedLLM(inner, max_in_flight=1)
+
+    async def call(role):
+        current_role.set(role)
+        await llm.agenerate("s", "u")
+
+    async def main():
+        # Evaluators flood the queue before the gate asks once.
+        calls = [call("market_eval") for _ in range(5)] + [call("workflow_gate")]
+        await asyncio.gather(*calls)
+
+    asyncio.run(main())
+
+    assert inner.order.index("workflow_gate") <= 2
+    stats = llm.stats()
+    assert stats["roles"]["market_eval"]["granted"] == 5
+    assert stats["roles"]["market_eval"]["wait_max_s"] > 0
+
+
+def test_request_bucket_throttles():
+    llm = RateLimitedLLM(RecordingLLM(), requests_per_minute=600)  # 10/s, burst 600
+    llm.requests.tokens = 1  # drain the burst
+
+    started = time.monotonic()
+    llm.generate("s", "u")
+    llm.generate("s", "u")
+
+    assert time.monotonic() - started >= 0.08
+
+
+def test_shared_buckets_are_one_budget_across_limiters():
+    shared = SharedRateLimits(requests_per_minute=600)  # 10/s, burst 600
+    first = RateLimitedLLM(RecordingLLM(), shared=shared)
+    second = RateLimitedLLM(RecordingLLM(), shared=shared)
+    shared.requests.tokens = 1
+
+    started = time.monotonic()
+    first.generate("s", "u")
+    second.generate("s", "u")
+
+    assert time.monotonic() - started >= 0.08
+    assert second.requests.tokens < 1
@@ -0,0 +1,89 @@
+# tests/test_registry.py
+import asyncio
+import json
+
+import pytest
+
+from agents.arbiter import final_arbiter
+from agents.registry import DEFAULT_EVALUATORS, EvaluatorSpec, load_evaluators, validate
+from core.context import ExecutionContext
+from core.state import final_state_view, initial_state
+from graph import build_graph
+from llm.mock_llm import LatencyProfile, MockLLM
+
+# Extra dimensions reuse existing personas so the mock can answer them.
+EXTRA = [
+    *DEFAULT_EVALUATORS,
+    {"name": "security", "prompt": "technical_eval.txt"},
+    {"name": "pricing", "prompt": "business_eval.txt"},
+]
+
+
+@pytest.mark.parametrize("policy", ["strict", "speculative", "short-circuit", "fused", "gate-fused"])
+def test_extra_evaluators_get_state_keys(policy):
+    graph = build_graph(ExecutionContext(llm=MockLLM(), config={"evaluators": EXTRA}), policy=policy)
+
+    state = graph.invoke(initial_state({"concept_hook": "Invoice matching"}, "run_registry"))
+
+    assert state["final_decision"] == "BUILD"
+    assert state["security_eval"]["status"] == "PASS"
+    assert state["pricing_eval"]["status"] == "PASS"
+    assert list(final_state_view(state)["evaluations"]) == ["market", "business", "technical", "security", "pricing"]
+
+
+def test_extra_evaluator_kill_decides():
+    graph = build_graph(ExecutionContext(llm=MockLLM(), config={"evaluators": EXTRA}))
+
+    state = graph.invoke(initial_state({"concept_hook": "Blockchain for HR"}, "run_registry"))
+
+    assert state["pricing_eval"]["status"] == "KILL"
+    assert state["final_decision"] == "KILL"
+
+
+def test_timed_out_evaluator_reports_insufficient_info():
+    profiles = {"slow_eval": LatencyProfile(p50_ms=2000), "default": LatencyProfile(p50_ms=1)}
+    evaluators = [*DEFAULT_EVALUATORS, EvaluatorSpec("slow", "market_eval.txt", timeout=0.05)]
+    graph = build_graph(ExecutionContext(llm=MockLLM(profiles), config={"evaluators": evaluators}))
+    brief = {"concept_hook": "Invoice matching"}
+
+    for state in (graph.invoke(initial_state(brief, "run_sync")),
+                  asyncio.run(graph.ainvoke(initial_state(brief, "run_async")))):
+        assert state["slow_eval"]["status"] == "INSUFFICIENT_INFO"
+        assert state["final_decision"] == "INSUFFICIENT_INFO"
+
+
+def test_evaluator_with_its_own_llm():
+    evaluators = [*DEFAULT_EVALUATORS, {"name": "security", "prompt": "technical_eval.txt", "llm": {"provider": "mock"}}]
+    graph = build_graph(ExecutionContext(llm=MockLLM(), config={"evaluators": evaluators}))
+
+    state = graph.invoke(initial_state({"concept_hook": "Invoice matching"}, "run_llm"))
+
+    assert state["security_eval"]["status"] == "PASS"
+
+
+@pytest.mark.parametrize("entries, error", [
+    ([], ValueError),
+    ([{"name": "market"}, {"name": "market"}], ValueError),
+    ([{"name": "not-a-name", "prompt": "market_eval.txt"}], ValueError),
+    ([{"name": "market", "retries": 3}], ValueError),
+    ([{"name": "nonexistent"}], FileNotFoundError),
+])
+def test_invalid_registries_are_rejected(entries, error):
+    with pytest.raises(error):
+        validate(entries)
+
+
+def test_load_evaluators_from_file(tmp_path):
+    path = tmp_path / "evaluators.json"
+    path.write_text(json.dumps([{"name": "market"}, {"name": "security", "prompt": "technical_eval.txt", "timeout": 5}]))
+
+    specs = load_evaluators(str(path))
+
+    assert specs == (EvaluatorSpec("market", "market_eval.txt"), EvaluatorSpec("security", "technical_eval.txt", timeout=5))
+
+
+def test_arbiter_requires_every_registered_key():
+    state = {"market_eval": {"status": "PASS"}, "security_eval": {"status": "PASS"}}
+
+    assert final_arbiter(dict(state), ["market_eval", "security_eval"])["final_decision"] == "BUILD"
+    assert final_arbiter(dict(state), ["market_eval", "security_eval", "legal_eval"])["final_decision"] == "KILL"
@@ -0,0 +1,117 @@
+# tests/test_resilient_llm.py
+import asyncio
+import time
+
+import pytest
+
+from llm.base import LLMClient
+from llm.resilient_llm import ResilientLLM, InvalidOutputError
+
+
+class ScriptedLLM(LLMClient):
+    # Returns (or raises) the scripted outcomes in order, then repeats the last.
+    def __init__(self, outcomes, delays=None):
+        self.outcomes = list(outcomes)
+        self.delays = list(delays or [])
+        self.calls = 0
+
+    def _next(self):
+        index = min(self.calls, len(self.outcomes) - 1)
+        delay = self.delays[min(self.calls, len(self.delays) - 1)] if self.delays else 0
+        self.calls += 1
+        return self.outcomes[index], delay
+
+    def generate(self, system: str, user: str) -> str:
+        outcome, delay = self._next()
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def agenerate(self, system: str, user: str) -> str:
+        outcome, delay = self._next()
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def fast(inner, **options):
+    return ResilientLLM(inner, backoff_initial=0.001, backoff_max=0.01, jitter=0.001, **options)
+
+
+def test_transient_errors_are_retried():
+    inner = ScriptedLLM([ConnectionError("reset"), TimeoutError("slow"), '{"ok": true}'])
+    llm = fast(inner)
+
+    assert llm.generate("s", "u") == '{"ok": true}'
+    assert inner.calls == 3
+    assert llm.stats()["retries"] == 2
+
+
+def test_unlisted_errors_are_not_retried():
+    inner = ScriptedLLM([KeyError("bug"), '{"ok": true}'])
+    llm = fast(inner)
+
+    with pytest.raises(KeyError):
+        llm.generate("s", "u")
+    assert inner.calls == 1
+
+
+def test_invalid_json_retried_until_limit():
+    inner = ScriptedLLM(["not json"])
+    llm = fast(inner, validate_json=True)
+
+    with pytest.raises(InvalidOutputError):
+        asyncio.run(llm.agenerate("s", "u"))
+    assert inner.calls == 3
+
+
+def test_deadline_bounds_async_call():
+    inner = ScriptedLLM(['{"ok": true}'], delays=[5])
+    llm = fast(inner, deadline=0.1)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        asyncio.run(llm.agenerate("s", "u"))
+    assert time.monotonic() - started < 2
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_hedge_wins_over_slow_tail(use_async):
+    # Warm up with fast calls, then a stalled call gets hedged.
+    inner = ScriptedLLM(['{"ok": true}'], delays=[0.001] * 5 + [3, 0.001])
+    llm = fast(inner, hedge=True, min_samples=5)
+
+    for _ in range(5):
+        llm.generate("s", "u")
+    started = time.monotonic()
+    if use_async:
+        asyncio.run(llm.agenerate("s", "u"))
+    else:
+        llm.generate("s", "u")
+
+    assert time.monotonic() - started < 1
+    assert llm.stats()["hedge_wins"] == 1
+
+
+def test_hedge_success_wins_when_both_finish_together(monkeypatch):
+    # Primary fails and hedge succeeds, reported done together, failure first.
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from llm import resilient_llm
+
+    def together(futures, timeout=None, return_when=None):
+        if return_when != FIRST_COMPLETED:
+            return wait(futures, timeout=timeout)
+        done, _ = wait(futures)
+        return sorted(done, key=lambda f: f.exception() is None), set()
+
+    inner = ScriptedLLM(['{"ok": true}'] * 5 + [KeyError("primary"), '{"ok": true}'],
+                        delays=[0.001] * 5 + [0.3, 0.001])
+    llm = fast(inner, hedge=True, min_samples=5)
+    for _ in range(5):
+        llm.generate("s", "u")
+    monkeypatch.setattr(resilient_llm, "wait", together)
+
+    assert llm.generate("s", "u") == '{"ok": true}'
+    assert llm.stats()["hedge_wins"] == 1
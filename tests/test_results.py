@@ -0,0 +1,61 @@
+# tests/test_results.py
+import dataclasses
+import json
+
+import pytest
+
+from agents.workflow_gate import workflow_gate
+from core.context import ExecutionContext
+from core.logger import encode_line
+from core.results import json_default, parse_result, result_from
+from core.state import EvalResult, GateResult, Status, initial_state
+from llm.mock_llm import MockLLM
+
+
+class FixedLLM(MockLLM):
+    def __init__(self, output: str):
+        self.output = output
+
+    def generate(self, system: str, user: str) -> str:
+        return self.output
+
+
+def test_parse_coerces_status_clamps_confidence_and_drops_extras():
+    result = parse_result(b'{"component": "MARKET", "status": " kill ", "confidence": 1.7, "reason": "Crowded", "score": 3}')
+
+    assert isinstance(result, EvalResult) and result.status is Status.KILL
+    assert result == {"component": "MARKET", "status": "KILL", "confidence": 1.0, "reason": "Crowded"}
+    assert result["status"] == "KILL" and result.get("score") is None
+    assert parse_result('{"status": "PASS", "confidence": -0.2}').confidence == 0.0
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        result.status = Status.PASS
+
+
+def test_invalid_verdicts_raise_value_error():
+    with pytest.raises(ValueError):
+        parse_result('{"status": "MAYBE", "confidence": 0.5}')
+    with pytest.raises(ValueError):
+        parse_result('{"status": "PASS", "confidence": NaN}')
+    with pytest.raises(ValueError):
+        result_from({"confidence": 0.9}, GateResult)
+
+
+def test_gate_falls_back_to_kill_on_an_invalid_decision():
+    context = ExecutionContext(llm=FixedLLM('{"decision": "UNSURE", "confidence": 0.4, "reason": "?"}'))
+
+    patch = workflow_gate(initial_state({"concept_hook": "x"}), context)
+
+    assert patch["workflow_gate_result"]["decision"] == Status.KILL
+    assert patch["workflow_gate_result"]["reason"] == "Agent output parsing failed"
+
+
+def test_results_encode_as_plain_objects():
+    gate = GateResult(decision=Status.PASS, confidence=0.9, reason="Daily task")
+    record = {"workflow_gate": gate, "market_eval": parse_result('{"status": "PASS"}')}
+    expected = {
+        "workflow_gate": {"decision": "PASS", "confidence": 0.9, "reason": "Daily task"},
+        "market_eval": {"component": "", "status": "PASS", "confidence": 0.0, "reason": ""},
+    }
+
+    assert json.loads(json.dumps(record, default=json_default)) == expected
+    assert json.loads(encode_line(record)) == expected
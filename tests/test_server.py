@@ -0,0 +1,82 @@
+# tests/test_server.py
+import asyncio
+import json
+
+import pytest
+
+from core.context import ExecutionContext
+from graph import build_graph
+from llm.mock_llm import LatencyProfile, MockLLM
+from server import EvaluationServer, Overloaded, serve
+
+
+def slow_graph():
+    llm = MockLLM(profiles={"default": LatencyProfile(p50_ms=30, spread=0.0)}, seed=1)
+    return build_graph(ExecutionContext(llm=llm)), llm
+
+
+def test_identical_concurrent_briefs_share_one_evaluation():
+    graph, llm = slow_graph()
+    server = EvaluationServer(graph, shadow_log=False)
+    brief = {"concept_hook": "Shared idea"}
+
+    async def run():
+        return await asyncio.gather(*(server.evaluate(dict(brief)) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert server.stats()["evaluations"] == 1
+    assert sum(coalesced for _, coalesced in results) == 4
+    assert len({view["run_id"] for view, _ in results}) == 1
+
+
+def test_admission_limit_rejects_new_briefs_but_not_joins():
+    graph, _ = slow_graph()
+    server = EvaluationServer(graph, max_concurrency=1, max_queue=0, shadow_log=False)
+
+    async def run():
+        first = asyncio.ensure_future(server.evaluate({"concept_hook": "A"}))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await server.evaluate({"concept_hook": "B"})
+        joined = await server.evaluate({"concept_hook": "A"})
+        return await first, joined
+
+    (view, _), (_, coalesced) = asyncio.run(run())
+
+    assert view["final_decision"] in ("BUILD", "KILL")
+    assert coalesced
+    assert server.stats()["rejected"] == 1
+
+
+def test_http_round_trip_over_keep_alive():
+    server = EvaluationServer(build_graph(ExecutionContext(llm=MockLLM())), shadow_log=False)
+
+    async def request(reader, writer, method, path, body=b""):
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+    async def run():
+        bound = asyncio.get_running_loop().create_future()
+        listener = asyncio.ensure_future(serve(server, port=0, ready=bound.set_result))
+        port = (await bound)[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            evaluated = await request(reader, writer, "POST", "/evaluate",
+                                      json.dumps({"run_id": "run_http", "brief": {"concept_hook": "Tinder for Dogs"}}).encode())
+            invalid = await request(reader, writer, "POST", "/evaluate", b"not json")
+            missing = await request(reader, writer, "GET", "/nowhere")
+        finally:
+            writer.close()
+            listener.cancel()
+        return evaluated, invalid, missing
+
+    (status, view), (invalid, _), (missing, _) = asyncio.run(run())
+
+    assert status == 200 and view["run_id"] == "run_http" and view["final_decision"] == "KILL"
+    assert invalid == 400 and missing == 404
@@ -0,0 +1,110 @@
+# tests/test_shadow_log.py
+import subprocess
+import sys
+import threading
+
+from core.log_index import LogIndex
+from core.logger import ShadowLogWriter, encode_line, iter_shadow_records, recover_segments, shadow_record
+
+
+def make_state(i):
+    return {"run_id": f"run-{i}", "brief": {"concept_hook": f"idea {i}"}, "final_decision": "PASS"}
+
+
+def test_segments_rotate_and_finalize(tmp_path):
+    writer = ShadowLogWriter(directory=tmp_path, max_bytes=2000)
+    for i in range(50):
+        assert writer.submit(shadow_record(make_state(i)))
+    writer.close()
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert len(files) > 1
+    assert not any(name.endswith(".open") for name in files)
+    assert [r["run_id"] for r in iter_shadow_records(tmp_path)] == [f"run-{i}" for i in range(50)]
+    assert writer.stats()["written"] == 50
+
+
+def test_zstd_segments_round_trip(tmp_path):
+    writer = ShadowLogWriter(directory=tmp_path, compress=True)
+    for i in range(10):
+        writer.submit(shadow_record(make_state(i)))
+    writer.flush()
+    writer.close()
+
+    assert all(p.name.endswith(".jsonl.zst") for p in tmp_path.iterdir())
+    assert len(list(iter_shadow_records(tmp_path))) == 10
+
+
+def test_submit_after_close_is_dropped(tmp_path):
+    writer = ShadowLogWriter(directory=tmp_path)
+    writer.close()
+    assert not writer.submit(shadow_record(make_state(0)))
+    assert writer.stats()["dropped"] == 1
+
+
+def test_full_queue_waits_then_drops_with_one_warning(tmp_path, capsys):
+    class StalledIndex:
+        # Holds the writer thread inside its first batch until released.
+        def __init__(self):
+            self.entered, self.release = threading.Event(), threading.Event()
+
+        def add(self, located):
+            self.entered.set()
+            self.release.wait()
+
+        def mark_complete(self, source):
+            pass
+
+    index = StalledIndex()
+    writer = ShadowLogWriter(directory=tmp_path, max_queue=1, block_timeout=0.05, index=index)
+    assert writer.submit(shadow_record(make_state(0)))
+    assert index.entered.wait(5)
+    assert writer.submit(shadow_record(make_state(1)))
+    assert not writer.submit(shadow_record(make_state(2)))
+    assert not writer.submit(shadow_record(make_state(3)))
+    index.release.set()
+    writer.close()
+
+    assert writer.stats()["written"] == 2 and writer.stats()["dropped"] == 2
+    assert capsys.readouterr().err.count("dropping records") == 1
+
+
+def dead_pid():
+    proc = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    return int(proc.stdout)
+
+
+def test_orphaned_open_segments_are_recovered(tmp_path):
+    import zstandard
+
+    pid = dead_pid()
+    lines = b"".join(encode_line(shadow_record(make_state(i))) for i in range(3))
+    (tmp_path / f"shadow-20260101T000000-{pid}-00001.jsonl.open").write_bytes(lines + b'{"run_id": "cut')
+    (tmp_path / f"shadow-20260101T000000-{pid}-00002.jsonl.zst.open").write_bytes(
+        zstandard.ZstdCompressor().compress(lines + b'{"run_id": "cut'))
+    index = LogIndex(str(tmp_path / "index.sqlite3"))
+
+    writer = ShadowLogWriter(directory=tmp_path, index=index)
+    writer.close()
+
+    assert writer.stats()["recovered"] == 2
+    assert not list(tmp_path.glob("*.open"))
+    assert [r["run_id"] for r in iter_shadow_records(tmp_path)] == ["run-0", "run-1", "run-2"] * 2
+    assert index.count() == 6 and index.build() == 0
+
+
+def test_zstd_recovery_uses_a_private_scratch_file(tmp_path):
+    import zstandard
+
+    pid = dead_pid()
+    name = f"shadow-20260101T000000-{pid}-00001.jsonl.zst.open"
+    lines = b"".join(encode_line(shadow_record(make_state(i))) for i in range(3))
+    (tmp_path / name).write_bytes(zstandard.ZstdCompressor().compress(lines))
+    # Another worker's scratch file under the old fixed name is left alone.
+    (tmp_path / (name + ".recover")).write_bytes(b"in progress")
+
+    assert [p.name for p in recover_segments(str(tmp_path))] == [name[:-len(".open")]]
+    assert recover_segments(str(tmp_path)) == []
+    assert (tmp_path / (name + ".recover")).read_bytes() == b"in progress"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [name[:-len(".open")], name + ".recover"]
+    assert [r["run_id"] for r in iter_shadow_records(tmp_path)] == ["run-0", "run-1", "run-2"]
@@ -0,0 +1,77 @@
+# tests/test_streaming.py
+import asyncio
+import json
+import time
+
+import pytest
+
+from core.context import ExecutionContext
+from core.json_stream import EARLY_KILL_REASON, VerdictScanner
+from core.state import initial_state
+from graph import build_graph
+from llm.mock_llm import LatencyProfile, MockLLM
+
+
+def test_scanner_reads_verdict_across_chunk_boundaries():
+    text = json.dumps({
+        "component": "MARKET",
+        "nested": {"status": "PASS", "items": [1, {"x": "}"}]},
+        "status": "KILL",
+        "confidence": 0.75,
+        "reason": 'quote " and \\ backslash'
+    })
+    for size in (1, 3, 7, len(text)):
+        scanner = VerdictScanner()
+        for start in range(0, len(text), size):
+            scanner.feed(text[start:start + size])
+
+        assert scanner.fields == {
+            "component": "MARKET", "status": "KILL", "confidence": 0.75, "reason": 'quote " and \\ backslash'
+        }
+
+
+def test_streamed_runs_match_plain_runs():
+    briefs = [{"concept_hook": hook} for hook in ("Tinder for Dogs", "Social Network", "Invoice matching")]
+    plain = build_graph(ExecutionContext(llm=MockLLM()))
+    streamed = build_graph(ExecutionContext(llm=MockLLM(), config={"stream": True}))
+
+    for brief in briefs:
+        expected = plain.invoke(initial_state(brief, "run_plain"))
+        assert streamed.invoke(initial_state(brief, "run_plain")) == expected
+        assert asyncio.run(streamed.ainvoke(initial_state(brief, "run_plain"))) == expected
+
+
+@pytest.mark.parametrize("policy", ["strict", "speculative"])
+def test_early_kill_acts_on_the_verdict_before_the_reason(policy):
+    # The gate's padded reason takes about 0.5s to stream; evaluators take 1s.
+    profiles = {
+        "workflow_gate": LatencyProfile(p50_ms=10, output_tokens=250, ms_per_token=2.0),
+        "default": LatencyProfile(p50_ms=1000),
+    }
+    config = {"stream": True, "early_kill": True}
+    graph = build_graph(ExecutionContext(llm=MockLLM(profiles), config=config), policy=policy)
+
+    started = time.perf_counter()
+    state = asyncio.run(graph.ainvoke(initial_state({"concept_hook": "Tinder for Dogs"}, "run_early")))
+
+    assert time.perf_counter() - started < 0.3
+    assert state["final_decision"] == "KILL"
+    assert state["workflow_gate_result"]["confidence"] == 0.9
+    assert state["workflow_gate_result"]["reason"] == EARLY_KILL_REASON
+
+
+def test_verdict_is_normalized_before_listeners_and_early_kill():
+    from core.json_stream import _Reader, verdict_listener
+    from graph import _is_kill
+
+    heard = []
+    token = verdict_listener.set(heard.append)
+    try:
+        reader = _Reader("decision", early_kill=True, result_type=None)
+        assert not reader.feed('{"decision": " kill", ')
+        assert reader.feed('"reason": "too')
+    finally:
+        verdict_listener.reset(token)
+
+    assert heard == ["KILL"]
+    assert _is_kill("technical_eval", {"technical_eval": {"status": "Kill "}})
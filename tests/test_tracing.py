@@ -0,0 +1,70 @@
+# tests/test_tracing.py
+import asyncio
+import json
+
+from core import tracing
+from core.context import ExecutionContext
+from core.state import initial_state
+from graph import build_graph
+from llm.mock_llm import MockLLM
+
+
+class Collector:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def traced(exporters):
+    tracing.configure(exporters)
+    try:
+        graph = build_graph(ExecutionContext(llm=MockLLM()), "strict")
+        with tracing.span("run", run_id="run-trace"):
+            asyncio.run(graph.ainvoke(initial_state({"concept_hook": "Freight invoices"}, "run-trace")))
+    finally:
+        tracing.configure(enable=False)
+
+
+def test_spans_cover_nodes_llm_calls_and_parsing():
+    collector, metrics = Collector(), tracing.SpanMetrics()
+    traced([collector, metrics])
+
+    names = [span.name for span in collector.spans]
+    for node in ("workflow_gate", "market_eval", "business_eval", "technical_eval", "arbiter"):
+        assert node in names
+    assert names.count("llm") == 4 and names.count("parse") == 4
+    assert {span.trace_id for span in collector.spans} == {tracing.trace_id_for("run-trace")}
+    assert all(span.attributes["run_id"] == "run-trace" for span in collector.spans)
+
+    by_id = {span.span_id: span for span in collector.spans}
+    market_llm = next(s for s in collector.spans if s.name == "llm" and s.attributes["role"] == "market_eval")
+    assert by_id[market_llm.parent_id].name == "market_eval"
+    assert market_llm.attributes["input_tokens"] > 0 and market_llm.attributes["response_chars"] > 0
+
+    text = metrics.render()
+    assert 'blackbox_span_duration_seconds_count{kind="client",name="llm"} 4' in text
+    assert 'blackbox_llm_tokens_total{role="market_eval",direction="input"}' in text
+
+
+def test_otlp_file_export(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = tracing.OTLPFileExporter(str(path), interval=0.05)
+    traced([exporter])
+    exporter.close()
+
+    spans = [
+        span
+        for line in path.read_text().splitlines()
+        for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+    assert len(spans) > 10
+    assert all(len(span["traceId"]) == 32 and len(span["spanId"]) == 16 for span in spans)
+
+
+def test_disabled_tracing_is_a_noop():
+    assert not tracing.enabled()
+    with tracing.span("anything") as span:
+        span.set(key="value")
+    assert span is tracing.NOOP
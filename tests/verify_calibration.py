@@ -1,6 +1,10 @@
+import argparse
 import json
 import asyncio
-from typing import List, Dict
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 import os
 import uuid
 
@@ -8,75 +12,279 @@ import uuid
 # os.environ["LLM_PROVIDER"] = "openai" # User must set this if they want real evaluation
 # If running with mock, we expect random/fixed results.
 
+from agents.registry import resolve_evaluators
+from core.checkpoint import ainvoke_run, invoke_run
 from core.context import ExecutionContext
-from graph import build_graph
-from core.state import EngineState, Status
+from graph import build_graph, POLICIES
+from core.state import EngineState, Status, initial_state
+from llm.usage import metered
 
-def load_calibration_set():
-    with open("tests/calibration_set.json", "r") as f:
+"""Calibration harness.
+
+Runs tests/calibration_set.json through one shared compiled graph with a
+configurable number of workers (asyncio tasks by default, or a thread pool)
+and writes a machine-readable report:
+- pass rate of final decisions against expected_verdict,
+- a confusion matrix per component (final, gate and every evaluator in
+  the registry, agents/registry.py: market, business and technical unless
+  EVALUATORS says otherwise) as {expected: {observed: count}}. Observed values are the
+  component's verdict, SKIPPED when it did not run, or ERROR when the case
+  crashed. Component rows are the brief's expected_verdict (BUILD / KILL)
+  unless the case pins per-component expectations under
+  "expected_components",
+- p50/p95/p99 latency per case,
+- LLM calls, input/output tokens and USD cost per case (provider-reported
+  tokens where available, priced with llm/usage.py's MODEL_PRICES /
+  LLM_PRICES; unpriced models cost 0).
+
+Each finished case is appended to a JSONL results file as it completes, so
+an interrupted run can be resumed with --resume: cases already recorded
+without an error are skipped and the report covers the union.
+
+Usage: python -m tests.verify_calibration --workers 8 --report calibration_report.json
+"""
+
+def report_components(config: Optional[Dict] = None) -> Dict[str, Tuple[str, str]]:
+    """Report name -> (state key, verdict field): the gate, then the registry's evaluators."""
+    evaluators = {spec.name: (spec.key, "status") for spec in resolve_evaluators(config or {})}
+    return {"gate": ("workflow_gate_result", "decision"), **evaluators}
+
+
+def load_calibration_set(path: str = "tests/calibration_set.json"):
+    with open(path, "r") as f:
         return json.load(f)
 
-def run_evaluation(brief: Dict):
-    run_id = f"test_{uuid.uuid4().hex[:8]}"
-    state: EngineState = {
-        "run_id": run_id,
-        "brief": brief,
-        "workflow_gate_result": None,
-        "market_eval": None,
-        "business_eval": None,
-        "technical_eval": None,
-        "final_decision": None,
-        "judgment_status": None
-    }
-    
+def make_graph(policy: Optional[str] = None):
     # Setup context (Mock or OpenAI based on env)
     from llm.factory import get_llm
     llm = get_llm()
-    ctx = ExecutionContext(llm=llm) 
-    graph = build_graph(ctx)
-    
-    final_state = graph.invoke(state)
+    ctx = ExecutionContext(llm=llm)
+    return build_graph(ctx, policy)
+
+def run_evaluation(brief: Dict, graph=None):
+    run_id = f"test_{uuid.uuid4().hex[:8]}"
+    state: EngineState = initial_state(brief, run_id)
+
+    # Reuse a compiled graph when the caller provides one.
+    graph = graph or make_graph()
+
+    final_state, _ = invoke_run(graph, state)
     return final_state
 
-def verify():
-    test_cases = load_calibration_set()
+
+async def arun_evaluation(brief: Dict, graph) -> EngineState:
+    final_state, _ = await ainvoke_run(graph, initial_state(brief, f"test_{uuid.uuid4().hex[:8]}"))
+    return final_state
+
+
+def case_result(case: Dict, final_state: Optional[EngineState], latency: float, usage: Dict, error: Exception = None,
+                components: Optional[Dict[str, Tuple[str, str]]] = None) -> Dict:
+    """One results-file line: verdicts, KILL reasons, latency and usage for a case."""
+    components = components or report_components()
+    result = {
+        "id": case.get("id") or case["brief"].get("concept_hook"),
+        "expected": case["expected_verdict"],
+        "latency_s": round(latency, 4),
+        "usage": usage,
+    }
+    if error is not None:
+        result.update(decision="ERROR", correct=False, error=f"{type(error).__name__}: {error}",
+                      components={name: "ERROR" for name in components}, kill_reasons={})
+        return result
+
+    decision = final_state.get("final_decision")
+    if isinstance(decision, Status):
+        decision = decision.value
+    components, kill_reasons = {}, {}
+    for name, (key, field) in components.items():
+        component = final_state.get(key) or {}
+        verdict = component.get(field) or "SKIPPED"
+        components[name] = verdict
+        if verdict == "KILL":
+            kill_reasons[name] = component.get("reason")
+    result.update(decision=decision, correct=decision == case["expected_verdict"],
+                  components=components, kill_reasons=kill_reasons)
+    return result
+
+
+def evaluate_case(graph, case: Dict) -> Dict:
+    started = time.perf_counter()
+    with metered() as meter:
+        try:
+            final_state, error = run_evaluation(case["brief"], graph), None
+        except Exception as exc:
+            final_state, error = None, exc
+    return case_result(case, final_state, time.perf_counter() - started, meter.snapshot(), error)
+
+
+async def aevaluate_case(graph, case: Dict) -> Dict:
+    started = time.perf_counter()
+    with metered() as meter:
+        try:
+            final_state, error = await arun_evaluation(case["brief"], graph), None
+        except Exception as exc:
+            final_state, error = None, exc
+    return case_result(case, final_state, time.perf_counter() - started, meter.snapshot(), error)
+
+
+def run_cases(graph, cases: List[Dict], workers: int = 8, mode: str = "async", on_result=None) -> List[Dict]:
+    """Evaluate cases concurrently with one shared graph.
+
+    Inputs:
+    - workers: cases in flight at once
+    - mode: "async" (tasks driving graph.ainvoke) or "threads" (graph.invoke in a pool)
+    - on_result: called with each result as soon as its case finishes
+
+    Output:
+    - results in completion order
+    """
     results = []
-    
-    print(f"Running {len(test_cases)} calibration tests...")
-    
-    for case in test_cases:
-        expected = case["expected_verdict"]
-        brief = case["brief"]
-        print(f"\nEvaluating: {brief['concept_hook']} (Expected: {expected})")
-        
-        final_state = run_evaluation(brief)
-        decision = final_state.get("final_decision")
-        gate_result = final_state.get("workflow_gate_result")
-        
-        print(f"  -> Gate Result: {gate_result.get('decision') if gate_result else 'SKIPPED'}")
-        print(f"  -> Final Decision: {decision}")
-        
-        success = (decision == expected)
-        results.append(success)
-        
-        if not success:
-            print(f"  [FAILURE] Expected {expected} but got {decision}")
-            if decision == "KILL":
-                # Show who killed it
-                if gate_result and gate_result.get("decision") == "KILL":
-                    print(f"  Reason: Gate Killed - {gate_result.get('reason')}")
-                else:
-                    evals = [
-                        ("Market", final_state.get("market_eval")),
-                        ("Business", final_state.get("business_eval")),
-                        ("Tech", final_state.get("technical_eval"))
-                    ]
-                    for name, res in evals:
-                        if res and res.get("status") == "KILL":
-                            print(f"  Reason: {name} Killed - {res.get('reason')}")
-    
-    pass_rate = sum(results) / len(results)
-    print(f"\nSensitivity: {pass_rate:.1%} Correctness")
+
+    def finished(result):
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    if mode == "threads":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(lambda case: evaluate_case(graph, case), cases):
+                finished(result)
+        return results
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(workers)
+
+        async def one(case):
+            async with semaphore:
+                finished(await aevaluate_case(graph, case))
+
+        await asyncio.gather(*(one(case) for case in cases))
+
+    asyncio.run(run_all())
+    return results
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    # Nearest-rank percentile; None for an empty sample.
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def build_report(results: List[Dict], cases: List[Dict]) -> Dict:
+    """Aggregate per-case results into the calibration report."""
+    expected_components = {
+        (case.get("id") or case["brief"].get("concept_hook")): case.get("expected_components", {})
+        for case in cases
+    }
+
+    def count(matrix, expected, observed):
+        row = matrix.setdefault(expected, {})
+        row[observed] = row.get(observed, 0) + 1
+
+    # Results resumed from an earlier run may cover other evaluators.
+    confusion = {"final": {}, **{name: {} for name in report_components()}}
+    for result in results:
+        count(confusion["final"], result["expected"], result["decision"])
+        pinned = expected_components.get(result["id"], {})
+        for name, verdict in result["components"].items():
+            count(confusion.setdefault(name, {}), pinned.get(name, result["expected"]), verdict)
+
+    latencies = [result["latency_s"] for result in results]
+    total = len(results)
+    totals = {field: sum(result["usage"].get(field, 0) for result in results)
+              for field in ("calls", "input_tokens", "output_tokens", "cost_usd")}
+    totals["cost_usd"] = round(totals["cost_usd"], 6)
+    return {
+        "total": total,
+        "passed": sum(result["correct"] for result in results),
+        "errors": sum("error" in result for result in results),
+        "pass_rate": round(sum(result["correct"] for result in results) / total, 4) if total else None,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": round(sum(latencies) / total, 4) if total else None,
+        },
+        "usage": {
+            "total": totals,
+            "per_case": {field: round(value / total, 6 if field == "cost_usd" else 1) if total else None
+                         for field, value in totals.items()},
+        },
+        "confusion": confusion,
+        "failures": [
+            {key: result[key] for key in ("id", "expected", "decision", "kill_reasons", "error") if key in result}
+            for result in results if not result["correct"]
+        ],
+    }
+
+
+def load_results(path: str) -> List[Dict]:
+    # Results recorded by an earlier (possibly interrupted) run.
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def verify(argv=None):
+    parser = argparse.ArgumentParser(description="Run the calibration set and write an accuracy/latency report")
+    parser.add_argument("--cases", default="tests/calibration_set.json", help="Calibration set JSON file")
+    parser.add_argument("--workers", type=int, default=8, help="Cases evaluated concurrently")
+    parser.add_argument("--mode", choices=("async", "threads"), default="async")
+    parser.add_argument("--policy", choices=POLICIES, help="Execution policy (default: EXECUTION_POLICY or strict)")
+    parser.add_argument("--results", default="calibration_results.jsonl", help="Per-case results (JSONL, appended as cases finish)")
+    parser.add_argument("--report", default="calibration_report.json", help="Aggregate report (JSON)")
+    parser.add_argument("--resume", action="store_true", help="Skip cases already recorded in --results without an error")
+    args = parser.parse_args(argv)
+
+    test_cases = load_calibration_set(args.cases)
+    previous = [r for r in load_results(args.results) if "error" not in r] if args.resume else []
+    done = {result["id"] for result in previous}
+    pending = [case for case in test_cases if (case.get("id") or case["brief"].get("concept_hook")) not in done]
+
+    print(f"Running {len(pending)} calibration tests ({len(done)} already done)...")
+    graph = make_graph(args.policy)
+
+    with open(args.results, "w") as out:
+        # Rewrite kept results first so the file never holds stale errors.
+        for result in previous:
+            out.write(json.dumps(result) + "\n")
+        out.flush()
+
+        def record(result):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            status = "ok" if result["correct"] else "FAILURE"
+            print(f"  [{status}] {result['id']}: expected {result['expected']}, got {result['decision']} ({result['latency_s']:.2f}s)")
+
+        results = previous + run_cases(graph, pending, args.workers, args.mode, on_result=record)
+
+    report = build_report(results, test_cases)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for failure in report["failures"]:
+        print(f"\n[FAILURE] {failure['id']}: expected {failure['expected']} but got {failure['decision']}")
+        for name, reason in failure.get("kill_reasons", {}).items():
+            print(f"  Reason: {name} killed - {reason}")
+        if "error" in failure:
+            print(f"  Error: {failure['error']}")
+
+    def show(value, spec: str) -> str:
+        # Empty (or fully filtered) sets report None.
+        return "n/a" if value is None else format(value, spec)
+
+    latency = report["latency_s"]
+    per_case = report["usage"]["per_case"]
+    print(f"\nSensitivity: {show(report['pass_rate'], '.1%')} Correctness")
+    print(f"Latency p50/p95/p99: {show(latency['p50'], '.2f')}s / {show(latency['p95'], '.2f')}s / "
+          f"{show(latency['p99'], '.2f')}s")
+    print(f"Usage per case: {per_case['calls']} calls, {per_case['input_tokens']} in / "
+          f"{per_case['output_tokens']} out tokens, ${show(per_case['cost_usd'], '.6f')}")
+    print(f"Report written to {args.report}")
+    return report
 
 if __name__ == "__main__":
     verify()